@@ -15,6 +15,10 @@ in utility scripts based on reuseable testing modules that do logging.
 :py:mod:`requests_logging<qe_logging.requests_logging>` - logging helpers for ``requests``-based
 API testing.
 
+:py:mod:`structured_requests_logging<qe_logging.structured_requests_logging>` - logging of
+``requests``-based API testing as indexed JSON-lines records, with the ``request-log`` query
+command.
+
 As an aid for debugging, this module also provides a way to
 include logging output on the console. This can be handy for
 when logging is being captured (such as by Behave or OpenCAFE)
@@ -23,16 +27,36 @@ If you set the environment variable DEBUG_WATCH_LOG, a root level
 handler will be created that prints the logging output
 to standard error. (It does not matter what
 the environment variable is set to, just that it is set.)
+
+:py:func:`setup_logging()` can also write the log files from a background thread
+(``background=True``), so that logging calls only queue their records;
+:py:func:`stop_background_logging()` writes out what is queued, and is called at exit.
 '''
 
 
+import atexit
 import logging
 import os
 from datetime import datetime
 
+try:
+    # Python 3
+    from logging.handlers import QueueHandler, QueueListener
+    import queue as _queue
+    _CAN_LOG_IN_BACKGROUND = True
+except ImportError:
+    # Python 2, which logs in the foreground only.
+    QueueHandler = QueueListener = object
+    _queue = None
+    _CAN_LOG_IN_BACKGROUND = False
+
 
 DEFAULT_LOG_DIRECTORY = 'logs'
 DEFAULT_FORMATTER_STRING = '%(asctime)s:%(levelname)-8s:%(name)-25s:%(message)s'
+DEFAULT_QUEUE_SIZE = 10000
+OVERFLOW_POLICIES = ['block', 'drop', 'drop_oldest']
+
+_listeners = []
 
 
 if 'DEBUG_WATCH_LOG' in os.environ:
@@ -48,9 +72,23 @@ def setup_logging(log_name_prefix, *historical_log_dir_layers, **kwargs):
     One handler will be set to write in the base log directory,
     the other in the historical log dir layers (if provided) with time stamped directories.
 
+    With ``background=True``, the file handlers are run by a ``QueueListener`` thread instead,
+    and the root logger only gets a handler putting each record on a bounded queue, so that
+    tests don't wait on the log files being written. What happens to records logged while the
+    queue is full is set by ``overflow``:
+
+    * ``'block'`` waits for there to be room, so nothing is lost.
+    * ``'drop'`` drops the new record.
+    * ``'drop_oldest'`` drops the oldest queued record to make room for the new one.
+
+    The number of records dropped is logged when the listener is stopped,
+    by :py:func:`stop_background_logging`, which is called at exit.
+    Python 2 has no ``QueueListener``, so there the files are always written in the foreground.
+
     Note:
         For historical reasons, ``setup_logging`` will set up handlers only
-        if no root level file handlers are already defined.
+        if no root level file handlers (or background logging queue handlers)
+        are already defined.
 
     Args:
         log_name_prefix (str): The prefix for the log file name, prepended to .master.log.
@@ -59,12 +97,15 @@ def setup_logging(log_name_prefix, *historical_log_dir_layers, **kwargs):
             One use case for this is providing the test environment as
             ``*historical_log_dir_layers`` resulting in the time stamped directories being grouped
             by test environment.
-        **kwargs:  Additional keyword arguments, valid options are ``base_log_dir`` and
-            ``formatter``.
+        **kwargs:  Additional keyword arguments, valid options are ``base_log_dir``,
+            ``formatter``, ``background``, ``queue_size`` and ``overflow``.
             The default ``base_log_dir`` of 'logs' can be overridden if desired to have the logs
             placed in an alternate location.
             The default ``formatter`` can be overridden if desired by passing in an
             logging.Formatter instance.
+            ``background`` (default False) writes the log files from a background thread.
+            ``queue_size`` (default ``DEFAULT_QUEUE_SIZE``) is how many records can be queued
+            for it, and ``overflow`` (default 'block') one of ``OVERFLOW_POLICIES``.
 
     Returns:
         List[str]: log-file filenames that were created, or the empty list if none were created.
@@ -90,22 +131,27 @@ def setup_logging(log_name_prefix, *historical_log_dir_layers, **kwargs):
         logs_dir/some_layer/another_layer/YYYY-MM-DD_HH_MM_SS.FFFFFF/QET.master.log
             YYYY-MM-DD HH:MM:SS,FFF:CRITICAL:SOME LOGGER              :LOOK AT ME
     '''
-    # The following two kwargs can be moved into the function call once python 2 support is ended.
+    # The following kwargs can be moved into the function call once python 2 support is ended.
     base_log_dir = kwargs.get('base_log_dir', DEFAULT_LOG_DIRECTORY)
     formatter = kwargs.get('formatter', logging.Formatter(DEFAULT_FORMATTER_STRING))
+    background = kwargs.get('background', False) and _CAN_LOG_IN_BACKGROUND
+    overflow = kwargs.get('overflow', 'block')
+    if overflow not in OVERFLOW_POLICIES:
+        raise ValueError('overflow must be one of {}, not {!r}'.format(OVERFLOW_POLICIES, overflow))
 
     root_log = logging.getLogger('')
 
     result = []
 
     # Only add our own FileHandler loggers if none are already present.
-    if any(isinstance(x, logging.FileHandler) for x in root_log.handlers):
+    if any(isinstance(x, (logging.FileHandler, _OverflowQueueHandler)) for x in root_log.handlers):
         return result
 
     timestamp = '{:%Y%m%d_%H%M%S}'.format(datetime.now())
     timestamp_log_dir = os.path.join(*((base_log_dir,) + historical_log_dir_layers + (timestamp,)))
     master_log_filename = '{}.master.log'.format(log_name_prefix.lower())
 
+    log_handlers = []
     for dir_ in (timestamp_log_dir, base_log_dir):
         if not os.path.exists(dir_):
             os.makedirs(dir_)
@@ -117,6 +163,81 @@ def setup_logging(log_name_prefix, *historical_log_dir_layers, **kwargs):
         # Previous logs will still be available in their timestamped directories.
         log_handler = logging.FileHandler(log_filename, mode='w', encoding='UTF-8')
         log_handler.setFormatter(formatter)
+        log_handlers.append(log_handler)
+
+    if background:
+        queue_handler = _OverflowQueueHandler(
+            _queue.Queue(kwargs.get('queue_size', DEFAULT_QUEUE_SIZE)), overflow
+        )
+        listener = _QueueListener(queue_handler.queue, *log_handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append((listener, queue_handler))
+        log_handlers = [queue_handler]
+
+    for log_handler in log_handlers:
         root_log.addHandler(log_handler)
 
     return result
+
+
+def stop_background_logging():
+    '''
+    Stop the background logging threads started by ``setup_logging(..., background=True)``.
+
+    Each one's queue handler is removed from the root logger, and the records still queued are
+    written out before the thread stops, followed by a warning of how many records were dropped,
+    if any. This is registered to be called at exit, so it need only be called to make sure the
+    log files are complete before then (later records are no longer written to them).
+    '''
+    root_log = logging.getLogger('')
+    while _listeners:
+        listener, queue_handler = _listeners.pop()
+        root_log.removeHandler(queue_handler)
+        listener.stop()
+        if queue_handler.dropped:
+            record = logging.makeLogRecord({
+                'name': __name__,
+                'levelno': logging.WARNING,
+                'levelname': logging.getLevelName(logging.WARNING),
+                'msg': '{} log records were dropped because the logging queue was full'.format(
+                    queue_handler.dropped),
+            })
+            for log_handler in listener.handlers:
+                log_handler.handle(record)
+
+
+atexit.register(stop_background_logging)
+
+
+class _OverflowQueueHandler(QueueHandler):
+    '''A ``QueueHandler`` for a bounded queue, counting the records dropped when it is full.'''
+
+    def __init__(self, queue, overflow):
+        super(_OverflowQueueHandler, self).__init__(queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def enqueue(self, record):
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except _queue.Full:
+                self.dropped += 1
+                if self.overflow == 'drop':
+                    return
+            try:
+                self.queue.get_nowait()
+            except _queue.Empty:
+                # The listener emptied the queue in the meantime.
+                self.dropped -= 1
+
+
+class _QueueListener(QueueListener):
+    '''A ``QueueListener`` that waits for room in a full queue to stop, instead of raising.'''
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
@@ -1,3 +1,3 @@
-VERSION = (1, 1, 17)
+VERSION = (1, 1, 22)
 
 __version__ = '.'.join(map(str, VERSION))
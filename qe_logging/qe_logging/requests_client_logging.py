@@ -127,11 +127,11 @@ class RequestsLoggingClient(class_lookup.get('requests.Session', requests.Sessio
             # If the request fails for any reason log the request data causing the failure.
             self._get_logger(curl_logger).log_request(request_kwargs)
             raise
-        # Because request can be provided an iterable, the logging needs to occur after the
-        # request library is called to ensure the iterable is not expired before being
-        # utilized by the library. This can happen when uploading a large file where-in
-        # the file data is provided by a generator (for example). Fixing this code
-        # so that we can log early and not eat-up/expire the data is yet to come.
+        # The request is logged from the PreparedRequest that was sent (the first one, if
+        # there were redirects), so the body isn't prepared again: a streamed body (such as
+        # a file or a generator) isn't read twice, and large uploads aren't re-encoded.
+        sent_request = (response.history[0] if response.history else response).request
+        request_kwargs = dict(request_kwargs, prepared_request=sent_request)
         response = self.response_formatter(response)
         self._get_logger(curl_logger).log(request_kwargs, response)
         return response
@@ -10,10 +10,12 @@ try:
 except ImportError:
     # Python 2
     from funcsigs import signature as _signature
+import codecs
 import logging
 from types import MethodType
 
 import requests
+from requests.structures import CaseInsensitiveDict
 
 from qecommon_tools import list_from
 from qecommon_tools.http_helpers import is_status_code
@@ -21,9 +23,60 @@ from qecommon_tools.http_helpers import is_status_code
 
 DEFAULT_COMMAND = 'curl'
 
+try:
+    # Python 2
+    _TEXT_TYPES = (str, unicode)
+except NameError:
+    # Python 3
+    _TEXT_TYPES = (str,)
+
+TEXT_MEDIA_TYPE_PARTS = ['json', 'xml', 'javascript', 'x-www-form-urlencoded', 'yaml', 'csv']
+'''Media types with any of these in them are logged as text, as well as all of ``text/*``.'''
+
+
+def is_text_content_type(content_type):
+    '''
+    Whether a Content-Type header value is for text that can be logged.
+
+    A missing Content-Type is treated as text, since most APIs that leave it out send text.
+
+    Args:
+        content_type (str): The Content-Type header value (or None).
+
+    Returns:
+        bool: True for ``text/*`` and the media types matching ``TEXT_MEDIA_TYPE_PARTS``.
+    '''
+    if not content_type:
+        return True
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type.startswith('text/') or any(x in media_type for x in TEXT_MEDIA_TYPE_PARTS)
+
+
+def _decode(content):
+    return content.decode('utf-8', 'replace')
+
+
+def _truncated_content(content, max_bytes, tail_bytes):
+    '''
+    Return content decoded, with all but its first and last bytes cut out to fit max_bytes.
+
+    Args:
+        content (bytes): The full content.
+        max_bytes (int): How many bytes of the content to keep (all of it if None).
+        tail_bytes (int): How many of those bytes are taken from the end of the content.
+    '''
+    if max_bytes is None or len(content) <= max_bytes:
+        return _decode(content)
+    head_bytes = max_bytes - tail_bytes
+    tail_start = len(content) - tail_bytes
+    return '{}...<{} bytes omitted>...{}'.format(
+        _decode(content[:head_bytes]), len(content) - max_bytes, _decode(content[tail_start:])
+    )
+
 
 def curl_command_from(method=None, url=None, kwargs={}, exclude_params=[],
-                      override_headers=None, skip_headers=None, command=DEFAULT_COMMAND):
+                      override_headers=None, skip_headers=None, command=DEFAULT_COMMAND,
+                      prepared_request=None):
     '''
     Creates a curl command string from the request items provided.
 
@@ -38,6 +91,9 @@ def curl_command_from(method=None, url=None, kwargs={}, exclude_params=[],
         skip_headers (list): Excludes any matching keys and values in the ``kwargs['headers]`` from
             the curl.
         command (str):  The command to execute.  Defaults to ``default_command``
+        prepared_request (requests.PreparedRequest): The request as it was actually sent
+            (``response.request``). If supplied, the curl is built from it instead of
+            preparing ``method``, ``url`` and ``kwargs`` again.
 
     Returns:
         str: the curl command
@@ -50,7 +106,8 @@ def curl_command_from(method=None, url=None, kwargs={}, exclude_params=[],
             exclude_params=exclude_params,
             override_headers=override_headers,
             skip_headers=skip_headers,
-            command=command
+            command=command,
+            prepared_request=prepared_request,
         )
     )
 
@@ -59,11 +116,12 @@ class _RequestCurl(object):
     default_include_params = ['command', 'method', 'headers', 'data', 'url']
 
     def __init__(self, method=None, url=None, kwargs=None, exclude_params=None,
-                 override_headers=None, skip_headers=None, command=None):
-        self.override_headers = override_headers or {}
-        self.skip_headers = skip_headers or []
+                 override_headers=None, skip_headers=None, command=None, prepared_request=None):
+        # Header names are case-insensitive, so they are matched regardless of case.
+        self.override_headers = CaseInsensitiveDict(override_headers or {})
+        self.skip_headers = {x.lower() for x in skip_headers or []}
         self.command = command
-        self._request = self._prepare_request(method, url, kwargs)
+        self._request = prepared_request or self._prepare_request(method, url, kwargs)
         self.include_params = [x for x in self.default_include_params if x not in exclude_params]
 
     def __repr__(self):
@@ -78,22 +136,25 @@ class _RequestCurl(object):
     def _method_string(self):
         return {'GET': ''}.get(self._request.method, '-X {}'.format(self._request.method))
 
-    def _single_header(self, key, value):
-        if key in self.skip_headers:
-            return ''
-        value = self.override_headers.get(key, value)
-        return '-H "{}: {}"'.format(key, value)
+    def logged_headers(self):
+        '''The request's headers as they are logged: without skip_headers, with override_headers.'''
+        return [(key, self.override_headers.get(key, value))
+                for key, value in self._request.headers.items()
+                if key.lower() not in self.skip_headers]
 
     def _headers_string(self):
-        return ' '.join(
-            filter(None, [self._single_header(k, v) for k, v in self._request.headers.items()])
-        )
+        return ' '.join('-H "{}: {}"'.format(key, value) for key, value in self.logged_headers())
 
     def _data_string(self):
-        request = self._request
-        if not request.body:
+        body = self._request.body
+        if not body:
             return ''
-        body = request.body.decode('utf-8') if isinstance(request.body, bytes) else request.body
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', 'replace')
+        elif not isinstance(body, _TEXT_TYPES):
+            # A streamed body (a file or generator) has been read by sending it.
+            name = getattr(body, 'name', None)
+            return '--data-binary "@{}"'.format(name) if name else "-d '<streamed body>'"
         return "-d '{}'".format(body)
 
     def _url_string(self):
@@ -118,7 +179,8 @@ class RequestAndResponseLogger(object):
     A class that can be used to log request and response data from API calls.
 
     By default the entire request curl, response stats, response headers, and response content are
-    logged.
+    logged. All of it is logged at DEBUG level, so when the logger isn't enabled for DEBUG,
+    ``log_request`` and ``log_response`` return without rendering anything.
 
     Args:
         logger (logging.getLogger): A logger to use to record data.  If not provided defaults to
@@ -130,20 +192,55 @@ class RequestAndResponseLogger(object):
             in the curl for the request. Defaults to ``skip_headers``.
         override_headers (optional, dict): If supplied, headers present as keys in the dictionary
             will have their values replaced by the value in the dictionary
-            in the curl for the request.
+            in the curl for the request. These are added to ``override_headers``, so the
+            credentials it masks stay masked unless they are overridden here too.
+        max_content_bytes (optional, int): How many bytes of response content to log; longer
+            content has its middle cut out. Defaults to ``max_content_bytes``.
+        content_tail_bytes (optional, int): How many of the ``max_content_bytes`` are taken from
+            the end of the content. Defaults to half of them. A ValueError is raised if it is
+            negative or more than ``max_content_bytes``.
+        log_binary_content (optional, bool): Log response content even when its Content-Type
+            isn't text (see ``is_text_content_type``). Defaults to False.
+        stream_content (optional, bool): For responses requested with ``stream=True``, log the
+            content a chunk at a time as it is read, instead of reading it all in to log it.
+            Defaults to False.
 
     Note: The individual logging methods are exposed for the convenience of subclassing.
     '''
     default_logger_name = 'QE_requests'
     skip_headers = ['Connection', 'Accept-Encoding', 'Accept', 'User-Agent', 'Content-Length']
     '''Common headers we find annoying in the logs.'''
+    override_headers = {'Authorization': '$AUTHORIZATION', 'Cookie': '$COOKIE'}
+    '''
+    Headers whose values are replaced in the logs, as they hold credentials.
+
+    The request is logged as it was sent, so it includes the ``Authorization`` and ``Cookie``
+    headers a session adds (from its ``auth`` and cookies). Set this to an empty dictionary
+    in a subclass to log them as they were sent.
+    '''
+    max_content_bytes = None
+    '''How many bytes of response content are logged; None logs all of it.'''
 
     def __init__(self, logger=None, exclude_request_params=None, skip_headers=None,
-                 override_headers=None):
+                 override_headers=None, max_content_bytes=None, content_tail_bytes=None,
+                 log_binary_content=False, stream_content=False):
         self.logger = logger or logging.getLogger(self.default_logger_name)
         self.exclude_request_params = list_from(exclude_request_params)
         self.skip_headers = self.skip_headers if skip_headers is None else skip_headers
-        self.override_headers = {} if override_headers is None else override_headers
+        self.override_headers = dict(self.override_headers, **(override_headers or {}))
+        if max_content_bytes is not None:
+            self.max_content_bytes = max_content_bytes
+        if content_tail_bytes is None:
+            content_tail_bytes = (self.max_content_bytes or 0) // 2
+        if content_tail_bytes < 0:
+            raise ValueError('content_tail_bytes must not be negative, not {}'.format(
+                content_tail_bytes))
+        if self.max_content_bytes is not None and content_tail_bytes > self.max_content_bytes:
+            raise ValueError('content_tail_bytes ({}) must not be more than max_content_bytes ({})'
+                             .format(content_tail_bytes, self.max_content_bytes))
+        self.content_tail_bytes = content_tail_bytes
+        self.log_binary_content = log_binary_content
+        self.stream_content = stream_content
 
     def log_request(self, request_kwargs):
         '''
@@ -152,6 +249,8 @@ class RequestAndResponseLogger(object):
         Args:
             request_kwargs (dict): A dictionary of keyword arguments for the API call to log.
         '''
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
         kwargs = {'exclude_params': self.exclude_request_params,
                   'skip_headers': self.skip_headers,
                   'override_headers': self.override_headers,
@@ -168,8 +267,30 @@ class RequestAndResponseLogger(object):
         self.logger.debug('-->Response headers: {}'.format(response.headers))
 
     def log_response_content(self, response):
-        '''Log the the response content field'''
-        self.logger.debug('-->Response content: {}'.format(response.content.decode('utf-8')))
+        '''
+        Log the the response content field, cut down to ``max_content_bytes``.
+
+        Content that isn't text is not logged, unless ``log_binary_content`` is set.
+        With ``stream_content``, content that hasn't been read yet is logged as it is read.
+        '''
+        content_type = response.headers.get('Content-Type')
+        if not (self.log_binary_content or is_text_content_type(content_type)):
+            if response._content:
+                size = len(response._content)
+            else:
+                size = response.headers.get('Content-Length', 'an unknown number of')
+            self.logger.debug('-->Response content: <{} bytes of {} not logged>'.format(
+                size, content_type))
+            return
+        # requests leaves _content False until the content is read, as with stream=True.
+        if self.stream_content and response._content is False and response.raw is not None:
+            response.raw = _ContentLoggingStream(
+                response.raw, self.logger, self.max_content_bytes, self.content_tail_bytes
+            )
+            return
+        self.logger.debug('-->Response content: {}'.format(
+            _truncated_content(response.content, self.max_content_bytes, self.content_tail_bytes)
+        ))
 
     def log_response(self, response):
         '''
@@ -181,6 +302,8 @@ class RequestAndResponseLogger(object):
         Uses the response log methods so that simple overrides of those don't require
         this method to be overridden as well.
         '''
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
         self.log_response_status(response)
         self.log_response_headers(response)
         self.log_response_content(response)
@@ -197,6 +320,67 @@ class RequestAndResponseLogger(object):
         self.log_response(response)
 
 
+class _ContentLoggingStream(object):
+    '''
+    Wraps a response's ``raw`` stream to log the content as it is read.
+
+    The first bytes, up to the byte budget less the tail, are logged a chunk at a time as
+    they are read; only the tail is held, and it is logged once the stream is used up.
+    Everything else is passed through to the wrapped stream.
+    '''
+
+    def __init__(self, raw, logger, max_bytes, tail_bytes):
+        self._raw = raw
+        self._logger = logger
+        self._head_bytes = None if max_bytes is None else max_bytes - tail_bytes
+        self._tail_bytes = tail_bytes
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self._logged = 0
+        self._read = 0
+        self._tail = b''
+        self._finished = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def stream(self, *args, **kwargs):
+        for chunk in self._raw.stream(*args, **kwargs):
+            self._log_chunk(chunk)
+            yield chunk
+        self._finish()
+
+    def read(self, *args, **kwargs):
+        chunk = self._raw.read(*args, **kwargs)
+        if chunk:
+            self._log_chunk(chunk)
+        else:
+            self._finish()
+        return chunk
+
+    def _log_chunk(self, chunk):
+        self._read += len(chunk)
+        rest = chunk
+        if self._head_bytes is None or self._logged < self._head_bytes:
+            head = chunk if self._head_bytes is None else chunk[:self._head_bytes - self._logged]
+            self._logged += len(head)
+            rest = chunk[len(head):]
+            self._logger.debug('-->Response content: {}'.format(self._decoder.decode(head)))
+        if rest and self._tail_bytes:
+            self._tail = (self._tail + rest)[-self._tail_bytes:]
+
+    def _finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        omitted = self._read - self._logged - len(self._tail)
+        if omitted:
+            self._logger.debug('-->Response content: ...<{} bytes omitted>...{}'.format(
+                omitted, _decode(self._tail)))
+        elif self._tail:
+            self._logger.debug('-->Response content: {}'.format(_decode(self._tail)))
+        self._logger.debug('-->Response content: <{} bytes streamed>'.format(self._read))
+
+
 class IdentityLogger(RequestAndResponseLogger):
     '''
     For use with the Identity client.
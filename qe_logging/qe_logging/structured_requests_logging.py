@@ -0,0 +1,324 @@
+'''
+Structured logging of requests, as one JSON object per request and response.
+
+``StructuredRequestLogger`` can be used as the ``curl_logger`` of a ``RequestsLoggingClient``.
+Instead of logging the curl and response as text, it appends a record to a JSON-lines log
+(by default ``logs/requests.jsonl``), and only logs a one-line summary with the record's ID.
+Each record holds the request ID, timings, status, headers and sizes; the request and response
+bodies are appended to a side blob file (``<log>.blobs``) and the record keeps their offsets
+into it, so the log stays small and quick to search. An index file (``<log>.index``) maps each
+request ID to its record's place in the log, so one exchange can be read without scanning the
+log; the index itself is scanned line by line, but its lines are short.
+
+Several processes (such as ``pytest-xdist`` workers) can log to the same files: each record is
+written under an exclusive lock on the log file (``fcntl.flock``, or ``msvcrt.locking`` on
+Windows), and its offsets are taken from the files' sizes while the lock is held.
+
+The ``request-log`` command queries the log::
+
+    request-log logs/requests.jsonl list --status 500
+    request-log logs/requests.jsonl show 3f2a...
+    request-log logs/requests.jsonl body 3f2a... response > response.bin
+'''
+from __future__ import print_function
+import argparse
+from contextlib import contextmanager
+import io
+import json
+import os
+import sys
+import time
+from uuid import uuid4
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from qe_logging import DEFAULT_LOG_DIRECTORY
+from qe_logging.requests_logging import RequestAndResponseLogger, _RequestCurl, DEFAULT_COMMAND
+
+
+DEFAULT_LOG_PATH = os.path.join(DEFAULT_LOG_DIRECTORY, 'requests.jsonl')
+
+
+def blob_path(log_path):
+    '''The side file holding the request and response bodies of the log at log_path.'''
+    return '{}.blobs'.format(log_path)
+
+
+def index_path(log_path):
+    '''The index file of the log at log_path.'''
+    return '{}.index'.format(log_path)
+
+
+def _json_line(data):
+    return '{}\n'.format(json.dumps(data, sort_keys=True)).encode('utf-8')
+
+
+@contextmanager
+def _locked(locked_file):
+    '''Hold an exclusive lock on the open file, which other processes and threads wait for.'''
+    if fcntl is not None:
+        fcntl.flock(locked_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(locked_file.fileno(), fcntl.LOCK_UN)
+        return
+    # msvcrt locks a range of bytes from the current position, so the first byte stands in
+    # for the file; appended writes still go to the end of it.
+    locked_file.seek(0)
+    msvcrt.locking(locked_file.fileno(), msvcrt.LK_LOCK, 1)
+    try:
+        yield
+    finally:
+        locked_file.seek(0)
+        msvcrt.locking(locked_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _size(open_file):
+    return os.fstat(open_file.fileno()).st_size
+
+
+class StructuredRequestLogger(RequestAndResponseLogger):
+    '''
+    Logs each request and response as a JSON-lines record, with their bodies in a blob file.
+
+    Each record is a JSON object of:
+
+    * ``id``: a unique ID for the request, also logged in the one-line summary.
+    * ``started``: the Unix time the request was sent, and ``elapsed``: the seconds until
+      its response came (``response.elapsed``).
+    * ``method``, ``url`` and ``curl`` (the request as a curl command, as
+      ``RequestAndResponseLogger`` logs it, but without the body, which is in the blob file).
+    * ``request``: its ``headers``, ``size`` (in bytes) and ``body``.
+    * ``response``: its ``status``, ``reason``, ``headers``, ``size`` and ``body``, or None if
+      the request failed.
+
+    A ``body`` is the ``offset`` and ``length`` of the bytes in the blob file, and whether they
+    were ``truncated`` (to ``max_content_bytes``), or None if there was no body, it was excluded
+    (with ``exclude_request_params='data'``), or, for ``stream=True`` responses, it had not been
+    read yet.
+
+    Args:
+        logger (logging.getLogger): A logger for the one-line summaries.
+        log_path (str): The JSON-lines log file. Defaults to ``DEFAULT_LOG_PATH``.
+        **kwargs: The other ``RequestAndResponseLogger`` arguments.
+    '''
+    def __init__(self, logger=None, log_path=DEFAULT_LOG_PATH, **kwargs):
+        super(StructuredRequestLogger, self).__init__(logger=logger, **kwargs)
+        self.log_path = log_path
+        self.last_request_id = None
+        log_dir = os.path.dirname(log_path)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+    def log_request(self, request_kwargs):
+        '''Log a request that got no response, as a record with a ``response`` of None.'''
+        self._log_record(request_kwargs, None)
+
+    def log_response(self, response):
+        '''Log a response on its own, from the request it was sent with.'''
+        self._log_record({'prepared_request': response.request}, response)
+
+    def log(self, request_kwargs, response):
+        '''Log a request and its response as one record.'''
+        self._log_record(request_kwargs, response)
+
+    def _log_record(self, request_kwargs, response):
+        # The body is stored in the blob file (cut to max_content_bytes), not in the curl.
+        curl_kwargs = {'exclude_params': self.exclude_request_params + ['data'],
+                       'skip_headers': self.skip_headers,
+                       'override_headers': self.override_headers,
+                       'command': DEFAULT_COMMAND,
+                       }
+        curl_kwargs.update(request_kwargs)
+        curl = _RequestCurl(**curl_kwargs)
+        request = curl._request
+        request_body = _body_bytes(request.body)
+        record = {
+            'id': uuid4().hex,
+            'started': time.time(),
+            'elapsed': None,
+            'method': request.method,
+            'url': request.url,
+            'curl': str(curl),
+            'request': {'headers': dict(curl.logged_headers()),
+                        'size': None if request_body is None else len(request_body)},
+            'response': None,
+        }
+        if 'data' in self.exclude_request_params:
+            request_body = None
+        bodies = [('request', request_body)]
+        if response is not None:
+            record['elapsed'] = response.elapsed.total_seconds()
+            record['started'] -= record['elapsed']
+            # requests leaves _content False until the content is read, as with stream=True.
+            content = None if response._content is False else response.content
+            size = len(content) if content is not None else response.headers.get('Content-Length')
+            record['response'] = {'status': response.status_code,
+                                  'reason': response.reason,
+                                  'headers': dict(response.headers),
+                                  'size': None if size is None else int(size),
+                                  }
+            bodies.append(('response', content))
+
+        with self._open_files() as (log_file, blob_file, index_file), _locked(log_file):
+            for name, body in bodies:
+                record[name]['body'] = self._write_body(blob_file, body)
+            offset = _size(log_file)
+            line = _json_line(record)
+            log_file.write(line)
+            index_file.write(_json_line([record['id'], offset, len(line)]))
+        self.last_request_id = record['id']
+        self.logger.debug('-->{} {} -> {} (request {} in {})'.format(
+            record['method'], record['url'], response.status_code if response is not None else
+            'no response', record['id'], self.log_path))
+
+    @contextmanager
+    def _open_files(self):
+        # The files are appended to, so one log can hold the requests of several runs (or
+        # processes). They are unbuffered, so their sizes are the offsets of the next writes.
+        with io.open(self.log_path, 'ab', buffering=0) as log_file, \
+                io.open(blob_path(self.log_path), 'ab', buffering=0) as blob_file, \
+                io.open(index_path(self.log_path), 'ab', buffering=0) as index_file:
+            yield log_file, blob_file, index_file
+
+    def _write_body(self, blob_file, body):
+        if not body:
+            return None
+        stored = body if self.max_content_bytes is None else body[:self.max_content_bytes]
+        offset = _size(blob_file)
+        blob_file.write(stored)
+        return {'offset': offset, 'length': len(stored), 'truncated': len(stored) < len(body)}
+
+
+def _body_bytes(body):
+    '''A request body as bytes, or None if it was streamed (from a file or generator).'''
+    if body is None:
+        return b''
+    if isinstance(body, bytes):
+        return body
+    if isinstance(body, type(u'')):
+        return body.encode('utf-8')
+    return None
+
+
+def read_records(log_path):
+    '''Yield each record of the log, oldest first.'''
+    with io.open(log_path, 'rb') as log_file:
+        for line in log_file:
+            yield json.loads(line.decode('utf-8'))
+
+
+def find_record(log_path, request_id):
+    '''
+    Return the record of the request with the ID, or None if it isn't in the log.
+
+    The index file is scanned, line by line, for the record's offset, and only the record is
+    read from the log; only if there is no index file is the log itself scanned for it.
+    '''
+    if not os.path.exists(index_path(log_path)):
+        return next((x for x in read_records(log_path) if x['id'] == request_id), None)
+    with io.open(index_path(log_path), 'rb') as index_file:
+        for line in index_file:
+            record_id, offset, length = json.loads(line.decode('utf-8'))
+            if record_id == request_id:
+                break
+        else:
+            return None
+    with io.open(log_path, 'rb') as log_file:
+        log_file.seek(offset)
+        return json.loads(log_file.read(length).decode('utf-8'))
+
+
+def read_body(log_path, body):
+    '''Return the bytes of a record's request or response ``body`` (b'' if it is None).'''
+    if not body:
+        return b''
+    with io.open(blob_path(log_path), 'rb') as blob_file:
+        blob_file.seek(body['offset'])
+        return blob_file.read(body['length'])
+
+
+def _matches(record, args):
+    response = record['response'] or {}
+    return all([
+        args.method is None or record['method'] == args.method.upper(),
+        args.status is None or response.get('status') == args.status,
+        args.url_contains is None or args.url_contains in record['url'],
+    ])
+
+
+def _print_list(args):
+    for record in read_records(args.log):
+        if _matches(record, args):
+            status = record['response']['status'] if record['response'] else 'no response'
+            elapsed = '' if record['elapsed'] is None else '{:.3f}s'.format(record['elapsed'])
+            print('{}  {}  {} {}  {}'.format(record['id'], status, record['method'],
+                                             record['url'], elapsed).rstrip())
+
+
+def _print_show(args):
+    record = find_record(args.log, args.request_id)
+    if record is None:
+        sys.exit('No request {} in {}'.format(args.request_id, args.log))
+    print(record['curl'])
+    request_body = read_body(args.log, record['request']['body'])
+    if request_body:
+        print('-->Request body: {}'.format(request_body.decode('utf-8', 'replace')))
+    response = record['response']
+    if response is None:
+        print('-->No response')
+        return
+    print('-->Response status:  {} {}'.format(response['status'], response['reason']))
+    print('-->Response headers: {}'.format(response['headers']))
+    print('-->Response content: {}'.format(
+        read_body(args.log, response['body']).decode('utf-8', 'replace')))
+
+
+def _write_body(args):
+    record = find_record(args.log, args.request_id)
+    if record is None:
+        sys.exit('No request {} in {}'.format(args.request_id, args.log))
+    part = record[args.part] or {}
+    body = read_body(args.log, part.get('body'))
+    getattr(sys.stdout, 'buffer', sys.stdout).write(body)
+
+
+def _get_parser():
+    parser = argparse.ArgumentParser(
+        description='Query a structured request log written by StructuredRequestLogger.')
+    parser.add_argument('log', help='The JSON-lines request log file')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    list_parser = subparsers.add_parser('list', help='List the logged requests')
+    list_parser.add_argument('--method', default=None, help='Only list requests of this method')
+    list_parser.add_argument('--status', type=int, default=None,
+                             help='Only list requests with this response status')
+    list_parser.add_argument('--url-contains', default=None,
+                             help='Only list requests whose URL contains this')
+    list_parser.set_defaults(func=_print_list)
+
+    show_parser = subparsers.add_parser('show', help='Show the full exchange of one request')
+    show_parser.add_argument('request_id', help='The ID of the request')
+    show_parser.set_defaults(func=_print_show)
+
+    body_parser = subparsers.add_parser(
+        'body', help='Write the raw request or response body of one request to stdout')
+    body_parser.add_argument('request_id', help='The ID of the request')
+    body_parser.add_argument('part', choices=['request', 'response'], help='Which body to write')
+    body_parser.set_defaults(func=_write_body)
+    return parser
+
+
+def main():
+    args = _get_parser().parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
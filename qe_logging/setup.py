@@ -6,6 +6,7 @@ DESCRIPTION = 'QE logging setup'
 VERSION = None
 
 CONSOLE_SCRIPTS = [
+    'request-log=qe_logging.structured_requests_logging:main',
 ]
 
 INSTALL_REQUIRES = [
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+'''
+Measure the per-request overhead of RequestsLoggingClient logging, with logging off and on.
+
+Usage: python benchmark_request_logging.py [--requests N] [--body-keys N] [--rounds N]
+
+Requests are answered by a ``requests_mock`` adapter, so no network time is included.
+Each request sends a JSON body of ``--body-keys`` keys and gets one back. The cases are
+timed in turn for ``--rounds`` rounds, and the best time of each is reported:
+
+* ``requests.Session``: the same requests without any logging client, as the baseline.
+* ``logging off``: ``RequestsLoggingClient`` with its logger above DEBUG.
+* ``logging off (unguarded)``: the same, with ``log_request`` and ``log_response`` as they
+  were before they checked the logger's level, so the curl command and response are still
+  rendered, then dropped.
+* ``logging on``: ``RequestsLoggingClient`` logging at DEBUG to a stream handler (writing
+  to ``os.devnull``).
+'''
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import time
+
+import requests
+import requests_mock
+
+from qe_logging.requests_client_logging import RequestsLoggingClient
+from qe_logging.requests_logging import RequestAndResponseLogger, curl_command_from
+
+URL = 'mock://benchmark.test/items'
+
+
+class UnguardedLogger(RequestAndResponseLogger):
+    '''``RequestAndResponseLogger`` rendering everything whether or not DEBUG is enabled.'''
+
+    def log_request(self, request_kwargs):
+        kwargs = {'exclude_params': self.exclude_request_params,
+                  'skip_headers': self.skip_headers,
+                  'override_headers': self.override_headers,
+                  }
+        kwargs.update(request_kwargs)
+        self.logger.debug(curl_command_from(**kwargs))
+
+    def log_response(self, response):
+        self.log_response_status(response)
+        self.log_response_headers(response)
+        self.log_response_content(response)
+
+
+def _mocked(session, body):
+    adapter = requests_mock.Adapter()
+    adapter.register_uri('POST', URL, json=body, status_code=201)
+    session.mount('mock', adapter)
+    return session
+
+
+def _time_requests(session, body, count):
+    start = time.time()
+    for _ in range(count):
+        session.post(URL, json=body)
+    return (time.time() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000,
+                        help='The number of requests to time for each case')
+    parser.add_argument('--body-keys', type=int, default=50,
+                        help='The number of keys in the JSON request and response bodies')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='The number of times to time each case')
+    args = parser.parse_args()
+
+    body = {'key_{}'.format(x): 'value {}'.format(x) * 4 for x in range(args.body_keys)}
+    logger = logging.getLogger(RequestsLoggingClient._logger.name)
+    logger.propagate = False
+    log_stream = open(os.devnull, 'w')
+    logger.addHandler(logging.StreamHandler(log_stream))
+
+    cases = [
+        ('requests.Session', requests.Session(), logging.WARNING),
+        ('logging off', RequestsLoggingClient(), logging.WARNING),
+        ('logging off (unguarded)', RequestsLoggingClient(curl_logger=UnguardedLogger),
+         logging.WARNING),
+        ('logging on', RequestsLoggingClient(), logging.DEBUG),
+    ]
+    best = {}
+    for _ in range(args.rounds):
+        for label, session, level in cases:
+            logger.setLevel(level)
+            seconds = _time_requests(_mocked(session, body), body, args.requests)
+            best[label] = min(seconds, best.get(label, seconds))
+    baseline = best['requests.Session']
+    for label, _, _ in cases:
+        seconds = best[label]
+        print('{:<24} {:8.1f} us/request ({:+7.1f} us over requests.Session)'.format(
+            label + ':', seconds * 1e6, (seconds - baseline) * 1e6))
+    log_stream.close()
+
+
+if __name__ == '__main__':
+    main()
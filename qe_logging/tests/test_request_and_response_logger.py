@@ -13,7 +13,7 @@ import requests
 import requests_mock
 
 
-from qe_logging import setup_logging
+from qe_logging import setup_logging, requests_logging
 from qe_logging.requests_logging import (
     IdentityLogger,
     RequestAndResponseLogger,
@@ -104,6 +104,25 @@ adapter.register_uri(
     json=single_item_random_dict(),
 )
 
+LARGE_CONTENT_HEAD = 'head-' * 20
+LARGE_CONTENT_MIDDLE = 'middle-' * 2000
+LARGE_CONTENT_TAIL = '-tail' * 10
+adapter.register_uri(
+    'GET',
+    'mock://test.com/large',
+    status_code=200,
+    headers={'Content-Type': 'text/plain'},
+    text=LARGE_CONTENT_HEAD + LARGE_CONTENT_MIDDLE + LARGE_CONTENT_TAIL,
+)
+BINARY_CONTENT = b'\x89PNG\r\n\x1a\n' + bytes(bytearray(range(256)))
+adapter.register_uri(
+    'GET',
+    'mock://test.com/image',
+    status_code=200,
+    headers={'Content-Type': 'image/png'},
+    content=BINARY_CONTENT,
+)
+
 
 def requests_to_test():
     return [
@@ -393,3 +412,100 @@ def test_last_only_logger(log_dir, test_request, test_resp):
     for request_data, response in requests_and_responses_that_should_not_be_logged:
         for value in [response.text, request_data['url'], request_data['method']]:
             not_in(value, log_contents, msg='Value should not have been logged. ')
+
+
+class RenderRecordingLogger(RequestAndResponseLogger):
+    '''Records the response parts it is asked to render, instead of logging them.'''
+
+    def __init__(self, **kwargs):
+        super(RenderRecordingLogger, self).__init__(**kwargs)
+        self.rendered = []
+
+    def log_response_status(self, response):
+        self.rendered.append('status')
+
+    def log_response_headers(self, response):
+        self.rendered.append('headers')
+
+    def log_response_content(self, response):
+        self.rendered.append('content')
+
+
+@pytest.mark.parametrize('level,expected_rendered', [
+    (logging.INFO, []),
+    (logging.DEBUG, ['curl', 'status', 'headers', 'content']),
+])
+def test_request_and_response_are_only_rendered_when_debug_is_enabled(monkeypatch, level,
+                                                                      expected_rendered):
+    logger = logging.getLogger(generate_random_string())
+    logger.setLevel(level)
+    curl_logger = RenderRecordingLogger(logger=logger)
+
+    def recording_curl_command_from(**kwargs):
+        curl_logger.rendered.append('curl')
+        return ''
+
+    monkeypatch.setattr(requests_logging, 'curl_command_from', recording_curl_command_from)
+    curl_logger.log(requests_to_test()[0], responses_to_test()[0])
+    assert curl_logger.rendered == expected_rendered
+
+
+def _verify_large_content_truncated(log_contents):
+    for value in [LARGE_CONTENT_HEAD, LARGE_CONTENT_TAIL,
+                  '<{} bytes omitted>'.format(len(LARGE_CONTENT_MIDDLE))]:
+        assert value in log_contents, '{}{}'.format(ROOT_MSG.format(log_contents), value)
+    not_in(LARGE_CONTENT_MIDDLE[:20], log_contents, msg='Value should not have been logged. ')
+
+
+def test_response_content_is_cut_to_max_content_bytes(log_dir):
+    request = {'url': 'mock://test.com/large', 'method': 'GET'}
+    response = session.get('mock://test.com/large')
+
+    log_contents = _setup_log_and_get_contents(
+        log_dir, request, response,
+        max_content_bytes=len(LARGE_CONTENT_HEAD) + len(LARGE_CONTENT_TAIL),
+        content_tail_bytes=len(LARGE_CONTENT_TAIL),
+    )
+    _verify_large_content_truncated(log_contents)
+
+
+@pytest.mark.parametrize('log_binary_content', [False, True])
+def test_binary_response_content_is_not_logged(log_dir, log_binary_content):
+    request = {'url': 'mock://test.com/image', 'method': 'GET'}
+    response = session.get('mock://test.com/image')
+
+    log_contents = _setup_log_and_get_contents(
+        log_dir, request, response, log_binary_content=log_binary_content
+    )
+    skipped = '<{} bytes of image/png not logged>'.format(len(BINARY_CONTENT))
+    if log_binary_content:
+        assert 'PNG' in log_contents
+        not_in(skipped, log_contents, msg='Value should not have been logged. ')
+    else:
+        assert skipped in log_contents, '{}{}'.format(ROOT_MSG.format(log_contents), skipped)
+
+
+def test_streamed_response_content_is_logged_as_it_is_read(log_dir):
+    log_file = _setup_logging(log_dir)
+    curl_logger = RequestAndResponseLogger(
+        max_content_bytes=len(LARGE_CONTENT_HEAD) + len(LARGE_CONTENT_TAIL),
+        content_tail_bytes=len(LARGE_CONTENT_TAIL),
+        stream_content=True,
+    )
+    response = session.get('mock://test.com/large', stream=True)
+    curl_logger.log({'url': 'mock://test.com/large', 'method': 'GET'}, response)
+    not_in(LARGE_CONTENT_HEAD, get_file_contents(log_file),
+           msg='Content should not have been logged before it was read. ')
+
+    content = b''.join(response.iter_content(chunk_size=1000))
+    assert content.decode('utf-8') == LARGE_CONTENT_HEAD + LARGE_CONTENT_MIDDLE + LARGE_CONTENT_TAIL
+
+    log_contents = get_file_contents(log_file)
+    _verify_large_content_truncated(log_contents)
+    assert '<{} bytes streamed>'.format(len(content)) in log_contents
+
+
+@pytest.mark.parametrize('content_tail_bytes', [-1, 11])
+def test_content_tail_bytes_must_fit_in_max_content_bytes(content_tail_bytes):
+    with pytest.raises(ValueError):
+        RequestAndResponseLogger(max_content_bytes=10, content_tail_bytes=content_tail_bytes)
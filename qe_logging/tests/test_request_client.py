@@ -23,6 +23,7 @@ from qe_logging.requests_client_logging import (RequestsLoggingClient,
                                                 XAuthTokenRequestsLoggingClient,
                                                 BasicAuthRequestsLoggingClient)
 from qe_logging.requests_logging import (
+    _RequestCurl,
     RequestAndResponseLogger,
     NoResponseContentLogger,
     NoRequestDataNoResponseContentLogger,
@@ -257,6 +258,25 @@ def test_base_url_override(log_dir, client_class, client_class_kwargs, request_i
         assert_in(value, log_contents, field_name)
 
 
+@pytest.mark.parametrize('client_class, client_class_kwargs, request_item',
+                         _clients_and_requests_combinations)
+def test_streamed_request_body_is_logged_from_the_sent_request(log_dir, monkeypatch, client_class,
+                                                               client_class_kwargs, request_item):
+    '''The request is logged as it was sent, without preparing it (and its body) again.'''
+    def prepare_request(*args):
+        raise AssertionError('The request was prepared again for logging')
+
+    monkeypatch.setattr(_RequestCurl, '_prepare_request', prepare_request)
+    session = _make_session(client_class, client_class_kwargs)
+    log_file = _setup_logging(log_dir)
+    response = getattr(session, request_item.method.lower())(
+        request_item.url, data=(x for x in [b'streamed ', b'chunks']))
+
+    log_contents = get_file_contents(log_file)
+    assert_in("-d '<streamed body>'", log_contents, 'streamed body')
+    assert_in(response.request.url, log_contents, 'request URL')
+
+
 def _curl_logger_kwargs_to_test():
     classes_to_test = [
         RequestAndResponseLogger, NoResponseContentLogger, NoRequestDataNoResponseContentLogger
@@ -330,3 +350,23 @@ def test_basic_auth_client_can_use_overridden_authentication(log_dir, request_it
     # and make sure the auth values are different.
     _, _, response = _make_request(log_dir, session, request_item)
     assert _get_basic_auth_header(response) != _get_basic_auth_header(override_response)
+
+
+SESSION_COOKIE = generate_random_string(prefix='cookie-', size=25)
+
+
+@pytest.mark.parametrize(
+    'request_item,logger_kwargs', product(REQUESTS_TO_TEST, [{}, {'override_headers': {'A': 'B'}}])
+)
+def test_session_auth_headers_are_masked_in_logs(log_dir, request_item, logger_kwargs):
+    '''The Authorization and Cookie headers a session adds to the sent request are not logged.'''
+    session = _make_session(BasicAuthRequestsLoggingClient, BASIC_AUTH_CLIENT_KWARGS,
+                            with_logger=RequestAndResponseLogger(**logger_kwargs))
+    session.cookies.set('session', SESSION_COOKIE)
+    log_contents, _, response = _make_request(log_dir, session, request_item)
+
+    assert SESSION_COOKIE in response.request.headers['Cookie']
+    for secret in [_get_basic_auth_header(response), SESSION_COOKIE]:
+        assert_not_in(secret, log_contents, 'credential')
+    assert_in('-H "Authorization: $AUTHORIZATION"', log_contents, 'masked Authorization header')
+    assert_in('-H "Cookie: $COOKIE"', log_contents, 'masked Cookie header')
@@ -4,6 +4,7 @@ from random import choice
 import json
 import pytest
 from qecommon_tools import format_if, generate_random_string
+import requests
 from qe_logging.requests_logging import curl_command_from
 
 
@@ -175,3 +176,35 @@ def test_curl_with_all_items(url, method, payload, headers):
     for expected_items in expected_curl_parts:
         for expected in expected_items:
             assert expected in curl, '{} does not contain {}'.format(curl, expected)
+
+
+def _prepared(method, url, **kwargs):
+    prepared_request = requests.models.PreparedRequest()
+    prepared_request.prepare(method=method, url=url, **kwargs)
+    return prepared_request
+
+
+@pytest.mark.parametrize(
+    'url,method,payload,headers',
+    product(_urls_to_test(), _methods_to_test(), _payloads_to_test(), _headers_to_test())
+)
+def test_curl_from_prepared_request_matches_curl_from_kwargs(url, method, payload, headers):
+    payload['headers'] = headers
+    curl = _request_curl_with_defaults(method=method, url=url, kwargs=payload)
+    prepared_curl = curl_command_from(prepared_request=_prepared(method, url, **payload))
+    assert prepared_curl == curl
+
+
+def test_curl_from_prepared_request_with_streamed_body():
+    prepared_request = _prepared(DEFAULT_METHOD, DEFAULT_URL, data=(x for x in [b'a', b'b']))
+    curl = curl_command_from(prepared_request=prepared_request)
+    assert "-d '<streamed body>'" in curl
+
+
+def test_curl_from_prepared_request_with_file_body(tmpdir):
+    upload = tmpdir.join('upload.bin')
+    upload.write_binary(b'\x00\x01')
+    with upload.open('rb') as upload_file:
+        curl = curl_command_from(prepared_request=_prepared(DEFAULT_METHOD, DEFAULT_URL,
+                                                            data=upload_file))
+    assert '--data-binary "@{}"'.format(upload) in curl
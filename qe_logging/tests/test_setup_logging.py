@@ -29,6 +29,7 @@ def log_dir(request):
 
 def teardown_function():
     # Handlers must be cleared or they will cause interference with other tests.
+    qe_logging.stop_background_logging()
     del logging.getLogger('').handlers[:]
 
 
@@ -74,6 +75,63 @@ def test_log_files_contain_data(log_dir, message, log_name_prefix, log_layers):
         assert message in file_contents, msg
 
 
+needs_queue_listener = pytest.mark.skipif(not qe_logging._CAN_LOG_IN_BACKGROUND,
+                                          reason='Python 2 logs in the foreground only')
+
+
+@needs_queue_listener
+@pytest.mark.parametrize('overflow', qe_logging.OVERFLOW_POLICIES)
+def test_background_log_files_contain_data(log_dir, overflow):
+    log_filenames = qe_logging.setup_logging('qe', base_log_dir=log_dir, background=True,
+                                             overflow=overflow)
+    root_handlers = logging.getLogger('').handlers
+    assert not any(isinstance(x, logging.FileHandler) for x in root_handlers), \
+        'The log files should be written by the background thread, not the root logger'
+    assert qe_logging.setup_logging('qe', base_log_dir=log_dir, background=True) == [], \
+        'Background logging should only be set up once'
+
+    for message in LOG_MESSAGES:
+        logging.critical(message)
+    qe_logging.stop_background_logging()
+
+    for log_filename in log_filenames:
+        file_contents = _get_file_contents(log_filename)
+        for message in LOG_MESSAGES:
+            msg = '{} not found in log file {}, actual contents {}'.format(
+                message, log_filename, file_contents)
+            assert message in file_contents, msg
+
+
+@needs_queue_listener
+@pytest.mark.parametrize('overflow,expected_messages', [
+    ('drop', ['first']),
+    ('drop_oldest', ['third']),
+])
+def test_full_logging_queue_drops_records(overflow, expected_messages):
+    # No listener is reading the queue, so it stays full after the first record.
+    handler = qe_logging._OverflowQueueHandler(qe_logging._queue.Queue(1), overflow)
+    logger = logging.getLogger('test_full_logging_queue_drops_records_{}'.format(overflow))
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for message in ['first', 'second', 'third']:
+            logger.critical(message)
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    queued = []
+    while not handler.queue.empty():
+        queued.append(handler.queue.get_nowait().getMessage())
+    assert queued == expected_messages
+    assert handler.dropped == 2
+
+
+def test_unknown_overflow_policy_is_rejected(log_dir):
+    with pytest.raises(ValueError):
+        qe_logging.setup_logging('qe', base_log_dir=log_dir, background=True, overflow='spill')
+
+
 def test_unconfigured_logging_generates_output():
     output = subprocess.check_output([NO_LOG_TEST_HELPER], stderr=subprocess.STDOUT)
     assert output, 'Expected logging out with no configuration setup at all'
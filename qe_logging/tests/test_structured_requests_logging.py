@@ -0,0 +1,172 @@
+import json
+from multiprocessing import Pool
+import sys
+
+import pytest
+import requests
+import requests_mock
+
+from qecommon_tools import generate_random_string
+from qe_logging.requests_client_logging import RequestsLoggingClient
+from qe_logging.structured_requests_logging import (
+    StructuredRequestLogger,
+    find_record,
+    index_path,
+    main,
+    read_body,
+    read_records,
+)
+
+
+RESPONSE_DATA = {generate_random_string(): generate_random_string()}
+REQUEST_DATA = {generate_random_string(): generate_random_string()}
+
+
+@pytest.fixture
+def log_path(tmpdir):
+    return str(tmpdir.join('logs', 'requests.jsonl'))
+
+
+def _mock_client():
+    client = RequestsLoggingClient()
+    adapter = requests_mock.Adapter()
+    adapter.register_uri('POST', 'mock://test.com/created', status_code=201, json=RESPONSE_DATA)
+    adapter.register_uri('GET', 'mock://test.com/missing', status_code=404, text='Not here')
+    adapter.register_uri('GET', 'mock://test.com/down', exc=requests.exceptions.ConnectTimeout)
+    client.mount('mock', adapter)
+    return client
+
+
+@pytest.fixture
+def client():
+    return _mock_client()
+
+
+def _post(client, curl_logger):
+    client.post('mock://test.com/created', json=REQUEST_DATA, curl_logger=curl_logger)
+    return curl_logger.last_request_id
+
+
+def test_request_and_response_are_logged_as_one_record(client, log_path):
+    curl_logger = StructuredRequestLogger(log_path=log_path)
+    request_id = _post(client, curl_logger)
+
+    record, = read_records(log_path)
+    assert record['id'] == request_id
+    assert record['method'] == 'POST'
+    assert record['url'] == 'mock://test.com/created'
+    assert record['curl'].startswith('curl -X POST')
+    assert record['elapsed'] >= 0
+    assert record['response']['status'] == 201
+    request_body = read_body(log_path, record['request']['body'])
+    assert json.loads(request_body.decode('utf-8')) == REQUEST_DATA
+    assert record['request']['size'] == len(request_body)
+    response_body = read_body(log_path, record['response']['body'])
+    assert json.loads(response_body.decode('utf-8')) == RESPONSE_DATA
+    assert record['response']['size'] == len(response_body)
+
+
+def test_records_are_found_through_the_index(client, log_path):
+    curl_logger = StructuredRequestLogger(log_path=log_path)
+    request_ids = [_post(client, curl_logger) for _ in range(3)]
+    client.get('mock://test.com/missing', curl_logger=curl_logger)
+
+    with open(index_path(log_path)) as index_file:
+        assert len(index_file.readlines()) == 4
+    for request_id in request_ids:
+        assert find_record(log_path, request_id)['id'] == request_id
+    assert find_record(log_path, 'not-a-request-id') is None
+
+
+def _log_requests(log_path):
+    client = _mock_client()
+    curl_logger = StructuredRequestLogger(log_path=log_path)
+    return [_post(client, curl_logger) for _ in range(20)]
+
+
+def test_processes_can_log_to_the_same_files(log_path):
+    StructuredRequestLogger(log_path=log_path)  # Create the log directory up front.
+    pool = Pool(4)
+    try:
+        request_ids = sum(pool.map(_log_requests, [log_path] * 4), [])
+    finally:
+        pool.close()
+        pool.join()
+
+    assert sorted(x['id'] for x in read_records(log_path)) == sorted(request_ids)
+    for request_id in request_ids:
+        record = find_record(log_path, request_id)
+        assert record['id'] == request_id
+        request_body = read_body(log_path, record['request']['body'])
+        assert json.loads(request_body.decode('utf-8')) == REQUEST_DATA
+
+
+def test_failed_request_is_logged_without_a_response(client, log_path):
+    curl_logger = StructuredRequestLogger(log_path=log_path)
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        client.get('mock://test.com/down', curl_logger=curl_logger)
+
+    record = find_record(log_path, curl_logger.last_request_id)
+    assert record['url'] == 'mock://test.com/down'
+    assert record['response'] is None
+
+
+def test_excluded_request_data_is_not_logged(client, log_path):
+    curl_logger = StructuredRequestLogger(log_path=log_path, exclude_request_params='data')
+    record = find_record(log_path, _post(client, curl_logger))
+
+    assert record['request']['body'] is None
+    assert list(REQUEST_DATA)[0] not in record['curl']
+
+
+def test_session_auth_headers_are_masked(client, log_path):
+    client.auth = ('user', 'not-for-the-logs')
+    client.cookies.set('session', 'not-for-the-logs-either')
+    curl_logger = StructuredRequestLogger(log_path=log_path)
+    record = find_record(log_path, _post(client, curl_logger))
+
+    assert record['request']['headers']['Authorization'] == '$AUTHORIZATION'
+    assert record['request']['headers']['Cookie'] == '$COOKIE'
+    with open(log_path) as log_file:
+        assert 'not-for-the-logs' not in log_file.read()
+
+
+def test_stored_bodies_are_cut_to_max_content_bytes(client, log_path):
+    curl_logger = StructuredRequestLogger(log_path=log_path, max_content_bytes=5)
+    record = find_record(log_path, _post(client, curl_logger))
+
+    body = record['response']['body']
+    assert body['truncated']
+    assert len(read_body(log_path, body)) == 5
+    assert record['response']['size'] > 5
+
+
+def test_large_request_bodies_are_kept_out_of_the_log(client, log_path):
+    curl_logger = StructuredRequestLogger(log_path=log_path, max_content_bytes=10)
+    client.post('mock://test.com/created', data='x' * 5000, curl_logger=curl_logger)
+
+    with open(log_path) as log_file:
+        line = log_file.read()
+    assert 'x' * 10 not in line
+    assert len(line) < 1000
+    record = find_record(log_path, curl_logger.last_request_id)
+    assert record['request']['size'] == 5000
+    assert read_body(log_path, record['request']['body']) == b'x' * 10
+
+
+def test_request_log_command_shows_one_exchange(client, log_path, monkeypatch, capsys):
+    curl_logger = StructuredRequestLogger(log_path=log_path)
+    request_id = _post(client, curl_logger)
+    client.get('mock://test.com/missing', curl_logger=curl_logger)
+
+    monkeypatch.setattr(sys, 'argv', ['request-log', log_path, 'list', '--status', '404'])
+    main()
+    listed = capsys.readouterr().out
+    assert 'mock://test.com/missing' in listed
+    assert request_id not in listed
+
+    monkeypatch.setattr(sys, 'argv', ['request-log', log_path, 'show', request_id])
+    main()
+    shown = capsys.readouterr().out
+    assert '-->Response status:  201' in shown
+    assert list(RESPONSE_DATA.values())[0] in shown
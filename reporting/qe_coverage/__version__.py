@@ -1,3 +1,3 @@
-VERSION = (1, 8, 2)
+VERSION = (1, 28, 0)
 
 __version__ = '.'.join(map(str, VERSION))
@@ -1,12 +1,16 @@
 #!/usr/bin/env python
 from __future__ import print_function
 import argparse
-from collections import defaultdict, namedtuple, Counter
+from collections import namedtuple, OrderedDict
 from contextlib import closing
 import csv
 import datetime
-from itertools import chain
+import gzip
+import hashlib
+from io import BytesIO
+from itertools import chain, islice
 import json
+import operator
 import os
 import re
 import socket
@@ -17,6 +21,14 @@ try:
     from urllib import parse
 except ImportError:
     import urlparse as parse
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+try:
+    from sys import intern
+except ImportError:
+    pass  # Python 2 has intern as a builtin
 
 import attr
 import requests
@@ -33,13 +45,16 @@ requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
 
 NO_STATUS_TICKET_KEY = 'Tickets'
+STRUCTURED_ATTRIBUTE_NAMES = ('Categories', 'Projects')
 HIERARCHY_DELIMITER = '::'
 HIERARCHY_FORMAT = '<TEAM_NAME>{}<PRODUCT_NAME>'.format(HIERARCHY_DELIMITER)
 TAG_DEFINITION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'coverage.rst')
 COVERAGE_REPORT_FILE = '{product_name}_coverage_report_{time_stamp}.{ext}'
+UPLOAD_SETTINGS_EXT = 'upload.json'
 COVERAGE_URL_TEMPLATE = 'https://{}data-broker.analytics.rackspace.net/coverage'
 COVERAGE_STAGING_URL = COVERAGE_URL_TEMPLATE.format('staging.')
 COVERAGE_PRODUCTION_URL = COVERAGE_URL_TEMPLATE.format('')
+UPLOAD_RETRY_STATUS_CODES = frozenset([500, 502, 503, 504])
 TICKET_RE_PATTERNS = {
     'JIRA': re.compile('([A-Z][A-Z]+-[0-9]+)'),
     'SNOW': re.compile('([A-Z][A-Z]+[0-9]+)'),
@@ -54,26 +69,355 @@ def check_ticket_type(tag):
     return None
 
 
+@attr.s(frozen=True)
+class PrescriptiveAttribute(object):
+    '''
+    The pre-computed tag data for a single prescriptive attribute table.
+
+    Args:
+        name: the name of the attribute (the table's section header)
+        valid_tags: the non-default tags of the table, in table order
+        report_as: a dictionary of each valid tag to its 'report as' value
+        default_value: the 'report as' value of the table's default row, if any
+    '''
+    name = attr.ib()
+    valid_tags = attr.ib()
+    report_as = attr.ib()
+    default_value = attr.ib(default='')
+
+    @classmethod
+    def from_table(cls, name, table):
+        valid_rows = table.exclude_by(tag='')
+        default_value = table.matches_all(tag='').get_fields('report_as')
+        return cls(name=name,
+                   valid_tags=valid_rows.get_fields('tag'),
+                   report_as=dict(valid_rows.get_fields('tag', 'report_as')),
+                   default_value=default_value[0] if default_value else '')
+
+    @property
+    def tag_set(self):
+        return frozenset(self.report_as)
+
+
+@attr.s(frozen=True)
+class TagCatalog(object):
+    '''
+    A hash-indexed view of the coverage tables, built once so tag lookups don't scan the tables.
+
+    Args:
+        prescriptives: a tuple of PrescriptiveAttribute objects, in coverage table order
+        status_report_as: a dictionary of each status tag to its 'report as' value
+    '''
+    # The most normalize_tag results remembered, so a stream of distinct tags can't grow it forever.
+    NORMALIZED_CACHE_SIZE = 100000
+
+    prescriptives = attr.ib()
+    status_report_as = attr.ib()
+    _tag_sets = attr.ib(init=False, repr=False)
+    prescriptive_tags = attr.ib(init=False, repr=False)
+    _prescriptive_order = attr.ib(init=False, repr=False)
+    prescriptive_names = attr.ib(init=False, repr=False)
+    prescriptive_index = attr.ib(init=False, repr=False)
+    _normalized = attr.ib(init=False, repr=False)
+    _shared_values = attr.ib(init=False, repr=False)
+
+    def __attrs_post_init__(self):
+        # Frozen classes can only set derived values via object.__setattr__
+        object.__setattr__(self, '_tag_sets', tuple(x.tag_set for x in self.prescriptives))
+        object.__setattr__(self, 'prescriptive_tags',
+                           tuple(tag for x in self.prescriptives for tag in x.valid_tags))
+        order = {}
+        for index, tag in enumerate(self.prescriptive_tags):
+            order.setdefault(tag, index)
+        object.__setattr__(self, '_prescriptive_order', order)
+        names = tuple(x.name for x in self.prescriptives)
+        object.__setattr__(self, 'prescriptive_names', names)
+        object.__setattr__(self, 'prescriptive_index', {x: i for i, x in enumerate(names)})
+        object.__setattr__(self, '_normalized', {})
+        object.__setattr__(self, '_shared_values', {})
+
+    @classmethod
+    def from_tables(cls, tables):
+        # The first coverage tables lists all the attributes, so to find the prescriptive tables,
+        # we can skip this table and use the remaining ones.
+        prescriptives = tuple(PrescriptiveAttribute.from_table(name, tables[name])
+                              for name in tables.tables[1:])
+        status_table = tables['Status'].exclude_by(tag='')
+        return cls(prescriptives=prescriptives,
+                   status_report_as=dict(status_table.get_fields('tag', 'report_as')))
+
+    @property
+    def status_tags(self):
+        return frozenset(self.status_report_as)
+
+    @property
+    def ticket_status_display_names(self):
+        return [NO_STATUS_TICKET_KEY] + sorted(self.status_report_as.values())
+
+    def normalize_tag(self, tag):
+        '''
+        Return the prescriptive tag that ``tag`` is a hyphenated extension of, or ``tag`` itself.
+
+        A known prescriptive tag is returned as is. Otherwise, if ``tag`` starts with a
+        prescriptive tag followed by ``-`` (such as ``smoke-login`` for ``smoke``), that
+        prescriptive tag is returned; if more than one does, the first in table order wins.
+
+        Only the prefixes of ``tag`` that end at a ``-`` can match, so each is looked up in
+        a dictionary instead of trying every prescriptive tag, and results are memoized.
+        '''
+        normalized = self._normalized.get(tag)
+        if normalized is None:
+            normalized = self._find_normalized_tag(tag)
+            if len(self._normalized) < self.NORMALIZED_CACHE_SIZE:
+                self._normalized[tag] = normalized
+        return normalized
+
+    def _find_normalized_tag(self, tag):
+        if tag in self._prescriptive_order:
+            return tag
+        best = None
+        hyphen = tag.find('-')
+        while hyphen != -1:
+            index = self._prescriptive_order.get(tag[:hyphen])
+            if index is not None and (best is None or index < best):
+                best = index
+            hyphen = tag.find('-', hyphen + 1)
+        return tag if best is None else self.prescriptive_tags[best]
+
+    def shared_values(self, values):
+        '''
+        Return a tuple equal to the prescriptive values tuple ``values``, shared by all equal ones.
+
+        There are only so many combinations of prescriptive values, so the tests that share
+        one can share the tuple too.
+        '''
+        return self._shared_values.setdefault(values, values)
+
+    def prescriptive_matches(self, tags):
+        '''
+        Yield a (PrescriptiveAttribute, found_tags) tuple for each prescriptive attribute.
+
+        Args:
+            tags: an iterable of all the tags for a test
+
+        Returns:
+            A generator of tuples, where found_tags is the set of tags in ``tags``
+            that are valid for that attribute.
+        '''
+        tags = set(tags)
+        for prescriptive, tag_set in zip(self.prescriptives, self._tag_sets):
+            yield prescriptive, tags & tag_set
+
+
 ####################################################################################################
 # Globals
 ####################################################################################################
-coverage_tables = SimpleRSTReader(TAG_DEFINITION_FILE)
-status_table = coverage_tables['Status'].exclude_by(tag='')
-TICKET_STATUS_DISPLAY_NAMES = [NO_STATUS_TICKET_KEY] + sorted(status_table.get_fields('report_as'))
-STATUS_TAGS = set(status_table.get_fields('tag'))
+# The coverage tables are parsed on first use rather than at import time, so that test processes
+# importing the decorators don't pay for parsing coverage.rst when coverage isn't being collected.
+_coverage_tables = None
+_tag_catalog = None
+# The Status table is all the decorators need, so it is parsed on its own.
+_status_table = None
+_status_tags = None
+
+
+def get_coverage_tables():
+    '''Return the tables parsed from ``coverage.rst``, parsing them on the first call.'''
+    global _coverage_tables
+    if _coverage_tables is None:
+        _coverage_tables = SimpleRSTReader(TAG_DEFINITION_FILE)
+    return _coverage_tables
+
+
+def get_tag_catalog():
+    '''Return the process-wide TagCatalog, building it on the first call.'''
+    global _tag_catalog
+    if _tag_catalog is None:
+        _tag_catalog = TagCatalog.from_tables(get_coverage_tables())
+    return _tag_catalog
+
+
+def _status_section(rst_text):
+    '''Return the ``Status`` section of coverage.rst, from its heading to the end of its table.'''
+    lines = rst_text.split('\n')
+    start = next(i for i, line in enumerate(lines[:-1])
+                 if line == 'Status' and set(lines[i + 1]) == {'^'})
+    # A simple RST table has a divider row above and below its header, and one at its end.
+    dividers = [i for i in range(start, len(lines)) if lines[i].startswith('=')][:3]
+    return '\n'.join(lines[start:dividers[-1] + 1])
+
+
+def get_status_table():
+    '''
+    Return the ``Status`` table of ``coverage.rst``, without its default (untagged) row.
 
+    Only that table is parsed, on the first call, so that decorating a test with status tags
+    doesn't parse all of ``coverage.rst``.
+    '''
+    global _status_table
+    if _status_table is None:
+        with open(TAG_DEFINITION_FILE) as rst_file:
+            status_tables = SimpleRSTReader(_status_section(rst_file.read()))
+        _status_table = status_tables['Status'].exclude_by(tag='')
+    return _status_table
 
-@attr.s
+
+def get_status_tags():
+    '''Return the frozenset of status tags (such as ``quarantined``), from ``get_status_table``.'''
+    global _status_tags
+    if _status_tags is None:
+        _status_tags = frozenset(get_status_table().get_fields('tag'))
+    return _status_tags
+
+
+class _LazyGlobal(object):
+    '''
+    A stand-in for one of the former import-time globals, computed on first use.
+
+    It hands everything it is asked for (attributes, items, iteration, ``in``, ``len``,
+    comparisons and the ``+``, ``&``, ``|``, ``-`` and ``^`` operators) to the computed value,
+    and reports the value's class, so ``set(tags) & STATUS_TAGS`` and
+    ``isinstance(STATUS_TAGS, set)`` work as they did, on every Python version, without
+    parsing anything at import. New code should call the ``get_*`` accessors instead.
+    '''
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+
+    def _get(self):
+        if self._value is None:
+            self._value = self._factory()
+        return self._value
+
+    @property
+    def __class__(self):
+        return type(self._get())
+
+    def __getattr__(self, name):
+        if name in ('_factory', '_value'):
+            # Not set yet (as when copying); don't recurse through _get.
+            raise AttributeError(name)
+        return getattr(self._get(), name)
+
+    def __getitem__(self, key):
+        return self._get()[key]
+
+    def __iter__(self):
+        return iter(self._get())
+
+    def __len__(self):
+        return len(self._get())
+
+    def __contains__(self, item):
+        return item in self._get()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._get())
+
+
+def _add_lazy_operator(name, reflected=False):
+    # Special methods are looked up on the type, so __getattr__ doesn't cover them.
+    function = getattr(operator, name + '_' if name in ('and', 'or') else name)
+    if reflected:
+        def method(self, other):
+            return function(other, self._get())
+    else:
+        def method(self, other):
+            return function(self._get(), other)
+    method_name = '__{}{}__'.format('r' if reflected else '', name)
+    method.__name__ = method_name
+    setattr(_LazyGlobal, method_name, method)
+
+
+for _name in ('eq', 'ne', 'lt', 'le', 'gt', 'ge', 'add', 'mul', 'and', 'or', 'sub', 'xor'):
+    _add_lazy_operator(_name)
+for _name in ('add', 'mul', 'and', 'or', 'sub', 'xor'):
+    _add_lazy_operator(_name, reflected=True)
+
+
+coverage_tables = _LazyGlobal(get_coverage_tables)
+status_table = _LazyGlobal(get_status_table)
+TICKET_STATUS_DISPLAY_NAMES = _LazyGlobal(
+    lambda: [NO_STATUS_TICKET_KEY] + sorted(get_status_table().get_fields('report_as')))
+STATUS_TAGS = _LazyGlobal(lambda: set(get_status_tags()))
+
+
+class _AttributesView(Mapping):
+    '''
+    A read-only view of a test's prescriptive attributes, then ``Categories`` and ``Projects``.
+
+    It is what ``TestCoverage.attributes`` returns: the values are looked up in the test's
+    shared prescriptive values tuple, so no dictionary is built per test or per access.
+    '''
+    __slots__ = ('_test', '_catalog')
+
+    def __init__(self, test):
+        self._test = test
+        self._catalog = get_tag_catalog()
+
+    def _structured(self):
+        # Categories and Projects are only there once the structured tags are organized.
+        return self._test._projects is not None
+
+    def __getitem__(self, key):
+        test = self._test
+        if self._structured():
+            if key == 'Categories':
+                return test.categories if test._tag_categories is None else test._tag_categories
+            if key == 'Projects':
+                return list(test._projects)
+        index = self._catalog.prescriptive_index.get(key)
+        if index is None or index >= len(test._prescriptive_values):
+            raise KeyError(key)
+        return test._prescriptive_values[index]
+
+    def __iter__(self):
+        names = self._catalog.prescriptive_names[:len(self._test._prescriptive_values)]
+        return chain(names, STRUCTURED_ATTRIBUTE_NAMES if self._structured() else ())
+
+    def __len__(self):
+        structured = len(STRUCTURED_ATTRIBUTE_NAMES) if self._structured() else 0
+        return len(self._test._prescriptive_values) + structured
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+@attr.s(slots=True)
 class TestCoverage(object):
+    '''
+    The coverage data for a single test.
+
+    A large TestGroup holds one of these per test, so they are slotted, and rather than
+    a dictionary of ``attributes``, each test keeps a tuple of its prescriptive values that
+    is shared with every test that has the same ones; ``attributes`` is a read-only view of it.
+    '''
     name = attr.ib()
     categories = attr.ib(default=attr.Factory(list))
     tags = attr.ib(default=attr.Factory(list))
     parent_tags = attr.ib(default=attr.Factory(list))
     file_path = attr.ib(default='')
-    # Pre-defined Constants
-    tickets = attr.ib(default=attr.Factory(lambda: defaultdict(list)), init=False)
-    attributes = attr.ib(default=attr.Factory(dict), init=False)
+    # A dictionary of each ticket status (or ``NO_STATUS_TICKET_KEY``) to its ticket IDs
+    tickets = attr.ib(default=attr.Factory(dict), init=False)
+    # The problems found with this test's tags
     errors = attr.ib(default=attr.Factory(list), init=False)
+    # The prescriptive attribute values, in tag catalog order
+    _prescriptive_values = attr.ib(default=(), init=False, repr=False)
+    # The categories from a category tag, or None if they are the same as self.categories
+    _tag_categories = attr.ib(default=None, init=False, repr=False)
+    # The projects from a project tag, as a tuple; None until the structured tags are organized
+    _projects = attr.ib(default=None, init=False, repr=False)
+
+    @property
+    def attributes(self):
+        '''
+        A read-only mapping of each prescriptive attribute, then ``Categories`` and ``Projects``,
+        to its value.
+        '''
+        return _AttributesView(self)
 
     @property
     def all_tags(self):
@@ -88,31 +432,26 @@ class TestCoverage(object):
 
     def organize_prescriptives(self):
         '''Convert prescriptive tags into their appropriate attributes.'''
-        # The first coverage tables lists all the attributes, so to find the prescriptive tables,
-        # we can skip this table and use the remaining ones.
-        for attribute in coverage_tables.tables[1:]:
-            self.attributes[attribute] = self._build_prescriptive(attribute)
-
-    def _build_prescriptive(self, attribute):
-        '''Given a single attribute, find all appropriate tags and validate.'''
-        attribute_table = coverage_tables[attribute]
-        # Get all valid attribute tags, excluding the default
-        valid_tags = attribute_table.exclude_by(tag='').get_fields('tag')
-        # Get the default attribute tag, if provided
-        default_value = attribute_table.matches_all(tag='').get_fields('report_as')
-        default_value = default_value[0] if default_value else ''
-        # Find the intersection between the valid tags and all provided tags
-        found_tags = set(self.tags + self.parent_tags) & set(valid_tags)
+        catalog = get_tag_catalog()
+        self._prescriptive_values = catalog.shared_values(
+            tuple(self._build_prescriptive(prescriptive, found_tags)
+                  for prescriptive, found_tags in catalog.prescriptive_matches(self.all_tags)))
+
+    def _build_prescriptive(self, prescriptive, found_tags):
+        '''Given a single attribute and the tags found for it, validate and find the value.'''
+        default_value = prescriptive.default_value
         # Validate the tags
         if len(found_tags) > 1:
             found_string = ', '.join(sorted(found_tags))
             message = '{}:{}:Multiple tags for prescriptive attribute {} ({})'
-            self.errors.append(message.format(self.file_path, self.name, attribute, found_string))
+            self.errors.append(message.format(self.file_path, self.name, prescriptive.name,
+                                              found_string))
         if not found_tags and not default_value:
             message = '{}:{}:No tag for prescriptive attribute {}. Must be one of {}'
-            self.errors.append(message.format(self.file_path, self.name, attribute, valid_tags))
+            self.errors.append(message.format(self.file_path, self.name, prescriptive.name,
+                                              prescriptive.valid_tags))
         if found_tags:
-            return attribute_table.matches_all(tag=found_tags.pop()).data[0].report_as
+            return prescriptive.report_as[found_tags.pop()]
         # To signal a table default should be pulled from the command line interface, the default
         # value is stored as ``<argument_value>``. This regex converts this format into an empty
         # string for easier parsing.
@@ -136,8 +475,9 @@ class TestCoverage(object):
         # to do that in their source.
         if self.categories and tag_categories:
             tag_categories[0] += self.categories[-1:]
-        self.attributes['Categories'] = tag_categories[0] if tag_categories else self.categories
-        self.attributes['Projects'] = KnownStructuredTags.projects.retrieve_entry(self.all_tags)
+        if tag_categories:
+            self._tag_categories = tag_categories[0]
+        self._projects = tuple(KnownStructuredTags.projects.retrieve_entry(self.all_tags))
 
     def organize_tickets(self):
         for tag_list in (self.tags, self.parent_tags):
@@ -152,17 +492,18 @@ class TestCoverage(object):
         associated with a status tag, that status will be the key; otherwise the key will be
         'Tickets'.
         '''
+        status_report_as = get_tag_catalog().status_report_as
         status = None
         for tag in tag_list:
-            if tag in status_table.get_fields('tag'):
-                status = status_table.matches_all(tag=tag).data[0].report_as
+            if tag in status_report_as:
+                status = status_report_as[tag]
                 # Since a status with an empty list indicates that no tickets were associated with
                 # that status, we need to explicity create the status key with the default value
                 # for validation later.
-                self.tickets[status]
+                self.tickets.setdefault(status, [])
                 continue
             if check_ticket_type(tag):
-                self.tickets[status or NO_STATUS_TICKET_KEY].append(tag)
+                self.tickets.setdefault(status or NO_STATUS_TICKET_KEY, []).append(tag)
                 continue
             status = None
 
@@ -234,32 +575,62 @@ class KnownStructuredTags(object):
     projects = StructuredTag('project', ':', False)
 
 
+def _intern(string):
+    '''Return the canonical copy of string, so equal strings share one object.'''
+    try:
+        return intern(string)
+    except TypeError:
+        return string  # Python 2 can only intern byte strings
+
+
 @attr.s
 class TestGroup(object):
     # Pre-defined Constants
     test_framework = attr.ib()
     tests = attr.ib(default=attr.Factory(list), init=False)
     errors = attr.ib(default=attr.Factory(list), init=False)
+    # Maps each (last category, name) test ID added so far to the file path it was first seen in
+    _first_seen = attr.ib(default=attr.Factory(dict), init=False, repr=False)
+    # Maps each distinct categories or parent tags tuple to the one list shared by its tests
+    _shared_lists = attr.ib(default=attr.Factory(dict), init=False, repr=False)
 
     def add(self, name, categories=None, tags=None, parent_tags=None,
             file_path=''):
-        test = TestCoverage(name=name, categories=categories, tags=tags,
-                            parent_tags=parent_tags or [], file_path=file_path)
+        test = TestCoverage(name=_intern(name), categories=self._shared_list(categories or []),
+                            tags=list(map(_intern, tags or [])),
+                            parent_tags=self._shared_list(parent_tags or []),
+                            file_path=_intern(file_path))
         test.build()
         self.tests.append(test)
         self.errors.extend(test.errors)
+        self._check_duplicate(test)
 
-    def _check_duplicates(self):
-        id_counts = Counter(['{}.{}'.format(test.categories[-1], test.name) for test in self.tests])
-        duplicates = {name: count for name, count in id_counts.items() if count > 1}
-        message = 'These test IDs appeared more than once:\n{}'
-        if duplicates:
-            pretty_dups = '\n'.join('{}x: {}'.format(count, name)
-                                    for name, count in sorted(duplicates.items()))
-            self.errors.append(message.format(pretty_dups))
+    def _shared_list(self, strings):
+        '''
+        Return a list equal to strings, shared with every other test that has the same strings.
+
+        Many tests in a group have the same categories (those from one class or feature file),
+        or the same parent tags, so this keeps one copy of each. The shared lists belong to
+        the group: nothing changes them once a test has been built.
+        '''
+        key = tuple(map(_intern, strings))
+        shared = self._shared_lists.get(key)
+        if shared is None:
+            shared = self._shared_lists[key] = list(key)
+        return shared
+
+    def _check_duplicate(self, test):
+        '''Report test right away if its test ID has already been added to the group.'''
+        # A test with no categories (which --no-validate lets through) has no last category.
+        test_id = (test.categories[-1] if test.categories else '', test.name)
+        if test_id not in self._first_seen:
+            self._first_seen[test_id] = test.file_path
+            return
+        message = '{}:{}:Test ID {}.{} appeared more than once, first in {}'
+        self.errors.append(message.format(test.file_path, test.name, test_id[0], test_id[1],
+                                          self._first_seen[test_id]))
 
     def validate(self):
-        self._check_duplicates()
         if self.errors:
             print('\n'.join(self.errors), file=sys.stderr)
         return len(self.errors)
@@ -278,6 +649,10 @@ def _empty_str_padded_list(list_or_none, pad_to_length):
     return padded_list(list_to_pad, pad_to_length, '')
 
 
+def _indent_lines(text, indent):
+    return '\n'.join(indent + line for line in text.split('\n'))
+
+
 def _hostname_from_env():
     jenkins_url = os.environ.get('JENKINS_URL')
     return parse.urlparse(jenkins_url).netloc if jenkins_url else None
@@ -291,7 +666,9 @@ class ReportWriter(object):
     base_file_name = ''
 
     def __init__(self, test_group, product_hierarchy, interface_type, output_dir='',
-                 preserve_files=False, timestamp=None, production_endpoint=False, **_):
+                 preserve_files=False, timestamp=None, production_endpoint=False,
+                 coverage_url=None, batch_size=0, gzip_upload=False, retries=0,
+                 retry_backoff=1.0, upload_manifest=None, coverage_store=None, **_):
         self.test_group = test_group
         self.product_hierarchy = product_hierarchy
         self.interface_type = interface_type
@@ -299,9 +676,28 @@ class ReportWriter(object):
         self.preserve_files = preserve_files
         self.timestamp = timestamp
         self.production_endpoint = production_endpoint
+        self.coverage_url = coverage_url
+        self.batch_size = batch_size
+        self.gzip_upload = gzip_upload
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.upload_manifest = upload_manifest
+        self.coverage_store = coverage_store
         self._max_lens = {}
-        self.data = self._data()
-        self._json_keys_that_exist = {k for d in self.data for k in d.keys()}
+        self._json_keys_that_exist = set()
+        self._spill_file_path = None
+
+    @property
+    def data(self):
+        '''
+        A generator of the report's data dictionaries, read back from the JSON-lines spill file.
+
+        Only one data dictionary is held in memory at a time; see ``_spill_data``.
+        '''
+        self._spill_data()
+        with open(self._spill_file_path) as spill_file:
+            for line in spill_file:
+                yield json.loads(line, object_pairs_hook=OrderedDict)
 
     def write_report(self):
         self._write_json_report()
@@ -309,15 +705,64 @@ class ReportWriter(object):
         if self.preserve_files:
             print('Generated files located at: {}'.format(self.output_dir))
 
+    def save_to_store(self):
+        '''Append the report data, as a new run, to the ``coverage_store`` SQLite database.'''
+        # Imported here so that importing the decorators doesn't import sqlite3.
+        from .coverage_store import CoverageStore
+        with closing(CoverageStore(self.coverage_store)) as store:
+            store.add_run(self.data, self.product_hierarchy, interface_type=self.interface_type,
+                          test_framework=self.test_group.test_framework,
+                          timestamp=self.timestamp)
+
+    def write_upload_settings(self):
+        '''
+        Record how this report is uploaded, next to its JSON-lines data file.
+
+        This lets ``SavedReport`` upload the same data again later (e.g. with a different
+        timestamp) without rebuilding the test group.
+        '''
+        self._spill_data()
+        settings = {
+            'data_file': os.path.basename(self._spill_file_path),
+            'test_framework': self.test_group.test_framework,
+            'timestamp': self.timestamp,
+            'coverage_url': self._coverage_url(),
+            'batch_size': self.batch_size,
+            'gzip_upload': self.gzip_upload,
+            'retries': self.retries,
+            'retry_backoff': self.retry_backoff,
+            'upload_manifest': self.upload_manifest and os.path.abspath(self.upload_manifest),
+        }
+        with open(self._format_and_return_file_path(UPLOAD_SETTINGS_EXT), 'w') as settings_file:
+            json.dump(settings, settings_file, indent=4, sort_keys=True)
+
+    def _spill_data(self):
+        '''
+        Write the report data to a JSON-lines file, one data dictionary at a time.
+
+        This is the only pass over the test group. While writing, it records which keys exist
+        and the max length of any list value for each key, which is what the CSV layout needs,
+        so later passes can stream from the spill file instead of keeping the data in memory.
+        '''
+        if self._spill_file_path is not None:
+            return
+        self._spill_file_path = self._format_and_return_file_path('jsonl')
+        with open(self._spill_file_path, 'w') as spill_file:
+            for data_item in self._data():
+                for key, value in data_item.items():
+                    self._json_keys_that_exist.add(key)
+                    if isinstance(value, list):
+                        self._max_lens[key] = max(self._max_lens.get(key, 0), len(value))
+                spill_file.write(json.dumps(data_item))
+                spill_file.write('\n')
+
     def _max_len(self, key):
         '''
-        Caches and returns the max length of any value for that key if the value is a list, if the
+        Returns the max length of any value for that key if the value is a list, if the
         value is not not a list, does not exist, or exists with no length, will return 0
         '''
-        if key not in self._max_lens:
-            self._max_lens[key] = max(len(d.get(key) if isinstance(d.get(key), list) else [])
-                                      for d in self.data)
-        return self._max_lens[key]
+        self._spill_data()
+        return self._max_lens.get(key, 0)
 
     def _csv_heading_order(self):
         '''The csv heading order that the data will appear in on the reports'''
@@ -350,7 +795,8 @@ class ReportWriter(object):
 
     def _data(self):
         '''
-        This method should be overridden to return a list of dictionaries containing reporting data
+        This method should be overridden to return an iterable of dictionaries containing
+        reporting data. A generator is preferred, so that the data is never all in memory at once.
         '''
         raise NotImplementedError('_data method must be overridden')
 
@@ -377,21 +823,33 @@ class ReportWriter(object):
 
     def _write_json_report(self):
         '''
-        Writes a .json file with the contents of self.data to the base_file_name .json extension
+        Writes a .json file with the contents of self.data to the base_file_name .json extension.
+
+        The data is written one item at a time, formatted as ``json.dump(data, f, indent=4)``
+        would format the whole list.
         '''
+        self._spill_data()
         with open(self._format_and_return_file_path('json'), 'w') as f:
-            json.dump(self.data, f, indent=4)
+            f.write('[')
+            item_separator = '\n'
+            for data_item in self.data:
+                f.write(item_separator)
+                f.write(_indent_lines(json.dumps(data_item, indent=4), '    '))
+                item_separator = ',\n'
+            f.write(']' if item_separator == '\n' else '\n]')
 
     def _write_csv_report(self):
         '''
         Writes a .csv file, mapping the contents of self.data to csv columns by calling
         self._csv_data_from_json
         '''
-        csv_data = [self._csv_data_from_json(d) for d in self.data]
-        column_names = [] if not csv_data else [x[0] for x in csv_data[0]]
+        csv_rows = (self._csv_data_from_json(d) for d in self.data)
+        first_row = next(csv_rows, None)
+        column_names = [] if first_row is None else [x[0] for x in first_row]
 
         with closing(CSVWriter(self._format_and_return_file_path('csv'), column_names)) as csv_file:
-            csv_file.writerows(map(dict, csv_data))
+            if first_row is not None:
+                csv_file.writerows(map(dict, chain([first_row], csv_rows)))
 
     def _csv_data_from_json(self, json_data):
         '''
@@ -411,13 +869,60 @@ class ReportWriter(object):
             csv_data.extend(self._csv_cols_from(json_name, value) or [(json_name, value)])
         return csv_data
 
-    def send_report(self):
-        params = {'timestamp': self.timestamp} if self.timestamp else {}
-        params['host'] = _hostname_from_env() or socket.gethostname()
-        params['test_framework'] = self.test_group.test_framework
-        params['version_number'] = __version__
-        coverage_url = COVERAGE_PRODUCTION_URL if self.production_endpoint else COVERAGE_STAGING_URL
-        response = requests.post(coverage_url, json=self.data, params=params, verify=False)
+    def _coverage_url(self):
+        if self.coverage_url:
+            return self.coverage_url
+        return COVERAGE_PRODUCTION_URL if self.production_endpoint else COVERAGE_STAGING_URL
+
+    def _batches(self):
+        '''
+        Yield the report data in lists of at most ``batch_size`` items (all of it if 0).
+
+        An empty report still yields one (empty) batch, so the data broker sees every run.
+        '''
+        data = self.data
+        batch = list(islice(data, self.batch_size or None))
+        yield batch
+        while self.batch_size and len(batch) == self.batch_size:
+            batch = list(islice(data, self.batch_size))
+            if not batch:
+                break
+            yield batch
+
+    def _encode_batch(self, batch):
+        body = json.dumps(batch).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.gzip_upload:
+            buffer = BytesIO()
+            # mtime is fixed so the same batch always compresses to the same bytes,
+            # which keeps the upload manifest's batch keys stable between runs.
+            with closing(gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0)) as gzip_file:
+                gzip_file.write(body)
+            body = buffer.getvalue()
+            headers['Content-Encoding'] = 'gzip'
+        return body, headers
+
+    def _post_batch(self, coverage_url, params, body, headers):
+        '''
+        POST one batch, retrying connection errors and server errors with exponential backoff.
+        '''
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = requests.post(coverage_url, data=body, headers=headers, params=params,
+                                         verify=False)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                reason = str(e)
+            else:
+                if response.status_code not in UPLOAD_RETRY_STATUS_CODES or last_attempt:
+                    break
+                reason = 'HTTP {}'.format(response.status_code)
+            delay = self.retry_backoff * 2 ** attempt
+            print('Upload attempt {} failed ({}), retrying in {:g}s'.format(
+                attempt + 1, reason, delay), file=sys.stderr)
+            time.sleep(delay)
 
         # Even when we get an error from the data broker,
         # it should have a JSON payload with the uploaded data URL in it.
@@ -428,6 +933,58 @@ class ReportWriter(object):
                                       err_prefix='Data URL: {}\n'.format(data_url))
         return data_url
 
+    def send_report(self):
+        '''
+        Upload the report data, returning the data URL(s) reported by the data broker.
+
+        With an ``upload_manifest``, batches that were already accepted in an earlier
+        (interrupted) run are skipped, so re-running the same command resumes the upload.
+        '''
+        params = {'timestamp': self.timestamp} if self.timestamp else {}
+        params['host'] = _hostname_from_env() or socket.gethostname()
+        params['test_framework'] = self.test_group.test_framework
+        params['version_number'] = __version__
+        coverage_url = self._coverage_url()
+        manifest = UploadManifest.load(self.upload_manifest) if self.upload_manifest else None
+        request_key = json.dumps([coverage_url, sorted(params.items())])
+
+        data_urls = []
+        for batch in self._batches():
+            body, headers = self._encode_batch(batch)
+            batch_key = hashlib.sha1(request_key.encode('utf-8') + body).hexdigest()
+            data_url = manifest.uploaded.get(batch_key) if manifest else None
+            if data_url is None:
+                data_url = self._post_batch(coverage_url, params, body, headers)
+                if manifest:
+                    manifest.uploaded[batch_key] = data_url
+                    manifest.save()
+            if data_url not in data_urls:
+                data_urls.append(data_url)
+        return '\n'.join(data_urls)
+
+
+@attr.s
+class UploadManifest(object):
+    '''
+    A record of which report batches the data broker has accepted, keyed by a hash of each batch.
+    '''
+    path = attr.ib()
+    uploaded = attr.ib(default=attr.Factory(dict))
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as manifest_file:
+            return cls(path, json.load(manifest_file).get('uploaded', {}))
+
+    def save(self):
+        '''Write the manifest to a temp file and rename it into place, so it is never partial.'''
+        manifest_dir = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=manifest_dir, delete=False) as manifest_file:
+            json.dump({'uploaded': self.uploaded}, manifest_file, indent=4, sort_keys=True)
+        os.rename(manifest_file.name, self.path)
+
 
 class CoverageReport(ReportWriter):
     base_file_name = COVERAGE_REPORT_FILE
@@ -436,7 +993,7 @@ class CoverageReport(ReportWriter):
         '''The base non extended order of the csv columns for the Coverage Report'''
         coverage_list = ['Test Name', 'Polarity', 'Priority', 'Suite', 'Status', 'Execution Method']
         return (super(CoverageReport, self)._csv_heading_order() + coverage_list +
-                TICKET_STATUS_DISPLAY_NAMES)
+                get_tag_catalog().ticket_status_display_names)
 
     def _build_test(self, test):
         test_data = {'Test Name': test.name}
@@ -445,7 +1002,29 @@ class CoverageReport(ReportWriter):
         return self._data_item(**test_data)
 
     def _data(self):
-        return list(map(self._build_test, self.test_group.tests))
+        return (self._build_test(test) for test in self.test_group.tests)
+
+
+class SavedReport(ReportWriter):
+    '''
+    A report written by an earlier run, read back from the upload settings file it left behind.
+    '''
+
+    def __init__(self, upload_settings_path, timestamp=None):
+        with open(upload_settings_path) as settings_file:
+            settings = json.load(settings_file)
+        report_dir = os.path.dirname(os.path.abspath(upload_settings_path))
+        super(SavedReport, self).__init__(
+            TestGroup(settings['test_framework']), None, None, output_dir=report_dir,
+            preserve_files=True, timestamp=timestamp or settings['timestamp'],
+            coverage_url=settings['coverage_url'], batch_size=settings['batch_size'],
+            gzip_upload=settings['gzip_upload'], retries=settings['retries'],
+            retry_backoff=settings['retry_backoff'], upload_manifest=settings['upload_manifest'],
+        )
+        self._spill_file_path = os.path.join(report_dir, settings['data_file'])
+
+    def _spill_data(self):
+        '''The data was already spilled to disk by the run that wrote this report.'''
 
 
 class CSVWriter(object):
@@ -468,8 +1047,11 @@ class CSVWriter(object):
 def run_reports(test_group, *args, **kwargs):
     report = CoverageReport(test_group, *args, **kwargs)
     report.write_report()
+    if report.coverage_store:
+        report.save_to_store()
     status = 0 if kwargs.get('validate') is False else test_group.validate()
     if not kwargs.get('dry_run'):
+        report.write_upload_settings()
         print(report.send_report())
         status = 0
     cleanup_and_exit(dir_name='' if report.preserve_files else report.output_dir, status=status)
@@ -503,4 +1085,22 @@ def update_parser(parser):
                         help='write reports without validating data')
     parser.add_argument('--production-endpoint', action='store_true',
                         help='Send coverage data to the production endpoint')
+    parser.add_argument('--coverage-store', default=None, metavar='FILE',
+                        help='Also append the coverage data to this SQLite coverage store, '
+                             'to be queried with coverage-store')
+    upload_group = parser.add_argument_group('upload options')
+    upload_group.add_argument('--coverage-url', default=None,
+                              help='Send coverage data to this URL instead of the data broker')
+    upload_group.add_argument('--batch-size', type=int, default=0,
+                              help='Upload the coverage data in batches of at most this many '
+                                   'tests (default: a single upload)')
+    upload_group.add_argument('--gzip', dest='gzip_upload', action='store_true',
+                              help='gzip-compress the coverage data when uploading')
+    upload_group.add_argument('--retries', type=int, default=0,
+                              help='Number of times to retry a failed batch upload')
+    upload_group.add_argument('--retry-backoff', type=float, default=1.0,
+                              help='Seconds to wait before the first retry; doubled each retry')
+    upload_group.add_argument('--upload-manifest', default=None,
+                              help='File recording the batches already uploaded, '
+                                   'so an interrupted upload can be resumed')
     return parser
@@ -53,14 +53,12 @@ def main():
         print('       {} command: {}'.format(_method, ' '.join(args.command)))
         sys.exit(-2)
 
-    if len(json_coverage_files) != 1:
-        print('')
-        print('Error: Too many coverage files found!')
-        print('       {}'.format(' '.join(json_coverage_files)))
-        sys.exit(-3)
+    if len(json_coverage_files) > 1:
+        # Parallel/sharded runs leave a file per worker; their data is merged when read.
+        print('Merging {} coverage files'.format(len(json_coverage_files)))
 
     del kwargs['command']  # Only needed for running test runner
-    run_unittest_reports(json_coverage_files[0], kwargs.pop('product_hierarchy'),
+    run_unittest_reports(sorted(json_coverage_files), kwargs.pop('product_hierarchy'),
                          kwargs.pop('default_interface_type'), **kwargs)
 
 
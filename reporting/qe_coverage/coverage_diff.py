@@ -0,0 +1,228 @@
+'''
+List the tests added, removed, or with a changed status or tickets between two coverage reports.
+
+The reports are hash-joined on each test's ID (its categories and name). Only a compact
+key and summary of each test is kept, and for reports bigger than ``PARTITION_BYTES``,
+both are first split by test ID into that many partitions on disk, which are joined
+one at a time, so the memory used stays bounded however big the reports are.
+'''
+from __future__ import print_function
+import argparse
+from collections import namedtuple
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import zlib
+
+from qe_coverage.base import get_tag_catalog
+from qe_coverage.coverage_io import coverage_records, open_coverage_json, uncompressed_size
+
+
+# About how much of the old report is joined in memory at a time.
+PARTITION_BYTES = 64 * 1024 * 1024
+
+# How much of a JSON report is read at a time.
+READ_CHUNK_SIZE = 64 * 1024
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+# Test IDs and summaries are encoded for every test, so one compact encoder is reused.
+_encode = json.JSONEncoder(separators=(',', ':'), sort_keys=True).encode
+
+Difference = namedtuple('Difference', 'change categories name old new')
+Difference.__doc__ = '''
+A test that was ``added``, ``removed`` or ``changed``.
+
+``old`` and ``new`` are dictionaries of the test's ``Status`` and its tickets (by status)
+in each report, or None if the test isn't in that report.
+'''
+
+
+def _json_array_items(report_file):
+    '''Yield each item of the JSON array in report_file, reading it a chunk at a time.'''
+    decoder = json.JSONDecoder()
+    buffer = report_file.read(READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('{} is not a JSON array'.format(report_file.name))
+    position = 1
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            # The item is cut off at the end of the buffer (or the array is malformed).
+            chunk = report_file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+        position = end
+
+
+def read_report(report_path):
+    '''
+    Yield the data dictionaries of a coverage report, one at a time.
+
+    The report can be a JSON report (an array, as written with ``--preserve-files``) or
+    JSON-lines (one test per line, like the upload data file), gzip-compressed or not.
+    '''
+    with open_coverage_json(report_path) as report_file:
+        first = report_file.read(1)
+        while first.isspace():
+            first = report_file.read(1)
+        report_file.seek(0)
+        items = _json_array_items(report_file) if first == '[' else coverage_records(report_file)
+        for item in items:
+            yield item
+
+
+def _summaries(report_path, ticket_keys):
+    '''
+    Yield a (test ID, summary) tuple of JSON strings for each test in the report.
+
+    The summary holds the test's status and sorted tickets, with sorted keys,
+    so tests compare equal exactly when their summary strings do.
+    '''
+    for item in read_report(report_path):
+        test_id = _encode([item.get('Categories', []), item.get('Test Name', '')])
+        summary = {key: sorted(value) for key, value in item.items() if key in ticket_keys}
+        summary['Status'] = item.get('Status')
+        yield test_id, _encode(summary)
+
+
+def _difference(change, test_id, old, new):
+    categories, name = json.loads(test_id)
+    return Difference(change, categories, name, old and json.loads(old), new and json.loads(new))
+
+
+def _join(old_summaries, new_summaries):
+    '''
+    Yield the Differences between two streams of (test ID, summary) tuples.
+
+    The old summaries are held in a dictionary, and the new ones are streamed past it.
+    '''
+    old = dict(old_summaries)
+    for test_id, summary in new_summaries:
+        old_summary = old.pop(test_id, None)
+        if old_summary is None:
+            yield _difference('added', test_id, None, summary)
+        elif old_summary != summary:
+            yield _difference('changed', test_id, old_summary, summary)
+    for test_id, summary in old.items():
+        yield _difference('removed', test_id, summary, None)
+
+
+def _partition(summaries, path_prefix, partitions):
+    '''Write the summaries into ``partitions`` JSON-lines files, by a hash of their test IDs.'''
+    paths = ['{}-{}'.format(path_prefix, x) for x in range(partitions)]
+    partition_files = [io.open(x, 'w', encoding='utf-8') for x in paths]
+    try:
+        for test_id, summary in summaries:
+            partition = zlib.crc32(test_id.encode('utf-8')) % partitions
+            partition_files[partition].write(u'{}\n'.format(_encode([test_id, summary])))
+    finally:
+        for partition_file in partition_files:
+            partition_file.close()
+    return paths
+
+
+def _read_partition(path):
+    with io.open(path, encoding='utf-8') as partition_file:
+        for line in partition_file:
+            yield tuple(json.loads(line))
+
+
+def diff_reports(old_report_path, new_report_path, partitions=None):
+    '''
+    Yield a Difference for each test added, removed or changed from the old report to the new.
+
+    Args:
+        partitions: how many partitions to split the reports into (by default, one per
+            ``PARTITION_BYTES`` of the old report, once decompressed). With one partition,
+            nothing is written to disk, and the changed and added tests are yielded in the
+            new report's order.
+    '''
+    ticket_keys = frozenset(get_tag_catalog().ticket_status_display_names)
+    old_summaries = _summaries(old_report_path, ticket_keys)
+    new_summaries = _summaries(new_report_path, ticket_keys)
+    if partitions is None:
+        partitions = uncompressed_size(old_report_path) // PARTITION_BYTES + 1
+    if partitions == 1:
+        for difference in _join(old_summaries, new_summaries):
+            yield difference
+        return
+
+    partition_dir = tempfile.mkdtemp(prefix='coverage-diff-')
+    try:
+        old_paths = _partition(old_summaries, os.path.join(partition_dir, 'old'), partitions)
+        new_paths = _partition(new_summaries, os.path.join(partition_dir, 'new'), partitions)
+        for old_path, new_path in zip(old_paths, new_paths):
+            for difference in _join(_read_partition(old_path), _read_partition(new_path)):
+                yield difference
+    finally:
+        shutil.rmtree(partition_dir, ignore_errors=True)
+
+
+def _describe_tickets(summary):
+    tickets = ('{}: {}'.format(key, ', '.join(value))
+               for key, value in sorted(summary.items()) if key != 'Status' and value)
+    return '; '.join(tickets) or 'no tickets'
+
+
+def _describe(difference):
+    test_id = ' > '.join(difference.categories + [difference.name])
+    if difference.change == 'added':
+        summary = difference.new
+    elif difference.change == 'removed':
+        summary = difference.old
+    else:
+        changes = []
+        if difference.old['Status'] != difference.new['Status']:
+            changes.append('status {} -> {}'.format(difference.old['Status'],
+                                                    difference.new['Status']))
+        old_tickets = _describe_tickets(difference.old)
+        new_tickets = _describe_tickets(difference.new)
+        if old_tickets != new_tickets:
+            changes.append('tickets {} -> {}'.format(old_tickets, new_tickets))
+        return 'changed  {}: {}'.format(test_id, ', '.join(changes))
+    return '{:<8} {}: {}, {}'.format(difference.change, test_id, summary['Status'],
+                                     _describe_tickets(summary))
+
+
+def _get_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('old_report', help='The earlier coverage report (JSON or JSON-lines)')
+    parser.add_argument('new_report', help='The later coverage report (JSON or JSON-lines)')
+    parser.add_argument('--json-lines', action='store_true',
+                        help='Write each difference as a line of JSON instead of text')
+    parser.add_argument('--partitions', type=int, default=None,
+                        help='Split the reports into this many partitions on disk '
+                             '(default: one per {} MB of the old report)'.format(
+                                 PARTITION_BYTES // (1024 * 1024)))
+    return parser
+
+
+def main():
+    parser = _get_parser()
+    args = parser.parse_args()
+    if args.partitions is not None and args.partitions < 1:
+        parser.error('--partitions must be at least 1')
+    counts = dict.fromkeys(['added', 'removed', 'changed'], 0)
+    for difference in diff_reports(args.old_report, args.new_report, args.partitions):
+        counts[difference.change] += 1
+        if args.json_lines:
+            print(json.dumps(difference._asdict()))
+        else:
+            print(_describe(difference))
+    if not args.json_lines:
+        print('{added} added, {removed} removed, {changed} changed'.format(**counts))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,24 @@
+from __future__ import print_function
 import argparse
+from collections import OrderedDict
 import datetime
+import glob
+import json
+from multiprocessing.pool import ThreadPool
 import os
+import re
+import shutil
 import subprocess
+import sys
+import tempfile
 import time
 
 from dateutil.relativedelta import relativedelta
 
 from qecommon_tools import safe_run, exit
 
+from qe_coverage.base import SavedReport, UPLOAD_SETTINGS_EXT
+
 
 PRESERVE_FILES_ARG = '--preserve-files'
 
@@ -15,6 +26,12 @@ TIMESTAMP_ARG = '--timestamp'
 
 OUTPUT_DIR_ARG = '--output-dir'
 
+PARSE_CACHE_ARG = '--parse-cache'
+
+CHANGED_FILES_ARG = '--changed-files'
+
+PARSE_CACHE_FILE = 'parse-cache.json'
+
 VALID_UNITS = ['years', 'months', 'weeks', 'days']
 
 DEFAULT_BY_UNIT = 'weeks'
@@ -38,6 +55,67 @@ def _generate_rev_dates(args):
         cursor_date = _time_ago(args.by_unit, 1, start=cursor_date)
 
 
+def _rev_for_date(date):
+    rev_command = [
+        'git',
+        'rev-list',
+        '-n', '1',
+        '--before="{:%Y-%m-%d 23:59:59}"'.format(date),
+        'master'
+    ]
+    return subprocess.check_output(rev_command, universal_newlines=True).strip('\n')
+
+
+def _no_rev_message(date):
+    return 'No rev found before date: {}'.format(date)
+
+
+def _content_key(rev, test_dir):
+    '''
+    The tree hash of ``test_dir`` at ``rev``, so revisions with identical tests share a key.
+
+    Falls back to the revision itself if ``test_dir`` doesn't exist at that revision.
+    '''
+    test_dir = os.path.normpath(test_dir).strip(os.sep)
+    tree_command = ['git', 'rev-parse', '--verify', '--quiet',
+                    '{}:{}'.format(rev, '' if test_dir == '.' else test_dir)]
+    try:
+        return subprocess.check_output(tree_command, universal_newlines=True).strip('\n')
+    except subprocess.CalledProcessError:
+        return rev
+
+
+def _reuse_report(output_path, source_date, date):
+    '''
+    Copy the reports written for ``source_date`` to ``date``'s output directory,
+    changing only their timestamp, and upload them again if the original run did.
+    '''
+    source_dir = _subdirectory_path(output_path, source_date)
+    target_dir = _subdirectory_path(output_path, date)
+    if os.path.exists(target_dir):
+        shutil.rmtree(target_dir)
+    shutil.copytree(source_dir, target_dir)
+    timestamp = _timestamp(date)
+    for settings_path in glob.glob(os.path.join(target_dir, '*.{}'.format(UPLOAD_SETTINGS_EXT))):
+        with open(settings_path) as settings_file:
+            settings = json.load(settings_file)
+        settings['timestamp'] = timestamp
+        with open(settings_path, 'w') as settings_file:
+            json.dump(settings, settings_file, indent=4, sort_keys=True)
+        print(SavedReport(settings_path).send_report())
+
+
+def _report_dirs(output_path):
+    '''The names of the history slice report directories in output_path.'''
+    return {x for x in os.listdir(output_path) if re.match(r'\d{4}-\d\d-\d\d$', x)}
+
+
+def _remove_report_dirs(output_path, report_dirs):
+    '''Remove the named report directories from output_path, as the coverage commands would.'''
+    for report_dir in report_dirs:
+        shutil.rmtree(os.path.join(output_path, report_dir), ignore_errors=True)
+
+
 def _add_or_replace_arg(args_list, arg_key, arg_value):
     if arg_key in args_list:
         args_list[args_list.index(arg_key) + 1] = arg_value
@@ -46,13 +124,150 @@ def _add_or_replace_arg(args_list, arg_key, arg_value):
     return args_list
 
 
+def _timestamp(date):
+    return str(time.mktime(date.timetuple()))
+
+
 def _prepare_coverage_args(coverage_args, output_dir, date):
     _add_or_replace_arg(coverage_args, OUTPUT_DIR_ARG, output_dir)
-    timestamp = str(time.mktime(date.timetuple()))
-    _add_or_replace_arg(coverage_args, TIMESTAMP_ARG, timestamp)
+    _add_or_replace_arg(coverage_args, TIMESTAMP_ARG, _timestamp(date))
     return coverage_args
 
 
+def _prepare_incremental_args(coverage_args, output_path, changed_files_path, cached_rev, rev):
+    '''
+    Point the coverage command at a parse cache kept across history slices, and, once the cache
+    holds the results for ``cached_rev``, at the list of files changed between it and ``rev``.
+    '''
+    if PARSE_CACHE_ARG not in coverage_args:
+        coverage_args.extend([PARSE_CACHE_ARG, os.path.join(output_path, PARSE_CACHE_FILE)])
+    if cached_rev is None:
+        return coverage_args
+    diff_command = ['git', 'diff', '--name-only', '--no-renames', cached_rev, rev]
+    changed_files = subprocess.check_output(diff_command, universal_newlines=True)
+    with open(changed_files_path, 'w') as changed_files_list:
+        changed_files_list.write(changed_files)
+    return _add_or_replace_arg(coverage_args, CHANGED_FILES_ARG, changed_files_path)
+
+
+def _run_in_worktree(worktree_root, coverage_args, output_path, date, rev):
+    '''
+    Run the coverage command for one history slice in its own detached worktree.
+
+    Returns the exit status of the coverage command, so one failing slice doesn't stop the others.
+    '''
+    worktree_path = os.path.join(worktree_root, str(date))
+    add_command = ['git', 'worktree', 'add', '--quiet', '--detach', worktree_path, rev]
+    status = subprocess.call(add_command)
+    if status:
+        return status
+    command = _prepare_coverage_args(list(coverage_args), _subdirectory_path(output_path, date),
+                                     date)
+    try:
+        return subprocess.call(command, cwd=worktree_path)
+    except OSError as e:
+        print('Error when trying to execute: "{}": {}'.format(' '.join(command), e),
+              file=sys.stderr)
+        return -1
+    finally:
+        shutil.rmtree(worktree_path, ignore_errors=True)
+
+
+def _run_worktrees(rev_dates, coverage_args, output_path, jobs):
+    '''
+    Run the coverage command for each ``(date, rev)`` concurrently, in ``jobs`` worktrees at a time.
+
+    The current checkout is never modified; every revision is checked out in a temporary worktree.
+    Returns the dates whose coverage command failed.
+    '''
+    worktree_root = tempfile.mkdtemp(prefix='coverage-history-')
+
+    def run(rev_date):
+        date, rev = rev_date
+        status = _run_in_worktree(worktree_root, coverage_args, output_path, date, rev)
+        result = 'failed ({})'.format(status) if status else 'ok'
+        print('{} ({}): {}'.format(date, rev[:12], result))
+        return status
+
+    pool = ThreadPool(jobs)
+    try:
+        statuses = pool.map(run, rev_dates, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+        shutil.rmtree(worktree_root, ignore_errors=True)
+        subprocess.call(['git', 'worktree', 'prune'])
+    return [date for (date, _), status in zip(rev_dates, statuses) if status]
+
+
+def _run_history_in_worktrees(args, coverage_args, output_path):
+    to_run = []
+    reuse_from = OrderedDict()
+    first_date_for = {}
+    no_rev_date = None
+    for date in _generate_rev_dates(args):
+        rev = _rev_for_date(date)
+        if not rev:
+            no_rev_date = date
+            break
+        key = _content_key(rev, args.test_dir) if args.reuse_duplicates else date
+        if key in first_date_for:
+            reuse_from[date] = first_date_for[key]
+        else:
+            first_date_for[key] = date
+            to_run.append((date, rev))
+    failed = _run_worktrees(to_run, coverage_args, output_path, args.worktree_jobs)
+    for date, source_date in reuse_from.items():
+        if source_date in failed:
+            failed.append(date)
+            continue
+        print('{}: same tests as {}, reusing its report'.format(date, source_date))
+        _reuse_report(output_path, source_date, date)
+    if failed:
+        message = 'Coverage failed for: {}'.format(', '.join(map(str, sorted(failed))))
+        exit(status=1, message=message)
+    if no_rev_date:
+        exit(message=_no_rev_message(no_rev_date))
+
+
+def _run_history_in_checkout(args, coverage_args, output_path):
+    unclean = subprocess.check_output(['git', 'status', '--porcelain'], universal_newlines=True)
+    assert not unclean, 'The repo is not in a clean state: {}'.format(unclean)
+    head_cache = subprocess.check_output(['cat', '.git/HEAD'], universal_newlines=True).strip('\n')
+    head_cache = head_cache.split('/')[-1]
+    first_date_for = {}
+    # The revision whose parse results are in the parse cache, when running incrementally.
+    cached_rev = None
+    changed_files_path = os.path.join(tempfile.mkdtemp(prefix='coverage-history-'),
+                                      'changed-files.txt')
+    try:
+        for date in _generate_rev_dates(args):
+            rev = _rev_for_date(date)
+            if not rev:
+                exit(message=_no_rev_message(date))
+            key = _content_key(rev, args.test_dir) if args.reuse_duplicates else date
+            if key in first_date_for:
+                print('{}: same tests as {}, reusing its report'.format(date, first_date_for[key]))
+                _reuse_report(output_path, first_date_for[key], date)
+                continue
+            first_date_for[key] = date
+            checkout_command = [
+                'git',
+                'checkout',
+                rev
+            ]
+            safe_run(checkout_command)
+            _prepare_coverage_args(coverage_args, _subdirectory_path(output_path, date), date)
+            if args.incremental:
+                _prepare_incremental_args(coverage_args, output_path, changed_files_path,
+                                          cached_rev, rev)
+                cached_rev = rev
+            safe_run(coverage_args)
+    finally:
+        shutil.rmtree(os.path.dirname(changed_files_path))
+        safe_run(['git', 'checkout', head_cache])
+
+
 class StartUnit(argparse.Action):
     def __call__(self, parser, args, value, option_string=None):
         values = value.split()
@@ -100,41 +315,54 @@ def main():
                         default=DEFAULT_BY_UNIT, help=by_help)
     parser.add_argument('--output-dir', default='reports',
                         help='The relative path from repo root to store the reports.')
+    jobs_help = (
+        'Check out each revision in its own `git worktree` and run up to this many coverage'
+        ' commands at once, leaving the current checkout untouched.'
+        ' By default, revisions are checked out in the current checkout one at a time.'
+    )
+    parser.add_argument('--worktree-jobs', type=int, default=None, help=jobs_help)
+    parser.add_argument('--test-dir', default='.',
+                        help='The directory (relative to the repo root) that the coverage command'
+                             ' reads, to find duplicate revisions with `--reuse-duplicates`.')
+    reuse_help = (
+        'Run the coverage command only for the first of the revisions whose `--test-dir` is'
+        ' identical, and reuse (and upload again) its report for the others.'
+        ' The reports are read back from the output directory, so this implies `{0}`;'
+        ' without `{0}`, the report directories are removed once they have all been reused.'
+    ).format(PRESERVE_FILES_ARG)
+    parser.add_argument('--reuse-duplicates', action='store_true', help=reuse_help)
+    incremental_help = (
+        'Keep a coverage-gherkin parse cache across slices, and only re-parse the files that'
+        ' `git diff` reports as changed since the previous slice.'
+        ' Not supported with `--worktree-jobs`.'
+    )
+    parser.add_argument('--incremental', action='store_true', help=incremental_help)
     args, coverage_args = parser.parse_known_args()
+    if args.incremental and args.worktree_jobs:
+        parser.error('--incremental cannot be used with --worktree-jobs')
     assert coverage_args, 'No coverage script/args were provided to run after checkout!'
     depth = subprocess.check_output(['git', 'rev-list', '--count', 'HEAD'],
                                     universal_newlines=True).strip('\n')
     assert int(depth) > 1, 'History cannot be run on a "thin" log: depth was {}'.format(depth)
-    unclean = subprocess.check_output(['git', 'status', '--porcelain'], universal_newlines=True)
-    assert not unclean, 'The repo is not in a clean state: {}'.format(unclean)
     output_path = os.path.abspath(args.output_dir)
     if not os.path.exists(output_path):
         os.makedirs(output_path)
-    head_cache = subprocess.check_output(['cat', '.git/HEAD'], universal_newlines=True).strip('\n')
-    head_cache = head_cache.split('/')[-1]
+    # Reports are reused from their output directory, so they have to be kept until then.
+    remove_reports = args.reuse_duplicates and PRESERVE_FILES_ARG not in coverage_args
+    if remove_reports:
+        print('--reuse-duplicates implies {}; the report directories will be removed at the'
+              ' end.'.format(PRESERVE_FILES_ARG))
+        coverage_args.append(PRESERVE_FILES_ARG)
+    # Only the report directories this run creates are removed, not those of earlier runs.
+    earlier_report_dirs = _report_dirs(output_path)
     try:
-        for date in _generate_rev_dates(args):
-            rev_command = [
-                'git',
-                'rev-list',
-                '-n', '1',
-                '--before="{:%Y-%m-%d 23:59:59}"'.format(date),
-                'master'
-            ]
-            rev = subprocess.check_output(rev_command, universal_newlines=True).strip('\n')
-            if not rev:
-                exit(message='No rev found before date: {}'.format(date))
-            checkout_command = [
-                'git',
-                'checkout',
-                rev
-            ]
-            safe_run(checkout_command)
-            safe_run(_prepare_coverage_args(coverage_args,
-                                            _subdirectory_path(output_path, date),
-                                            date))
+        if args.worktree_jobs:
+            _run_history_in_worktrees(args, coverage_args, output_path)
+        else:
+            _run_history_in_checkout(args, coverage_args, output_path)
     finally:
-        safe_run(['git', 'checkout', head_cache])
+        if remove_reports:
+            _remove_report_dirs(output_path, _report_dirs(output_path) - earlier_report_dirs)
 
 
 if __name__ == '__main__':
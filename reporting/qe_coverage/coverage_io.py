@@ -0,0 +1,55 @@
+'''
+Reading coverage data files, which may be gzip-compressed.
+
+Coverage JSON-lines files (one test per line) are read by ``coverage-unittest`` and
+``coverage-diff``; either can be given a gzip-compressed file, which is told apart by its
+content rather than its name.
+'''
+from contextlib import closing
+import gzip
+import io
+import json
+import os
+
+
+# The first bytes of any gzip-compressed file.
+GZIP_MAGIC = b'\x1f\x8b'
+
+# How much of a compressed file is decompressed at a time when measuring it.
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def is_gzipped(file_name):
+    '''Whether the file is gzip-compressed, judged by its first bytes.'''
+    with open(file_name, 'rb') as data_file:
+        return data_file.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+
+def open_coverage_json(coverage_file_name):
+    '''Open a coverage JSON or JSON-lines file as text, gzip-compressed or not.'''
+    if is_gzipped(coverage_file_name):
+        return io.TextIOWrapper(gzip.GzipFile(coverage_file_name, 'rb'), encoding='utf-8')
+    return io.open(coverage_file_name, encoding='utf-8')
+
+
+def coverage_records(json_lines):
+    '''Yield the test data dictionary from each non-blank line, reading one line at a time.'''
+    for line in json_lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def uncompressed_size(file_name):
+    '''
+    Return the size in bytes of the file's content, once decompressed if it is gzip-compressed.
+
+    A gzip file only records its size modulo 4 GiB (and only for its last member), so a
+    compressed file is decompressed, a chunk at a time, to measure it.
+    '''
+    if not is_gzipped(file_name):
+        return os.path.getsize(file_name)
+    size = 0
+    with closing(gzip.GzipFile(file_name, 'rb')) as gzip_file:
+        for chunk in iter(lambda: gzip_file.read(READ_CHUNK_SIZE), b''):
+            size += len(chunk)
+    return size
@@ -1,17 +1,29 @@
+from __future__ import print_function
 import argparse
 from csv import DictReader
+from multiprocessing.pool import ThreadPool
 import os
+import re
+import subprocess
+import time
 
 from qecommon_tools import exit as _exit
 from qecommon_tools import safe_run
 
 
-def _run_reports(builder_args, additional_args):
+def _coverage_commands(builder_args, additional_args):
+    '''
+    Build the coverage command for each row of the CSV file.
+
+    Returns:
+        list: A (product hierarchy, coverage command) tuple per row.
+    '''
     csv_file = builder_args.coverage_csv_file
     no_cs = 'Missing coverage_script from command line or CSV file: "{}"'.format(csv_file)
     no_dit = 'Missing default_interface_type from command line or CSV file: "{}"'.format(csv_file)
     no_ph = 'Missing product_hierarchy column from CSV file: "{}"'.format(csv_file)
 
+    commands = []
     with open(csv_file, 'r') as csvfile:
         for row in DictReader(csvfile, skipinitialspace=True):
             coverage_script = row.pop('coverage_script', builder_args.coverage_script)
@@ -35,7 +47,72 @@ def _run_reports(builder_args, additional_args):
             for key, value in ((k, v) for k, v in row.items() if v):
                     coverage_command.extend(['--{}'.format(key), value])
             coverage_command.extend(additional_args)
-            safe_run(coverage_command)
+            commands.append((product_hierarchy, coverage_command))
+    return commands
+
+
+def _log_file_path(log_dir, index, product_hierarchy):
+    safe_name = re.sub(r'[^\w.-]+', '_', product_hierarchy).strip('_')
+    return os.path.join(log_dir, '{:03d}_{}.log'.format(index, safe_name))
+
+
+def _run_logged(coverage_command, log_path):
+    '''Run coverage_command with its output going to log_path, and return its exit status.'''
+    with open(log_path, 'w') as log_file:
+        try:
+            return subprocess.call(coverage_command, stdout=log_file, stderr=subprocess.STDOUT)
+        except OSError as e:
+            print('Error when trying to execute: "{}": {}'.format(' '.join(coverage_command), e),
+                  file=log_file)
+            return -1
+
+
+def _summary_table(results):
+    rows = [('Product Hierarchy', 'Status', 'Seconds', 'Log File')]
+    for product_hierarchy, status, seconds, log_path in results:
+        rows.append((product_hierarchy, 'FAILED ({})'.format(status) if status else 'ok',
+                     '{:.1f}'.format(seconds), log_path))
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return '\n'.join('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+                     for row in rows)
+
+
+def _run_concurrently(commands, jobs, log_dir):
+    '''
+    Run the coverage commands, up to ``jobs`` at a time, each logging to its own file in log_dir.
+
+    A failing command doesn't stop the others; a summary table is printed when all are done,
+    and the exit status is non-zero if any command failed.
+    '''
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+
+    def run(indexed_command):
+        index, (product_hierarchy, coverage_command) = indexed_command
+        log_path = _log_file_path(log_dir, index, product_hierarchy)
+        start = time.time()
+        status = _run_logged(coverage_command, log_path)
+        return product_hierarchy, status, time.time() - start, log_path
+
+    pool = ThreadPool(jobs)
+    try:
+        results = pool.map(run, enumerate(commands, 1), chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    print(_summary_table(results))
+    failures = sum(1 for _, status, _, _ in results if status)
+    if failures:
+        _exit(1, '{} of {} products failed'.format(failures, len(results)))
+
+
+def _run_reports(builder_args, additional_args):
+    commands = _coverage_commands(builder_args, additional_args)
+    if builder_args.product_jobs:
+        _run_concurrently(commands, builder_args.product_jobs, builder_args.log_dir)
+        return
+    for _, coverage_command in commands:
+        safe_run(coverage_command)
 
 
 def _get_parser():
@@ -56,6 +133,18 @@ def _get_parser():
                         help='The coverage script to be run, if not specified in the CSV file.')
     parser.add_argument('default_interface_type', nargs='?', choices=['api', 'gui'],
                         help='The interface type of the product, if not specified in the CSV file.')
+    jobs_help = (
+        'Run up to this many coverage scripts at once, each logging to its own file in'
+        ' --log-dir, and print a summary when all are done. A failing product does not stop'
+        ' the others. By default, products are run one at a time and the first failure stops'
+        ' the run.'
+    )
+    # Not -j/--jobs: unrecognized arguments flow through to the coverage script,
+    # and coverage-gherkin has its own -j/--jobs.
+    parser.add_argument('--product-jobs', type=int, default=None, help=jobs_help)
+    parser.add_argument('--log-dir', default='coverage-logs',
+                        help='The directory for the per-product log files when using'
+                             ' --product-jobs.')
     return parser
 
 
@@ -0,0 +1,228 @@
+'''
+A local SQLite store of coverage report data, so runs can be compared without their report files.
+
+Every coverage tool can append its report data to a store with ``--coverage-store FILE``,
+and the ``coverage-store`` command queries it.
+'''
+from __future__ import print_function
+import argparse
+from contextlib import closing
+import datetime
+from itertools import chain
+import json
+import sqlite3
+import time
+
+from qe_coverage.__version__ import __version__
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    product_hierarchy TEXT NOT NULL,
+    interface_type TEXT,
+    test_framework TEXT,
+    timestamp REAL NOT NULL,
+    version TEXT
+);
+CREATE TABLE IF NOT EXISTS tests (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    categories TEXT NOT NULL,
+    test_name TEXT NOT NULL,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_product_timestamp ON runs (product_hierarchy, timestamp);
+CREATE INDEX IF NOT EXISTS tests_run_status ON tests (run_id, status);
+CREATE INDEX IF NOT EXISTS tests_name_categories ON tests (test_name, categories);
+'''
+
+# How many rows are handed to each executemany call when a run is added.
+INSERT_CHUNK_SIZE = 10000
+
+
+def _categories_key(categories):
+    '''The stored form of a categories list: its JSON, so equal lists are equal strings.'''
+    return json.dumps(list(categories or []))
+
+
+def _format_timestamp(timestamp):
+    return '{:%Y-%m-%d %H:%M:%S}'.format(datetime.datetime.fromtimestamp(timestamp))
+
+
+def _table(rows):
+    '''Return the rows (tuples of strings, the first being the headings) as aligned columns.'''
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    return '\n'.join('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+                     for row in rows)
+
+
+class CoverageStore(object):
+    '''
+    A SQLite database holding the report data of every coverage run added to it.
+
+    Each run is a row of ``runs``, and each of its tests a row of ``tests``, which keeps the
+    test's full report data as JSON alongside the indexed categories, name and status columns.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def add_run(self, data, product_hierarchy, interface_type=None, test_framework=None,
+                timestamp=None):
+        '''
+        Append a run and its report data, in a single transaction, and return the run's ID.
+
+        Args:
+            data: an iterable of the report's data dictionaries; it is read once, in chunks,
+                so a generator never has to be held in memory.
+            timestamp: the Unix timestamp of the run (the current time if None).
+        '''
+        timestamp = float(timestamp) if timestamp else time.time()
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO runs (product_hierarchy, interface_type, test_framework, timestamp,'
+                ' version) VALUES (?, ?, ?, ?, ?)',
+                (product_hierarchy, interface_type, test_framework, timestamp, __version__))
+            run_id = cursor.lastrowid
+            rows = ((run_id, _categories_key(item.get('Categories')), item.get('Test Name', ''),
+                     item.get('Status'), json.dumps(item)) for item in data)
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == INSERT_CHUNK_SIZE:
+                    self._insert_tests(chunk)
+                    chunk = []
+            self._insert_tests(chunk)
+        return run_id
+
+    def _insert_tests(self, rows):
+        self.connection.executemany(
+            'INSERT INTO tests (run_id, categories, test_name, status, data)'
+            ' VALUES (?, ?, ?, ?, ?)', rows)
+
+    def runs(self, product_hierarchy=None):
+        '''Yield (run ID, product hierarchy, timestamp, test count) for each run, oldest first.'''
+        query = ('SELECT runs.id, product_hierarchy, timestamp,'
+                 ' (SELECT COUNT(*) FROM tests WHERE run_id = runs.id) FROM runs')
+        params = ()
+        if product_hierarchy:
+            query += ' WHERE product_hierarchy = ?'
+            params = (product_hierarchy,)
+        return self.connection.execute(query + ' ORDER BY timestamp, runs.id', params)
+
+    def trend(self, product_hierarchy):
+        '''
+        Yield (timestamp, {status: test count}) for each run of product_hierarchy, oldest first.
+        '''
+        cursor = self.connection.execute(
+            'SELECT runs.id, timestamp, status, COUNT(*) FROM runs'
+            ' JOIN tests ON tests.run_id = runs.id WHERE product_hierarchy = ?'
+            ' GROUP BY runs.id, status ORDER BY timestamp, runs.id', (product_hierarchy,))
+        run_id = timestamp = counts = None
+        for row_run_id, row_timestamp, status, count in cursor:
+            if row_run_id != run_id:
+                if run_id is not None:
+                    yield timestamp, counts
+                run_id, timestamp, counts = row_run_id, row_timestamp, {}
+            counts[status] = count
+        if run_id is not None:
+            yield timestamp, counts
+
+    def history(self, test_name, categories=None, product_hierarchy=None):
+        '''
+        Yield (timestamp, product hierarchy, report data) for each run of the named test.
+
+        Args:
+            categories: the test's full categories list, to pick one of several tests
+                with the same name.
+            product_hierarchy: only include the runs of this product.
+        '''
+        query = ('SELECT timestamp, product_hierarchy, data FROM tests'
+                 ' JOIN runs ON tests.run_id = runs.id WHERE test_name = ?')
+        params = [test_name]
+        if categories:
+            query += ' AND categories = ?'
+            params.append(_categories_key(categories))
+        if product_hierarchy:
+            query += ' AND product_hierarchy = ?'
+            params.append(product_hierarchy)
+        cursor = self.connection.execute(query + ' ORDER BY timestamp, runs.id', params)
+        for timestamp, product_hierarchy, data in cursor:
+            yield timestamp, product_hierarchy, json.loads(data)
+
+
+def _print_runs(store, args):
+    rows = [('Run', 'Product Hierarchy', 'Timestamp', 'Tests')]
+    for run_id, product_hierarchy, timestamp, count in store.runs(args.product_hierarchy):
+        rows.append((str(run_id), product_hierarchy, _format_timestamp(timestamp), str(count)))
+    print(_table(rows))
+
+
+def _print_trend(store, args):
+    trend = list(store.trend(args.product_hierarchy))
+    statuses = sorted(set(chain.from_iterable(counts for _, counts in trend)), key=str)
+    rows = [tuple(['Timestamp', 'Tests'] + [str(x) for x in statuses])]
+    for timestamp, counts in trend:
+        row = [_format_timestamp(timestamp), str(sum(counts.values()))]
+        row.extend(str(counts.get(x, 0)) for x in statuses)
+        rows.append(tuple(row))
+    print(_table(rows))
+
+
+def _print_history(store, args):
+    rows = [('Timestamp', 'Product Hierarchy', 'Categories', 'Status', 'Tickets')]
+    for timestamp, product_hierarchy, data in store.history(args.test_name, args.categories,
+                                                            args.product_hierarchy):
+        # Every other list in the report data is a list of tickets.
+        ticket_lists = (value for key, value in sorted(data.items())
+                        if isinstance(value, list) and key not in ('Categories', 'Projects'))
+        tickets = list(chain.from_iterable(ticket_lists))
+        rows.append((_format_timestamp(timestamp), product_hierarchy,
+                     ' > '.join(data.get('Categories', [])), data.get('Status', ''),
+                     ', '.join(tickets)))
+    print(_table(rows))
+
+
+def _get_parser():
+    parser = argparse.ArgumentParser(
+        description='Query the coverage runs saved with --coverage-store.')
+    parser.add_argument('store', help='The coverage store (SQLite database) file')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    runs_parser = subparsers.add_parser('runs', help='List the saved runs')
+    runs_parser.add_argument('--product-hierarchy', default=None,
+                             help='Only list the runs of this product hierarchy')
+    runs_parser.set_defaults(func=_print_runs)
+
+    trend_parser = subparsers.add_parser(
+        'trend', help='Show the number of tests of each status in every run of a product')
+    trend_parser.add_argument('product_hierarchy', help='The product hierarchy to show')
+    trend_parser.set_defaults(func=_print_trend)
+
+    history_parser = subparsers.add_parser(
+        'history', help="Show a test's status and tickets in every run it was in")
+    history_parser.add_argument('test_name', help='The name of the test')
+    history_parser.add_argument('--categories', nargs='+', default=None,
+                                help="The test's full list of categories, if its name is"
+                                     ' not unique')
+    history_parser.add_argument('--product-hierarchy', default=None,
+                                help='Only show the runs of this product hierarchy')
+    history_parser.set_defaults(func=_print_history)
+    return parser
+
+
+def main():
+    args = _get_parser().parse_args()
+    with closing(CoverageStore(args.store)) as store:
+        args.func(store, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,140 @@
+from __future__ import print_function
+
 import argparse
 import fnmatch
+import hashlib
+import json
+import multiprocessing
 import os
 import sys
-from tempfile import mkdtemp
+from tempfile import mkdtemp, NamedTemporaryFile
 
 import attr
 import behave.parser
 
-from qe_coverage.base import TestGroup, run_reports, update_parser, coverage_tables
+from qe_coverage.base import TestGroup, run_reports, update_parser, get_tag_catalog
 from qecommon_tools import cleanup_and_exit, display_name
 
 
 # Any display name in nuisance_category_names will be omitted from the categories. 'features' is
 # ignored as it is a special name required in cucumber and meaningless for reporting.
 NUISANCE_CATEGORY_NAMES = ['features', '.']
-all_tags = [
-    t.tag for table in [coverage_tables[tab] for tab in coverage_tables.tables[1:]]
-    for t in table if t.tag != ''
-]
+# behave returns its own string subclasses for names and tags; those don't survive pickling,
+# so scenario data is converted to plain text before being passed between processes.
+text_type = type(u'')
+
+
+def _scenarios_from(file_path):
+    '''
+    Parse a feature file and return the data needed for coverage from each of its scenarios.
+
+    Returns:
+        list: A (scenario name, scenario tags, feature name, feature tags) tuple per scenario,
+        using only plain strings and lists so that the data can be passed between processes.
+    '''
+    feature = behave.parser.parse_file(file_path)
+    feature_tags = list(map(text_type, feature.tags))
+    return [(text_type(test.name), list(map(text_type, test.tags)), text_type(test.feature.name),
+             feature_tags) for test in feature.walk_scenarios()]
+
+
+def _parse_in_worker(file_path):
+    '''Process pool worker for _scenarios_from; returns None if the file could not be parsed.'''
+    try:
+        return _scenarios_from(file_path)
+    except Exception:
+        # Not all exceptions survive pickling (behave's ParserError does not), so the parent
+        # process re-parses any failed file itself, raising the error just as a serial run would.
+        return None
+
+
+def _content_hash(file_path):
+    with open(file_path, 'rb') as feature_file:
+        return hashlib.sha1(feature_file.read()).hexdigest()
+
+
+@attr.s
+class FeatureCache(object):
+    '''
+    An on-disk cache of the scenario data parsed from feature files, keyed by file path
+    relative to ``root``, so the same cache can be used from another clone or worktree.
+
+    A cached entry is used when the file's modification time and size are unchanged,
+    or, failing that, when the file's content hash is unchanged (such as after a fresh clone).
+    If ``changed_paths`` is given, cached entries for files not in it are used without checking.
+    The cache is only written to disk by ``save``.
+
+    Args:
+        cache_path: the path of the JSON file that holds the cache
+        clear: start from an empty cache, ignoring any existing cache file
+        root: the directory that cached file paths are relative to
+        changed_paths: the only files (if any) that may have changed since the cache was written
+    '''
+    FORMAT_VERSION = 2
+
+    cache_path = attr.ib()
+    clear = attr.ib(type=bool, default=False)
+    root = attr.ib(default='.')
+    changed_paths = attr.ib(default=None, converter=attr.converters.optional(
+        lambda paths: set(map(os.path.abspath, paths))))
+    entries = attr.ib(default=attr.Factory(dict), init=False)
+
+    def __attrs_post_init__(self):
+        if not self.clear and os.path.exists(self.cache_path):
+            self.entries = self._load()
+
+    def _signature(self):
+        # Parsed data depends on behave's parser, so a behave upgrade invalidates the cache.
+        return {'format': self.FORMAT_VERSION, 'behave': behave.__version__}
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as cache_file:
+                cache_data = json.load(cache_file)
+        except ValueError:
+            print('Ignoring unreadable parse cache: {}'.format(self.cache_path), file=sys.stderr)
+            return {}
+        if cache_data.get('signature') != self._signature():
+            return {}
+        return cache_data.get('entries', {})
+
+    def _key(self, file_path):
+        return os.path.relpath(file_path, self.root)
+
+    def get(self, file_path):
+        '''Return the cached scenario data for file_path, or None if it must be parsed.'''
+        entry = self.entries.get(self._key(file_path))
+        if entry is None:
+            return None
+        if self.changed_paths is not None and os.path.abspath(file_path) not in self.changed_paths:
+            return entry['scenarios']
+        stat = os.stat(file_path)
+        if entry['size'] != stat.st_size:
+            return None
+        if entry['mtime'] != stat.st_mtime:
+            if entry['hash'] != _content_hash(file_path):
+                return None
+            entry['mtime'] = stat.st_mtime
+        return entry['scenarios']
+
+    def set(self, file_path, scenarios):
+        stat = os.stat(file_path)
+        self.entries[self._key(file_path)] = {
+            'mtime': stat.st_mtime, 'size': stat.st_size, 'hash': _content_hash(file_path),
+            'scenarios': scenarios,
+        }
+
+    def save(self):
+        '''Write the cache, dropping entries for files that no longer exist.'''
+        entries = {key: entry for key, entry in self.entries.items()
+                   if os.path.exists(os.path.join(self.root, key))}
+        cache_dir = os.path.dirname(os.path.abspath(self.cache_path))
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        # Write to a temporary file and rename it, so an interrupted run can't corrupt the cache.
+        with NamedTemporaryFile('w', dir=cache_dir, delete=False) as cache_file:
+            json.dump({'signature': self._signature(), 'entries': entries}, cache_file)
+        os.rename(cache_file.name, self.cache_path)
 
 
 @attr.s
@@ -26,12 +143,8 @@ class ParseProject(object):
     leading_categories_to_strip = attr.ib(type=int, default=0)
     search_hidden = attr.ib(type=bool, default=False)
     exclude_patterns = attr.ib(default=attr.Factory(list))
-
-    def _feature_for(self, file_path):
-        '''Create a behave feature object and attach the relative path of the feature file.'''
-        feature = behave.parser.parse_file(file_path)
-        feature.relative_path = os.path.relpath(os.path.dirname(file_path), self.project_path)
-        return feature
+    jobs = attr.ib(type=int, default=1)
+    parse_cache = attr.ib(default=None)
 
     def _build_categories(self, relative_path):
         '''
@@ -55,15 +168,50 @@ class ParseProject(object):
             return False
         return not any(map(lambda x: fnmatch.fnmatch(check_path, x), self.exclude_patterns))
 
-    def _normalize_tag(self, tag):
-        if tag not in all_tags:
-            for expected_tag in all_tags:
-                if tag.startswith('{}-'.format(expected_tag)):
-                    return expected_tag
-        return tag
-
     def _normalize_tags(self, tags):
-        return list(map(self._normalize_tag, tags))
+        return list(map(get_tag_catalog().normalize_tag, tags))
+
+    def _feature_file_paths(self):
+        '''Yield the path of every included feature file, in directory walk order.'''
+        for dir_path, dir_names, file_names in os.walk(self.project_path):
+            # If items are removed from dir_names, os.walk will not search them.
+            dir_names[:] = list(filter(self._is_included, dir_names))
+            for file_name in fnmatch.filter(file_names, '*.feature'):
+                yield os.path.join(dir_path, file_name)
+
+    def _parse_feature_files(self, file_paths):
+        '''
+        Return the scenario data for each of file_paths, in the same order as file_paths.
+
+        Only files missing from the parse cache (if any) are parsed, and the cache is updated.
+        '''
+        if self.parse_cache is None:
+            return self._parse_uncached(file_paths)
+        parsed = list(map(self.parse_cache.get, file_paths))
+        uncached_paths = [path for path, scenarios in zip(file_paths, parsed) if scenarios is None]
+        fresh = dict(zip(uncached_paths, self._parse_uncached(uncached_paths)))
+        for file_path, scenarios in fresh.items():
+            self.parse_cache.set(file_path, scenarios)
+        return [fresh[path] if scenarios is None else scenarios
+                for path, scenarios in zip(file_paths, parsed)]
+
+    def _parse_uncached(self, file_paths):
+        '''
+        Parse each of file_paths and return the scenario data in the same order.
+
+        When more than one job is requested, the files are parsed in a process pool.
+        '''
+        if self.jobs <= 1 or len(file_paths) <= 1:
+            return list(map(_scenarios_from, file_paths))
+        pool = multiprocessing.Pool(min(self.jobs, len(file_paths)))
+        try:
+            chunk_size = max(1, len(file_paths) // (self.jobs * 4))
+            parsed = pool.map(_parse_in_worker, file_paths, chunk_size)
+        finally:
+            pool.close()
+            pool.join()
+        return [_scenarios_from(file_path) if scenarios is None else scenarios
+                for file_path, scenarios in zip(file_paths, parsed)]
 
     def build_coverage(self):
         '''
@@ -71,29 +219,41 @@ class ParseProject(object):
         feature files and parsing them into TestCoverage objects.
         '''
         tests = TestGroup('gherkin')
-        for dir_path, dir_names, file_names in os.walk(self.project_path):
-            # If items are removed from dir_names, os.walk will not search them.
-            dir_names[:] = list(filter(self._is_included, dir_names))
-            for file_name in fnmatch.filter(file_names, '*.feature'):
-                file_path = os.path.join(dir_path, file_name)
-                feature = self._feature_for(file_path)
-                categories = self._build_categories(feature.relative_path)
-                for test in feature.walk_scenarios():
-                    if not categories or test.feature.name != categories[-1]:
-                        # Only add the feature name if it doesn't match the last category
-                        categories.append(test.feature.name)
-                    tests.add(name=test.name, categories=categories,
-                              tags=self._normalize_tags(test.tags),
-                              parent_tags=test.feature.tags, file_path=file_path)
+        file_paths = list(self._feature_file_paths())
+        for file_path, scenarios in zip(file_paths, self._parse_feature_files(file_paths)):
+            relative_path = os.path.relpath(os.path.dirname(file_path), self.project_path)
+            categories = self._build_categories(relative_path)
+            for name, tags, feature_name, feature_tags in scenarios:
+                if not categories or feature_name != categories[-1]:
+                    # Only add the feature name if it doesn't match the last category
+                    categories.append(feature_name)
+                tests.add(name=name, categories=categories, tags=self._normalize_tags(tags),
+                          parent_tags=feature_tags, file_path=file_path)
+        if self.parse_cache is not None:
+            self.parse_cache.save()
         return tests
 
 
 def run_gherkin_reports(product_dir, *args, **kwargs):
     leading_categories_to_strip = kwargs.pop('leading_categories_to_strip', 0)
-    project = ParseProject(os.path.join(os.getcwd(), product_dir),
+    parse_cache_path = kwargs.pop('parse_cache', None)
+    clear_parse_cache = kwargs.pop('clear_parse_cache', False)
+    changed_files = kwargs.pop('changed_files', None)
+    project_path = os.path.join(os.getcwd(), product_dir)
+    parse_cache = None
+    if parse_cache_path:
+        changed_paths = None
+        if changed_files:
+            with open(changed_files) as changed_files_list:
+                changed_paths = [line.strip() for line in changed_files_list if line.strip()]
+        parse_cache = FeatureCache(parse_cache_path, clear_parse_cache, root=project_path,
+                                   changed_paths=changed_paths)
+    project = ParseProject(project_path,
                            leading_categories_to_strip=leading_categories_to_strip,
                            search_hidden=kwargs.pop('search_hidden', False),
-                           exclude_patterns=kwargs.pop('exclude_patterns', None) or [])
+                           exclude_patterns=kwargs.pop('exclude_patterns', None) or [],
+                           jobs=kwargs.pop('jobs', 1),
+                           parse_cache=parse_cache)
     test_list = project.build_coverage()
     run_reports(test_list, *args, **kwargs)
 
@@ -109,7 +269,20 @@ def main():
     parser.add_argument('--search_hidden', action='store_true', help='Include ".hidden" folders')
     parser.add_argument('--exclude', dest='exclude_patterns', action='append',
                         help='file and/or directory patterns that will be excluded')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='The number of processes to use for parsing feature files')
+    parser.add_argument('--parse-cache', default=None, metavar='CACHE_FILE',
+                        help='Cache parsed feature file data in CACHE_FILE, and only re-parse'
+                             ' feature files that have changed since the cache was written')
+    parser.add_argument('--clear-parse-cache', action='store_true',
+                        help='Ignore the existing contents of the --parse-cache file')
+    parser.add_argument('--changed-files', default=None, metavar='LIST_FILE',
+                        help='A file listing (one per line, relative to the current directory)'
+                             ' the only files that may have changed since the --parse-cache file'
+                             ' was written; cached data for other files is used without checking')
     product_kwargs = vars(parser.parse_args())
+    if product_kwargs['changed_files'] and not product_kwargs['parse_cache']:
+        parser.error('--changed-files requires --parse-cache')
     run_gherkin_reports(product_kwargs.pop('product_dir'), product_kwargs.pop('product_hierarchy'),
                         product_kwargs.pop('default_interface_type'), **product_kwargs)
 
@@ -74,7 +74,7 @@ from unittest_decorators import (quarantined, needs_work, nyi,
                                  not_tested, disable_docstring_hacking,
                                  staging_only, unless_coverage)
 
-from unittest_decorators import (check_ticket_type, STATUS_TAGS, _print_and_raise,
+from unittest_decorators import (check_ticket_type, get_status_tags, _print_and_raise,
                                  _get_coverage_tags_from, _all_ticket_ids_in,
                                  _environment_matches, _docstring_hacking_enabled,
                                  _add_text_to_docstring_summary_line, _tags_log_info)
@@ -144,7 +144,7 @@ def _mutate_tags_for_cafe(tags_list):
         ValueError if more than one Status tag has been used.
     '''
 
-    actual_status_tags = set(tags_list) & STATUS_TAGS
+    actual_status_tags = set(tags_list) & get_status_tags()
 
     # If there are no status tags in use, there is no need to mutate any
     # of the tags, so we can use them just as they are.
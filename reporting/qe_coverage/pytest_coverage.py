@@ -7,6 +7,15 @@ from qe_coverage.base import run_reports, TestGroup, HIERARCHY_FORMAT
 # Global variables used in hooks
 options = {}
 test_group = TestGroup('pytest')
+# The [node ID, TestGroup.add keyword arguments] of every test added to test_group, in plain
+# data that pytest-xdist can send from a worker to the controller.
+harvested_tests = []
+# The [node ID, message] of tests found without a tags marker during a collection-only run.
+untagged_tests = []
+# The node IDs of the tests merged from pytest-xdist workers, on the controller.
+_merged_node_ids = set()
+# Worker output key for the data above.
+WORKER_OUTPUT_KEY = 'qe_coverage'
 
 
 def pytest_addoption(parser):
@@ -18,6 +27,10 @@ def pytest_addoption(parser):
     group = parser.getgroup('qe_coverage')
     group.addoption('--qe-coverage', action='store_true',
                     help='Run QE-Tools qe_coverage')
+    group.addoption('--qe-coverage-collect-only', action='store_true',
+                    help='Run QE-Tools qe_coverage using only test collection: tags are '
+                         'gathered while collecting and every test is deselected, '
+                         'so no test setup or fixtures are run')
     group.addoption('--default-interface-type', choices='gui api'.split(),
                     help='The interface type of the product if it is not otherwise specified')
     group.addoption('--product-hierarchy',
@@ -28,6 +41,8 @@ def pytest_addoption(parser):
                     help='Preserve report files generated')
     group.addoption('--production-endpoint', action='store_true',
                     help='Send coverage data to the production endpoint')
+    group.addoption('--coverage-store', default=None, metavar='FILE',
+                    help='Also append the coverage data to this SQLite coverage store')
 
 
 def pytest_configure(config):
@@ -41,18 +56,44 @@ def pytest_configure(config):
     # so we're updating our object here, and will grab them with the
     # _get_global_option function
     global options
-    options['qe-coverage'] = config.getoption('--qe-coverage')
+    options['collect-only'] = config.getoption('--qe-coverage-collect-only')
+    options['qe-coverage'] = config.getoption('--qe-coverage') or options['collect-only']
     options['default-interface-type'] = config.getoption('--default-interface-type')
     options['product-hierarchy'] = config.getoption('--product-hierarchy')
     options['dry-run'] = config.getoption('--dry-run')
     options['preserve-files'] = config.getoption('--preserve-files')
     options['production-endpoint'] = config.getoption('--production-endpoint')
+    options['coverage-store'] = config.getoption('--coverage-store')
 
     # Add our @pytest.mark.tags info to be displayed with `pytest --markers`
     tag_marker_info = 'tags: List of qe_coverage tags to report in coverage_metrics schema'
     config.addinivalue_line('markers', tag_marker_info)
 
 
+def pytest_collection_modifyitems(session, config, items):
+    '''
+    Hook object called after collection has been performed
+
+    In a collection-only coverage run, gather the coverage data for every item here
+    and deselect them all, so that none of them are set up or run.
+
+    :param session: pytest session object
+    :param config: pytest config object
+    :param items: list of pytest.item objects collected, modified in place
+    '''
+    if not _get_global_option('collect-only'):
+        return
+
+    for item in items:
+        try:
+            _add_test(item.nodeid, _coverage_kwargs_from(item))
+        except NotImplementedError as e:
+            untagged_tests.append([item.nodeid, str(e)])
+
+    config.hook.pytest_deselected(items=list(items))
+    items[:] = []
+
+
 def pytest_runtest_setup(item):
     '''
     Hook object called before each test setup
@@ -64,6 +105,89 @@ def pytest_runtest_setup(item):
     if not _get_global_option('qe-coverage'):
         return
 
+    # add information to global test_group object that on completion of tests
+    # will run report
+    _add_test(item.nodeid, _coverage_kwargs_from(item))
+    pytest.skip()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    '''
+    Hook object called after the whole test run has finished
+
+    On a pytest-xdist worker, hand the gathered coverage data to the controller.
+
+    :param session: pytest session object
+    :param exitstatus: pytest exitstatus reported to system
+    '''
+    workeroutput = getattr(session.config, 'workeroutput', None)
+    if workeroutput is not None and _get_global_option('qe-coverage'):
+        workeroutput[WORKER_OUTPUT_KEY] = {'tests': harvested_tests, 'untagged': untagged_tests}
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    '''
+    pytest-xdist hook object called on the controller when a worker has finished
+
+    Merge the worker's coverage data into the controller's. In a collection-only run, every
+    worker collects every test, so a test (by node ID) already merged from another worker is
+    not added again. Different tests with the same test ID still are, to be reported as
+    duplicates.
+
+    :param node: pytest-xdist worker node object
+    :param error: description of the error that brought the worker down, if any
+    '''
+    worker_data = getattr(node, 'workeroutput', {}).get(WORKER_OUTPUT_KEY)
+    if not worker_data:
+        return
+    for node_id, test_kwargs in worker_data['tests']:
+        if node_id not in _merged_node_ids:
+            _merged_node_ids.add(node_id)
+            _add_test(node_id, test_kwargs)
+    for node_id, message in worker_data['untagged']:
+        if node_id not in _merged_node_ids:
+            _merged_node_ids.add(node_id)
+            untagged_tests.append([node_id, message])
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus):
+    '''
+    Hook object called at completion of test run before displaying summary
+
+    Used as hook as this is one of the last available hooks in pytest. Called before
+    providing terminal summary, we're just using it to process the report
+    :param terminalreporter: pytest terminalreporter object
+    :param exitstatus: pytest exitstatus reported to system
+    '''
+    kwargs = {
+        'dry_run': _get_global_option('dry-run') or False,
+        'preserve_files': _get_global_option('preserve-files'),
+        'production_endpoint': _get_global_option('production-endpoint'),
+        'coverage_store': _get_global_option('coverage-store'),
+    }
+    global test_group
+    # pytest-xdist workers hand their data to the controller, which reports for all of them.
+    is_xdist_worker = hasattr(terminalreporter.config, 'workerinput')
+    if _get_global_option('qe-coverage') and not is_xdist_worker:
+        test_group.errors.extend(message for _, message in untagged_tests)
+        run_reports(test_group, _get_global_option('product-hierarchy'),
+                    _get_global_option('default-interface-type'), **kwargs)
+
+
+def _coverage_kwargs_from(item):
+    '''
+    Gather the coverage data for a test from its markers
+
+    Args:
+        item: pytest.item object representing the test
+
+    Returns:
+        dict of TestGroup.add keyword arguments for the test
+
+    Raises:
+        NotImplementedError if the test has no tags marker
+    '''
     # look for @pytest.marker.tags and @pytest.marker.categories
     _tags = item.get_closest_marker('tags')
     _categories = item.get_closest_marker('categories')
@@ -84,31 +208,20 @@ def pytest_runtest_setup(item):
     _categories = list(_categories.args) if _categories else [test_class]
     _categories.append(test_name)
 
-    # add information to global test_group object that on completion of tests
-    # will run report
-    global test_group
-    test_group.add(name=test_name, categories=_categories, tags=_tags)
-    pytest.skip()
+    return {'name': test_name, 'categories': _categories, 'tags': _tags}
 
 
-def pytest_terminal_summary(terminalreporter, exitstatus):
+def _add_test(node_id, test_kwargs):
     '''
-    Hook object called at completion of test run before displaying summary
+    Add a test to the global test_group
 
-    Used as hook as this is one of the last available hooks in pytest. Called before
-    providing terminal summary, we're just using it to process the report
-    :param terminalreporter: pytest terminalreporter object
-    :param exitstatus: pytest exitstatus reported to system
+    Args:
+        node_id: the pytest node ID of the test
+        test_kwargs: TestGroup.add keyword arguments for the test
     '''
-    kwargs = {
-        'dry_run': _get_global_option('dry-run') or False,
-        'preserve_files': _get_global_option('preserve-files'),
-        'production_endpoint': _get_global_option('production-endpoint'),
-    }
+    harvested_tests.append([node_id, test_kwargs])
     global test_group
-    if _get_global_option('qe-coverage'):
-        run_reports(test_group, _get_global_option('product-hierarchy'),
-                    _get_global_option('default-interface-type'), **kwargs)
+    test_group.add(**test_kwargs)
 
 
 def _get_global_option(_option=None):
@@ -15,7 +15,7 @@ import json
 import os
 import sys
 from tempfile import mkdtemp
-from xml.sax import parse
+from xml.parsers import expat
 from xml.sax.handler import ContentHandler
 
 from qe_coverage.base import TestGroup, update_parser, run_reports
@@ -69,6 +69,9 @@ def test_case_name_sanitize(name):
 class TestLinkContentHandler(ContentHandler):
     '''Process TestLink XML file.
 
+    Deprecated: ``testlink_xml_to_test_group`` uses the faster ``TestLinkXMLParser``;
+    this handler is kept for callers that parse with it directly.
+
     NOTE: keyword element's name is what we call 'tag' in the coverage reporting.
     '''
 
@@ -137,13 +140,104 @@ class TestLinkContentHandler(ContentHandler):
             helper()
 
 
+class TestLinkXMLParser(object):
+    '''Process TestLink XML file with expat, the faster, lower-memory alternative to SAX.
+
+    No element tree is built: only the current test suite path and test case are kept,
+    and each test case is handed to ``add_test`` (typically ``TestGroup.add``) as soon
+    as it ends. Element handlers are looked up in a dispatch table built once, and
+    warnings are collected in ``warnings`` rather than printed as they are found.
+
+    NOTE: keyword element's name is what we call 'tag' in the coverage reporting.
+    '''
+
+    def __init__(self, leading_categories_to_strip, add_test):
+        self.leading_categories_to_strip = leading_categories_to_strip
+        self.add_test = add_test
+        self.categories = []
+        self.testcase = None
+        self.tags = None
+        self.last_testcase = '<No Test Case processed yet>'
+        self.warnings = []
+        self._start_handlers = {
+            'testsuite': self.start_testsuite,
+            'testcase': self.start_testcase,
+            'keyword': self.start_keyword,
+        }
+        self._end_handlers = {
+            'testsuite': self.end_testsuite,
+            'testcase': self.end_testcase,
+        }
+        self._parser = expat.ParserCreate()
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+
+    def parse_file(self, xml_file_name):
+        with open(xml_file_name, 'rb') as xml_file:
+            self._parser.ParseFile(xml_file)
+
+    def _start_element(self, element, attrs):
+        handler = self._start_handlers.get(element.lower())
+        if handler is not None:
+            handler(attrs)
+
+    def _end_element(self, element):
+        handler = self._end_handlers.get(element.lower())
+        if handler is not None:
+            handler()
+
+    def start_testsuite(self, attrs):
+        self.categories.append(neuter_unicode(attrs.get('name')))
+
+    def end_testsuite(self):
+        assert self.categories, 'Ended more test suites than were started'
+        self.categories.pop()
+
+    def start_testcase(self, attrs):
+        assert not self.testcase, 'test cases should not be nested!'
+        self.testcase = test_case_name_sanitize(attrs.get('name'))
+        self.tags = []
+
+    def end_testcase(self):
+        assert self.testcase, 'ended a test case but not in one'
+        categories = _cleanup_categories(self.categories, self.leading_categories_to_strip)
+        # Workaround: See https://jira.rax.io/browse/QET-26 Default to manual, not automated.
+        if 'automated' not in self.tags:
+            self.tags.append('manual')
+        # TestLink data doesn't come from a file system with hierarchical
+        # file names, so pass in file_path as the TestLink categories path
+        # to make it easier for humans to find the test if/when an error
+        # report is generated.
+        self.add_test(name=self.testcase, categories=categories,
+                      tags=self.tags, file_path=':'.join(self.categories))
+        self.last_testcase = self.testcase
+        self.testcase = None
+        self.tags = None  # Cannot append to none, leave poison pill in case.
+
+    def start_keyword(self, attrs):
+        name = neuter_unicode(attrs.get('name'))
+        if not self.testcase:
+            # NOTE: Experiments with the GSCS QE TestLink data shows that the
+            # locator line-number by itself isn't accurate for reasons still TBD,
+            # so print the name of the last test case seen before the problem,
+            # which helps human reader of the XML to find out where the errant keyword is.
+            msg = 'Warning: Line {}: Ignoring keyword "{}" found outside of test case, after {}'
+            self.warnings.append(msg.format(self._parser.CurrentLineNumber, name,
+                                            self.last_testcase))
+            return
+        self.tags.append(name)
+
+
 def testlink_xml_to_test_group(xml_file_name, leading_categories_to_strip):
     '''
     Returns a TestGroup containing all the test data from xml_file_name.
     '''
-    content = TestLinkContentHandler(leading_categories_to_strip)
-    parse(xml_file_name, content)
-    return content.tests
+    tests = TestGroup('testlink')
+    content = TestLinkXMLParser(leading_categories_to_strip, tests.add)
+    content.parse_file(xml_file_name)
+    if content.warnings:
+        print('\n'.join(content.warnings))
+    return tests
 
 
 def run_testlink_reports(testlink_xml_file, *args, **kwargs):
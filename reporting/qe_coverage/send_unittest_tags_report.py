@@ -32,10 +32,12 @@ due to tooling limitations. Fixing this is captured in Jira QGTM-671.
 
 import argparse
 import csv
+import hashlib
 import json
 import re
 
 from qe_coverage.base import TestGroup, update_parser, run_reports
+from qe_coverage.coverage_io import coverage_records, open_coverage_json
 
 
 # Map from a directory name (in the categories hierarchy)
@@ -83,30 +85,91 @@ def _get_test_identifier(test_class_name, test_method_name):
     return '{}.{}'.format(test_class_name, test_method_name)
 
 
+def _injection_rows(data_injection_file_path):
+    '''Yield a (test identifier, tags) tuple per row of a data injection file.'''
+    with open(data_injection_file_path, 'r') as data_injection_file:
+        for row in csv.reader(data_injection_file):
+            # CSV format of: class_name, test_method_name, tag1, tag2, etc.
+            class_name = row[0]
+            test_method_name = row[1]
+            tags = row[2:]
+            yield _get_test_identifier(class_name, test_method_name), tags
+
+
 def _get_injection_data(data_injection_file_path):
-    '''Get injection data from a data injection file.'''
-    injection_data = {}
-
-    if data_injection_file_path:
-        with open(data_injection_file_path, 'r') as data_injection_file:
-            data_injection_csv = csv.reader(data_injection_file)
-            for row in data_injection_csv:
-                # CSV format of: class_name, test_method_name, tag1, tag2, etc.
-                class_name = row[0]
-                test_method_name = row[1]
-                tags = row[2:]
-                identifier = _get_test_identifier(class_name, test_method_name)
-                injection_data[identifier] = {
-                    'tags': tags
-                }
-
-    return injection_data
-
-
-def coverage_json_to_test_group(coverage_file_name, default_interface_type,
+    '''
+    Get injection data from a data injection file.
+
+    This is the one piece of ingestion kept in memory: it is looked up by test identifier
+    while the (much larger) coverage file streams past, in whatever order it was written.
+    '''
+    if not data_injection_file_path:
+        return {}
+    return {identifier: {'tags': tags}
+            for identifier, tags in _injection_rows(data_injection_file_path)}
+
+
+def _unique_coverage_records(coverage_file_names):
+    '''
+    Yield the test data from each coverage file in turn, skipping records of earlier files.
+
+    Parallel or sharded runs leave one coverage file per worker, and a test may be
+    reported by more than one worker; only the first file's copy of it is kept.
+    A record repeated within one file is not a repeat from another worker, so it is
+    kept, to be reported as a duplicate by TestGroup validation.
+    Only a hash of each record is remembered, so the records themselves are still streamed.
+    '''
+    seen = set()
+    for coverage_file_name in coverage_file_names:
+        seen_in_file = set()
+        with open_coverage_json(coverage_file_name) as json_lines:
+            for test_data in coverage_records(json_lines):
+                record_hash = hashlib.sha1(
+                    json.dumps(test_data, sort_keys=True).encode('utf-8')
+                ).digest()
+                if record_hash in seen:
+                    continue
+                seen_in_file.add(record_hash)
+                yield test_data
+        seen.update(seen_in_file)
+
+
+def _test_coverage_kwargs(test_data, default_interface_type, leading_categories_to_strip,
+                          injection_data):
+    '''Returns the ``TestGroup.add`` keyword arguments for one test's coverage data.'''
+    categories, interface = _parse_provenance(test_data['provenance'],
+                                              default_interface_type,
+                                              leading_categories_to_strip)
+
+    # The class name is the last category as parsed from the provenance
+    test_method_name = test_data['test']
+    test_class_name = categories[-1]
+    test_identifier = _get_test_identifier(test_class_name, test_method_name)
+
+    test_coverage_kwargs = {
+        'name': test_method_name,
+        'categories': categories,
+        'tags': test_data['tags']
+    }
+
+    if test_identifier in injection_data:
+        for key, value in injection_data[test_identifier].items():
+            test_coverage_kwargs[key] += value
+
+    return test_coverage_kwargs
+
+
+def coverage_json_to_test_group(coverage_file_names, default_interface_type,
                                 leading_categories_to_strip, injection_data):
     '''
-    Returns a TestGroup containing all the test data from the coverage file.
+    Returns a TestGroup containing all the test data from the coverage file(s).
+
+    ``coverage_file_names`` may be a single file name or a list of them, such as the
+    per-worker files of a parallel run; their data is merged, and a test reported
+    identically in more than one file is only added once (from the first of them).
+
+    A coverage file may be gzip-compressed. It is read, parsed and added to the
+    TestGroup one line at a time, so the file is never held in memory as a whole.
 
     Where any test data doesn't contain interface information,
     use default_interface_type.
@@ -114,38 +177,20 @@ def coverage_json_to_test_group(coverage_file_name, default_interface_type,
     Any injection data provided will be appended to a test's coverage data
     before it is added to the TestGroup.
     '''
+    if not isinstance(coverage_file_names, (list, tuple)):
+        coverage_file_names = [coverage_file_names]
     tests = TestGroup('unittest')
 
-    with open(coverage_file_name) as json_lines:
-        for line in json_lines.readlines():
-            test_data = json.loads(line)
-            categories, interface = _parse_provenance(test_data['provenance'],
-                                                      default_interface_type,
-                                                      leading_categories_to_strip)
-
-            # The class name is the last category as parsed from the provenance
-            test_method_name = test_data['test']
-            test_class_name = categories[-1]
-            test_identifier = _get_test_identifier(test_class_name, test_method_name)
-
-            test_coverage_kwargs = {
-                'name': test_method_name,
-                'categories': categories,
-                'tags': test_data['tags']
-            }
-
-            if test_identifier in injection_data:
-                for key, value in injection_data[test_identifier].items():
-                    test_coverage_kwargs[key] += value
-
-            tests.add(**test_coverage_kwargs)
+    for test_data in _unique_coverage_records(coverage_file_names):
+        tests.add(**_test_coverage_kwargs(test_data, default_interface_type,
+                                          leading_categories_to_strip, injection_data))
 
     return tests
 
 
-def run_unittest_reports(coverage_json_file, *args, **kwargs):
+def run_unittest_reports(coverage_json_files, *args, **kwargs):
     injection_data = _get_injection_data(kwargs.get('data_injection_file_path'))
-    test_group = coverage_json_to_test_group(coverage_json_file, args[0],
+    test_group = coverage_json_to_test_group(coverage_json_files, args[0],
                                              kwargs.get('leading_categories_to_strip'),
                                              injection_data)
     run_reports(test_group, *args, **kwargs)
@@ -153,11 +198,13 @@ def run_unittest_reports(coverage_json_file, *args, **kwargs):
 
 def main():
     parser = argparse.ArgumentParser(description='Send Unittest/OpenCAFE coverage report')
-    parser.add_argument('coverage_json_file',
-                        help='The name of the coverage json file to process')
+    parser.add_argument('coverage_json_files', nargs='+', metavar='coverage_json_file',
+                        help='The name of the coverage json file to process '
+                             '(may be gzip-compressed); the data from several files, '
+                             'such as one per parallel worker, is merged')
     parser = update_parser(parser)
     kwargs = vars(parser.parse_args())
-    run_unittest_reports(kwargs.pop('coverage_json_file'), kwargs.pop('product_hierarchy'),
+    run_unittest_reports(kwargs.pop('coverage_json_files'), kwargs.pop('product_hierarchy'),
                          kwargs.pop('default_interface_type'), **kwargs)
 
 
@@ -72,7 +72,8 @@ from unittest import skip, SkipTest
 
 import wrapt
 
-from qe_coverage.base import STATUS_TAGS, TICKET_RE_PATTERNS, KnownStructuredTags, check_ticket_type
+from qe_coverage.base import (TICKET_RE_PATTERNS, KnownStructuredTags, check_ticket_type,
+                              get_status_tags)
 
 
 _cafe_tags = None
@@ -116,12 +117,83 @@ if _TAGS_INFO_DIR_NAME is None:
     unless_coverage = _tags_log_info
 else:
     import json
+    from multiprocessing import util as _mp_util
+    import os
+    import signal
     from tempfile import NamedTemporaryFile
 
+    _BUFFER_BYTES_ENV_NAME = 'COLLECT_TAGS_BUFFER_BYTES'
+    _DEFAULT_BUFFER_BYTES = 1024 * 1024
+
+    class _CoverageLineBuffer(object):
+        '''
+        Accumulate coverage json-lines in memory and write them out in large chunks.
+
+        Pending lines are written once more than ``threshold`` bytes are held,
+        and whatever is left is written at interpreter exit, at the exit of a
+        ``multiprocessing`` child (such as an OpenCAFE parallel worker, which skips
+        ``atexit``), and on ``SIGTERM``. A ``threshold`` of 0 writes every line as
+        soon as it is added.
+
+        Each chunk is a single write of whole lines straight to the file descriptor,
+        so forked workers sharing the file never interleave partial lines.
+        '''
+
+        def __init__(self, report_file, threshold):
+            self.report_file = report_file
+            self.threshold = threshold
+            self._lines = []
+            self._size = 0
+
+        def add(self, line):
+            self._lines.append(line.encode('utf-8'))
+            self._size += len(self._lines[-1])
+            if self._size > self.threshold:
+                self.flush()
+
+        def flush(self):
+            data = b''.join(self._lines)
+            self._lines = []
+            self._size = 0
+            fd = self.report_file.fileno()
+            while data:
+                data = data[os.write(fd, data):]
+
+        def close(self):
+            if not self.report_file.closed:
+                self.flush()
+                self.report_file.close()
+
+        def discard_inherited(self):
+            '''Drop lines a forked child inherited; the parent still owns and writes them.'''
+            self._lines = []
+            self._size = 0
+            _mp_util.Finalize(self, self.flush, exitpriority=100)
+
+        def flush_on_sigterm(self):
+            '''Flush before a default-handled ``SIGTERM`` ends the process.'''
+            try:
+                if signal.getsignal(signal.SIGTERM) != signal.SIG_DFL:
+                    return  # The test runner has its own handling; leave it alone.
+                signal.signal(signal.SIGTERM, self._handle_sigterm)
+            except ValueError:
+                pass  # Not imported on the main thread, signals can't be set from here.
+
+        def _handle_sigterm(self, signum, frame):
+            self.close()
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+
     _coverage_report_file = NamedTemporaryFile(mode='w', suffix='.json', prefix='coverage-',
                                                dir=_TAGS_INFO_DIR_NAME, delete=False)
-    # Make sure the file is closed on interpreter exit.
-    register(_coverage_report_file.close)
+    _coverage_buffer = _CoverageLineBuffer(
+        _coverage_report_file,
+        int(environ.get(_BUFFER_BYTES_ENV_NAME, _DEFAULT_BUFFER_BYTES))
+    )
+    # Make sure everything buffered is written out and the file closed on interpreter exit.
+    register(_coverage_buffer.close)
+    _coverage_buffer.flush_on_sigterm()
+    _mp_util.register_after_fork(_coverage_buffer, _CoverageLineBuffer.discard_inherited)
 
     @wrapt.decorator
     def unless_coverage(wrapped, instance, args, kwargs):
@@ -149,11 +221,7 @@ else:
         tags_data['tags'] = _get_coverage_tags_from(wrapped)
         _apply_class_category_tags(instance, tags_data['tags'])
 
-        json.dump(tags_data, _coverage_report_file, sort_keys=True)
-        _coverage_report_file.write('\n')
-        # It's annoying to have to flush all the time, but when I tried putting
-        # flush 'atexit' time, it didn't work. I didn't dig deeply in to why.
-        _coverage_report_file.flush()
+        _coverage_buffer.add(json.dumps(tags_data, sort_keys=True) + '\n')
 
 # Ensure the sphinx docs have useful documentation for `unless_coverage`
 unless_coverage.__doc__ = '''
@@ -389,7 +457,7 @@ def _ensure_single_status_tag_used(tags_list):
         ValueError if more than one Status tag has been used.
     '''
 
-    actual_status_tags = set(tags_list) & STATUS_TAGS
+    actual_status_tags = set(tags_list) & get_status_tags()
 
     # If there are no status tags in use, there is no need to mutate any
     # of the tags, so we can use them just as they are.
@@ -14,7 +14,9 @@ CONSOLE_SCRIPTS = [
     'coverage-unittest=qe_coverage.collect_unittest_coverage:main',
     'coverage-testlink=qe_coverage.send_testlink_tags_report:main',
     'coverage-history=qe_coverage.coverage_historical_repo:main',
-    'coverage-list=qe_coverage.coverage_product_list:main'
+    'coverage-list=qe_coverage.coverage_product_list:main',
+    'coverage-store=qe_coverage.coverage_store:main',
+    'coverage-diff=qe_coverage.coverage_diff:main',
 ]
 
 INSTALL_REQUIRES = [
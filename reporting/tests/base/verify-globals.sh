@@ -0,0 +1,35 @@
+#! /bin/bash
+
+# The former import-time globals of qe_coverage.base are computed on first use.
+# Make sure the ways they were used before still work, and that importing them
+# (or the decorators) doesn't parse coverage.rst.
+
+set -e
+
+python - <<'PYTHON'
+from tableread import SimpleRSTReader
+
+import qe_coverage.base as base
+from qe_coverage.base import (STATUS_TAGS, TICKET_STATUS_DISPLAY_NAMES, coverage_tables,
+                              status_table)
+import qe_coverage.unittest_decorators  # noqa: F401
+
+assert base._coverage_tables is None, 'coverage.rst was parsed at import'
+
+tags = ['smoke', 'quarantined', 'JIRA-1234']
+assert set(tags) & STATUS_TAGS == {'quarantined'}
+assert STATUS_TAGS & set(tags) == {'quarantined'}
+assert set(tags) - STATUS_TAGS == {'smoke', 'JIRA-1234'}
+assert 'unstable' in STATUS_TAGS and STATUS_TAGS | {'x'} > STATUS_TAGS
+assert isinstance(STATUS_TAGS, set)
+assert STATUS_TAGS == set(status_table.get_fields('tag'))
+
+assert isinstance(TICKET_STATUS_DISPLAY_NAMES, list)
+assert ['Test Name'] + TICKET_STATUS_DISPLAY_NAMES == ['Test Name', 'Tickets'] + sorted(
+    status_table.get_fields('report_as'))
+
+assert isinstance(coverage_tables, SimpleRSTReader)
+assert coverage_tables['Status'].exclude_by(tag='').get_fields('tag') == \
+    status_table.get_fields('tag')
+PYTHON
+echo "The former qe_coverage.base globals work as they did"
@@ -0,0 +1,29 @@
+#! /bin/bash
+
+# A test with no categories can't be given a test ID, but with validation off it
+# must still be added to a TestGroup and make it into the report.
+
+set -e
+
+WORK_DIR=$(mktemp -d)
+trap 'rm -rf "$WORK_DIR"' EXIT
+
+WORK_DIR="$WORK_DIR" python - <<'PYTHON'
+import os
+
+from qe_coverage.base import CoverageReport, TestGroup
+
+tests = TestGroup('unittest')
+tests.add(name='test_uncategorized', tags=['smoke', 'positive'], file_path='first.py')
+tests.add(name='test_uncategorized', tags=['smoke', 'positive'], file_path='second.py')
+tests.add(name='test_categorized', categories=['Tests'], tags=['smoke', 'positive'])
+assert len(tests.tests) == 3
+assert any('appeared more than once, first in first.py' in x for x in tests.errors)
+
+report = CoverageReport(tests, 'Team::Product', 'api', output_dir=os.environ['WORK_DIR'],
+                        preserve_files=True, validate=False)
+report.write_report()
+names = [x['Test Name'] for x in report.data]
+assert names == ['test_uncategorized', 'test_uncategorized', 'test_categorized'], names
+PYTHON
+echo "Tests without categories are added and reported when validation is off"
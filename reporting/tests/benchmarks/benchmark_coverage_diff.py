@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+'''
+Measure coverage-diff on pairs of synthetic reports of increasing size.
+
+Usage: python benchmark_coverage_diff.py [--tests N [N ...]] [--partitions P] [--keep-dir DIR]
+
+For each size, an "old" JSON-lines report of N tests is written, and a "new" one where
+about 1% of the tests were removed, 1% added, 2% changed status and 2% gained a ticket.
+``coverage-diff`` is then run on them in a child process, whose time and peak memory (max
+RSS) are reported, so it can be seen that the time grows linearly with the size of the
+reports while the memory used does not grow past that of one partition.
+The number of differences found is checked against the number made.
+'''
+
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import POLARITIES, PRIORITIES, SUITES
+
+STATUSES = ['operational'] * 16 + ['quarantined', 'needs work', 'unstable', 'pending']
+
+
+def _report_item(rng, index):
+    item = {
+        'Product Hierarchy': 'Team::Product',
+        'Interface Type': 'api',
+        'Test Name': 'Scenario {}'.format(index),
+        'Categories': ['Category {}'.format(rng.randint(1, 20)), 'Feature {}'.format(index // 25)],
+        'Polarity': rng.choice(POLARITIES),
+        'Priority': rng.choice(PRIORITIES) or 'p1',
+        'Suite': rng.choice(SUITES) or 'regression',
+        'Status': rng.choice(STATUSES),
+        'Execution Method': 'automated',
+        'Tickets': ['JIRA-{}'.format(rng.randint(1, 5000))],
+    }
+    if item['Status'] != 'operational':
+        item[item['Status']] = ['JIRA-{}'.format(rng.randint(1, 5000))]
+    return item
+
+
+def write_reports(old_path, new_path, count, seed=0):
+    '''Write the old and new synthetic reports, and return the number of differences made.'''
+    rng = random.Random(seed)
+    differences = 0
+    with io.open(old_path, 'w', encoding='utf-8') as old, \
+            io.open(new_path, 'w', encoding='utf-8') as new:
+        for index in range(count):
+            item = _report_item(rng, index)
+            old.write(u'{}\n'.format(json.dumps(item)))
+            roll = rng.random()
+            if roll < 0.01:
+                differences += 1
+                continue
+            if roll < 0.02:
+                differences += 1
+                new.write(u'{}\n'.format(json.dumps(_report_item(rng, count + index))))
+            elif roll < 0.04:
+                item['Status'] = 'quarantined' if item['Status'] == 'operational' else 'operational'
+                differences += 1
+            elif roll < 0.06:
+                item['Tickets'] = item['Tickets'] + ['JIRA-{}'.format(rng.randint(5001, 9999))]
+                differences += 1
+            new.write(u'{}\n'.format(json.dumps(item)))
+    return differences
+
+
+def _run_diff(old_path, new_path, partitions):
+    '''Run coverage-diff, and return its (number of differences, seconds, max RSS in MB).'''
+    command = [sys.executable, '-m', 'qe_coverage.coverage_diff', '--json-lines',
+               old_path, new_path]
+    if partitions:
+        command.extend(['--partitions', str(partitions)])
+    start = time.time()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True)
+    lines = sum(1 for _ in process.stdout)
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.time() - start
+    assert status == 0, 'coverage-diff failed'
+    # ru_maxrss is in KB on Linux
+    return lines, seconds, usage.ru_maxrss / 1024.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tests', type=int, nargs='+', default=[250000, 500000, 1000000, 2000000],
+                        help='The numbers of tests in the synthetic reports to compare')
+    parser.add_argument('--partitions', type=int, default=None,
+                        help='Pass --partitions to coverage-diff (default: its own choice)')
+    parser.add_argument('--keep-dir', metavar='DIR',
+                        help='Write the synthetic reports to DIR and keep them')
+    args = parser.parse_args()
+
+    report_dir = args.keep_dir or tempfile.mkdtemp(prefix='benchmark-coverage-diff-')
+    if not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+    line = '{:>9} tests ({:6.1f} MB): {:8.2f}s ({:5.2f} us/test), max RSS {:7.1f} MB'
+    try:
+        for count in args.tests:
+            old_path = os.path.join(report_dir, 'old-{}.jsonl'.format(count))
+            new_path = os.path.join(report_dir, 'new-{}.jsonl'.format(count))
+            differences = write_reports(old_path, new_path, count)
+            found, seconds, max_rss = _run_diff(old_path, new_path, args.partitions)
+            assert found == differences, 'found {} of {} differences'.format(found, differences)
+            size = os.path.getsize(old_path) / 1e6
+            print(line.format(count, size, seconds, seconds * 1e6 / count, max_rss))
+    finally:
+        if not args.keep_dir:
+            shutil.rmtree(report_dir)
+
+
+if __name__ == '__main__':
+    main()
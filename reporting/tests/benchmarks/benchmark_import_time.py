@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+'''
+Import-time regression benchmark for ``qe_coverage.unittest_decorators``.
+
+Usage: python benchmark_import_time.py [--runs N] [--max-seconds S]
+
+Every test process that uses the coverage decorators imports this module and decorates
+its tests, so each run imports it in a fresh interpreter, then decorates a test with
+``@tags`` (including a status tag), and reports the median time of each.
+The benchmark fails (non-zero exit) if importing the module or decorating the test parses
+all of ``coverage.rst`` (only its Status table is needed), if importing it imports
+``sqlite3`` (only needed for ``--coverage-store``), or if ``--max-seconds`` is given and
+the median import time exceeds it.
+'''
+
+from __future__ import print_function
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+MODULE = 'qe_coverage.unittest_decorators'
+
+IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.time()
+import {module}
+elapsed = time.time() - start
+import qe_coverage.base as base
+from tableread import SimpleRSTReader
+# Older versions parsed the tables into the ``coverage_tables`` global at import time.
+# (type(), as isinstance() would ask a lazy stand-in for its class, and so parse them.)
+parsed = (getattr(base, '_coverage_tables', None) is not None
+          or type(vars(base).get('coverage_tables')) is SimpleRSTReader)
+sqlite3 = 'sqlite3' in sys.modules
+
+start = time.time()
+@{module}.tags('smoke', 'positive', 'quarantined', 'JIRA-1234')
+def test_decorated():
+    pass
+decorate_seconds = time.time() - start
+print(json.dumps({{'seconds': elapsed, 'parsed': parsed, 'sqlite3': sqlite3,
+                  'decorate_seconds': decorate_seconds,
+                  'decorate_parsed': getattr(base, '_coverage_tables', None) is not None}}))
+'''.format(module=MODULE)
+
+
+def _time_one_import():
+    output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT],
+                                     universal_newlines=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=15,
+                        help='The number of fresh interpreters to time the import in')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='Fail if the median import time is above this many seconds')
+    args = parser.parse_args()
+
+    results = [_time_one_import() for _ in range(args.runs)]
+    line = '{}: median {:.1f}ms, min {:.1f}ms, max {:.1f}ms over {} runs'
+    for name, key in (('import {}'.format(MODULE), 'seconds'),
+                      ('first @tags', 'decorate_seconds')):
+        timings = sorted(x[key] for x in results)
+        print(line.format(name, timings[len(timings) // 2] * 1000, timings[0] * 1000,
+                          timings[-1] * 1000, args.runs))
+    timings = sorted(x['seconds'] for x in results)
+    median = timings[len(timings) // 2]
+
+    failures = []
+    if any(x['parsed'] for x in results):
+        failures.append('coverage.rst was parsed at import time')
+    if any(x['sqlite3'] for x in results):
+        failures.append('sqlite3 was imported at import time')
+    if any(x['decorate_parsed'] for x in results):
+        failures.append('coverage.rst was parsed to decorate a test')
+    if args.max_seconds is not None and median > args.max_seconds:
+        failures.append('median import time is above {}s'.format(args.max_seconds))
+    for failure in failures:
+        print('REGRESSION: {}'.format(failure), file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
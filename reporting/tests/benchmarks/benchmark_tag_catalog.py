@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+'''
+Compare building a TestGroup with the tag catalog against the original table-scan lookups.
+
+Usage: python benchmark_tag_catalog.py [--tests N]
+
+The "table scan" numbers re-create the original ``TestCoverage`` lookups, which
+filtered the ``coverage.rst`` tables for every tag of every test, so both timings
+are measured against the same synthetic corpus in the same process.
+'''
+
+from __future__ import print_function
+
+import argparse
+import re
+import time
+
+from qe_coverage.base import (TestCoverage, TestGroup, check_ticket_type, get_coverage_tables,
+                              NO_STATUS_TICKET_KEY)
+
+from synthetic import synthetic_tests
+
+
+class TableScanTestCoverage(TestCoverage):
+    '''``TestCoverage`` with the original per-test table scans, for comparison.'''
+
+    def organize_prescriptives(self):
+        coverage_tables = get_coverage_tables()
+        values = []
+        for attribute in coverage_tables.tables[1:]:
+            attribute_table = coverage_tables[attribute]
+            valid_tags = attribute_table.exclude_by(tag='').get_fields('tag')
+            default_value = attribute_table.matches_all(tag='').get_fields('report_as')
+            default_value = default_value[0] if default_value else ''
+            found_tags = set(self.tags + self.parent_tags) & set(valid_tags)
+            if found_tags:
+                value = attribute_table.matches_all(tag=found_tags.pop()).data[0].report_as
+            else:
+                value = re.sub('`.*`', '', default_value)
+            values.append(value)
+        self._prescriptive_values = tuple(values)
+
+    def _organize_tickets(self, tag_list):
+        status_table = get_coverage_tables()['Status'].exclude_by(tag='')
+        status = None
+        for tag in tag_list:
+            if tag in status_table.get_fields('tag'):
+                status = status_table.matches_all(tag=tag).data[0].report_as
+                self.tickets.setdefault(status, [])
+                continue
+            if check_ticket_type(tag):
+                self.tickets.setdefault(status or NO_STATUS_TICKET_KEY, []).append(tag)
+                continue
+            status = None
+
+
+def _time_build(coverage_class, corpus):
+    start = time.time()
+    for test_kwargs in corpus:
+        test = coverage_class(**test_kwargs)
+        test.build()
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tests', type=int, default=100000,
+                        help='The number of synthetic tests to build')
+    args = parser.parse_args()
+
+    corpus = list(synthetic_tests(args.tests))
+    total_tags = sum(len(x['tags']) + len(x['parent_tags']) for x in corpus)
+    print('Synthetic corpus: {} tests, {} tags'.format(len(corpus), total_tags))
+
+    scan_seconds = _time_build(TableScanTestCoverage, corpus)
+    catalog_seconds = _time_build(TestCoverage, corpus)
+    line = '{:<11} {:8.3f}s ({:6.2f} us/tag)'
+    print(line.format('table scan:', scan_seconds, scan_seconds * 1e6 / total_tags))
+    print(line.format('catalog:', catalog_seconds, catalog_seconds * 1e6 / total_tags))
+    print('speedup:    {:8.1f}x'.format(scan_seconds / catalog_seconds))
+
+    start = time.time()
+    group = TestGroup('benchmark')
+    for test_kwargs in corpus:
+        group.add(**test_kwargs)
+    print('TestGroup.add for {} tests: {:.3f}s'.format(len(corpus), time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
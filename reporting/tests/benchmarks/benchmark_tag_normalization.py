@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+'''
+Compare gherkin tag normalization through the tag catalog against the original prefix scan.
+
+Usage: python benchmark_tag_normalization.py [--scenarios N] [--unique-tags]
+
+Feature files often carry many tags that extend a prescriptive tag (``smoke-login``,
+``p1-critical``, ``not-tested-ui``) alongside plenty of free-form ones, so the synthetic
+corpus adds both kinds to every scenario. With ``--unique-tags``, every free-form and
+extended tag is distinct, so the catalog's memoized results never get reused.
+Both methods are checked to give the same result for every tag.
+'''
+
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+from qe_coverage.base import TagCatalog, get_coverage_tables, get_tag_catalog
+
+from synthetic import synthetic_tests
+
+
+EXTENSIONS = ['login', 'critical', 'ui', 'billing', 'v2', 'slow-path']
+
+
+def original_normalize_tag(tag):
+    '''The original ``ParseProject._normalize_tag``, for comparison.'''
+    all_tags = get_tag_catalog().prescriptive_tags
+    if tag not in all_tags:
+        for expected_tag in all_tags:
+            if tag.startswith('{}-'.format(expected_tag)):
+                return expected_tag
+    return tag
+
+
+def tag_corpus(scenarios, unique_tags, seed=0):
+    '''Return a list of the tag lists of ``scenarios`` synthetic scenarios.'''
+    rng = random.Random(seed)
+    prescriptive_tags = get_tag_catalog().prescriptive_tags
+    corpus = []
+    for index, test in enumerate(synthetic_tests(scenarios, seed=seed)):
+        suffix = '-{}'.format(index) if unique_tags else ''
+        tags = list(test['tags'])
+        for _ in range(4):
+            extension = rng.choice(EXTENSIONS) + suffix
+            tags.append('{}-{}'.format(rng.choice(prescriptive_tags), extension))
+        tags.extend('team-tag-{}{}'.format(rng.randint(1, 50), suffix) for _ in range(8))
+        corpus.append(tags)
+    return corpus
+
+
+def _time_normalize(normalize, corpus):
+    start = time.time()
+    normalized = [list(map(normalize, tags)) for tags in corpus]
+    return normalized, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', type=int, default=100000,
+                        help='The number of synthetic scenarios to normalize the tags of')
+    parser.add_argument('--unique-tags', action='store_true',
+                        help='Make every extended and free-form tag distinct')
+    args = parser.parse_args()
+
+    corpus = tag_corpus(args.scenarios, args.unique_tags)
+    total_tags = sum(map(len, corpus))
+    print('Synthetic corpus: {} scenarios, {} tags'.format(len(corpus), total_tags))
+
+    # A fresh catalog, so the first timed pass starts with nothing memoized.
+    catalog = TagCatalog.from_tables(get_coverage_tables())
+    expected, scan_seconds = _time_normalize(original_normalize_tag, corpus)
+    actual, catalog_seconds = _time_normalize(catalog.normalize_tag, corpus)
+    assert actual == expected, 'catalog normalization differs from the original'
+
+    line = '{:<11} {:8.3f}s ({:10.0f} tags/s)'
+    print(line.format('prefix scan:', scan_seconds, total_tags / scan_seconds))
+    print(line.format('catalog:', catalog_seconds, total_tags / catalog_seconds))
+    print('speedup:     {:8.1f}x'.format(scan_seconds / catalog_seconds))
+
+
+if __name__ == '__main__':
+    main()
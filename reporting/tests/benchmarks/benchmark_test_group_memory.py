@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+'''
+Compare the memory held by a TestGroup of slotted, interned records against the original layout.
+
+Usage: python benchmark_test_group_memory.py [--tests N]
+
+The "original" numbers come from ``DictTestCoverage``, which has the original per-instance
+``__dict__``, a dictionary of attributes, an eagerly created ``defaultdict`` of tickets and
+list of errors, and which keeps each test's own category, tag and parent tag lists. It shares
+the rest of the tag-handling methods of ``TestCoverage``, so both groups do the same work and
+hold the same data.
+Memory is measured with ``tracemalloc``, as what is still allocated once each group is built
+and its input released.
+'''
+
+from __future__ import print_function
+
+import argparse
+from collections import defaultdict
+import gc
+import time
+import tracemalloc
+
+import attr
+
+from qe_coverage.base import (CoverageReport, KnownStructuredTags, TestCoverage, TestGroup,
+                              get_tag_catalog)
+
+from synthetic import synthetic_tests
+
+
+@attr.s
+class DictTestCoverage(object):
+    '''``TestCoverage`` with the original, unslotted and eagerly allocated, layout.'''
+    name = attr.ib()
+    categories = attr.ib(default=attr.Factory(list))
+    tags = attr.ib(default=attr.Factory(list))
+    parent_tags = attr.ib(default=attr.Factory(list))
+    file_path = attr.ib(default='')
+    tickets = attr.ib(default=attr.Factory(lambda: defaultdict(list)), init=False)
+    attributes = attr.ib(default=attr.Factory(dict), init=False)
+    errors = attr.ib(default=attr.Factory(list), init=False)
+
+    def organize_prescriptives(self):
+        for prescriptive, found_tags in get_tag_catalog().prescriptive_matches(self.all_tags):
+            self.attributes[prescriptive.name] = self._build_prescriptive(prescriptive, found_tags)
+
+    def organize_structureds(self):
+        tag_categories = KnownStructuredTags.categories.retrieve_entry(self.all_tags)
+        if len(tag_categories) > 1:
+            message = '{}:{}:There can only be one category tag per test'
+            self.errors.append(message.format(self.file_path, self.name))
+        if self.categories and tag_categories:
+            tag_categories[0] += self.categories[-1:]
+        self.attributes['Categories'] = tag_categories[0] if tag_categories else self.categories
+        self.attributes['Projects'] = KnownStructuredTags.projects.retrieve_entry(self.all_tags)
+
+    all_tags = TestCoverage.all_tags
+    build = TestCoverage.build
+    _build_prescriptive = TestCoverage._build_prescriptive
+    organize_tickets = TestCoverage.organize_tickets
+    _organize_tickets = TestCoverage._organize_tickets
+
+
+class DictTestGroup(TestGroup):
+    '''``TestGroup`` adding ``DictTestCoverage`` records, as the original ``TestGroup.add`` did.'''
+
+    def add(self, name, categories=None, tags=None, parent_tags=None, file_path=''):
+        test = DictTestCoverage(name=name, categories=categories, tags=tags,
+                                parent_tags=parent_tags or [], file_path=file_path)
+        test.build()
+        self.tests.append(test)
+        self.errors.extend(test.errors)
+        self._check_duplicate(test)
+
+
+def fresh_corpus(count):
+    '''
+    Return the synthetic tests, with every string a separate object, as when read from a file.
+
+    Tests of the same feature get equal, but not identical, categories lists, as the tests
+    of one class or feature file do in a real suite.
+    '''
+    feature_categories = {}
+    corpus = []
+    for test in synthetic_tests(count, categories_per_test=2):
+        categories = feature_categories.setdefault(test['file_path'], test['categories'])
+        test['categories'] = categories
+        corpus.append({key: [''.join(list(x)) for x in value] if isinstance(value, list) else value
+                       for key, value in test.items()})
+    return corpus
+
+
+def _build(group_class, count):
+    '''
+    Return a group of count synthetic tests, the memory it holds, and the time to build it.
+
+    The corpus is read in while memory is traced, and released once the group is built
+    (as when tests are read from a file), so whatever the group keeps of it is counted.
+    '''
+    gc.collect()
+    tracemalloc.start()
+    corpus = fresh_corpus(count)
+    start = time.time()
+    group = group_class('benchmark')
+    for test_kwargs in corpus:
+        group.add(**test_kwargs)
+    seconds = time.time() - start
+    del corpus
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return group, held, seconds
+
+
+def _report_data(group):
+    report = CoverageReport(group, 'Team::Product', 'api')
+    return [report._build_test(test) for test in group.tests]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tests', type=int, default=200000,
+                        help='The number of synthetic tests in the group')
+    args = parser.parse_args()
+
+    get_tag_catalog()  # Build it up front so it isn't counted against either group.
+    line = '{:<9} {:8.1f} MB ({:5.0f} bytes/test), built in {:6.2f}s'
+    results = {}
+    for label, group_class in (('original:', DictTestGroup), ('compact:', TestGroup)):
+        group, held, seconds = _build(group_class, args.tests)
+        results[label] = group
+        print(line.format(label, held / 1e6, held / float(args.tests), seconds))
+
+    assert _report_data(results['original:']) == _report_data(results['compact:']), \
+        'the compact records report different data'
+    assert results['original:'].errors == results['compact:'].errors
+
+
+if __name__ == '__main__':
+    main()
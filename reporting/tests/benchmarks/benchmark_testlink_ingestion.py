@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+'''
+Compare TestLink XML ingestion with expat against the original SAX content handler.
+
+Usage: python benchmark_testlink_ingestion.py [--tests N] [--keep-xml FILE] [--test-group]
+
+A synthetic TestLink export of ``--tests`` test cases (500,000 by default) is written
+to a temporary file, then parsed by both ``TestLinkXMLParser`` and ``TestLinkContentHandler``.
+Test cases are handed to a counting sink rather than a ``TestGroup``, so the numbers
+are for the XML ingestion alone; the peak memory of each parser is measured with
+``tracemalloc`` in a separate pass, since tracing slows the parse down.
+With ``--test-group``, the full ``testlink_xml_to_test_group`` conversion is also timed.
+'''
+
+from __future__ import print_function
+
+import argparse
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+from xml.sax import parse
+
+from qe_coverage.send_testlink_tags_report import (TestLinkContentHandler, TestLinkXMLParser,
+                                                   testlink_xml_to_test_group)
+
+from synthetic import write_testlink_xml
+
+
+class CountingSink(object):
+    '''Stands in for ``TestGroup``, only counting the tests added.'''
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, **_):
+        self.count += 1
+
+
+class SinkContentHandler(TestLinkContentHandler):
+    '''``TestLinkContentHandler`` adding its tests to a ``CountingSink``.'''
+
+    def startDocument(self):  # noqa: N802
+        TestLinkContentHandler.startDocument(self)
+        self.tests = CountingSink()
+
+
+def _parse_with_sax(xml_file_name):
+    content = SinkContentHandler(1)
+    parse(xml_file_name, content)
+    return content.tests.count
+
+
+def _parse_with_expat(xml_file_name):
+    sink = CountingSink()
+    TestLinkXMLParser(1, sink.add).parse_file(xml_file_name)
+    return sink.count
+
+
+def _timed(func, *args):
+    start = time.time()
+    result = func(*args)
+    return result, time.time() - start
+
+
+def _peak_memory(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tests', type=int, default=500000,
+                        help='The number of synthetic test cases in the TestLink export')
+    parser.add_argument('--keep-xml', metavar='FILE',
+                        help='Write the synthetic export to FILE and keep it')
+    parser.add_argument('--test-group', action='store_true',
+                        help='Also time the full conversion to a TestGroup')
+    args = parser.parse_args()
+
+    if args.keep_xml:
+        xml_file_name = args.keep_xml
+    else:
+        handle, xml_file_name = tempfile.mkstemp(suffix='.xml')
+        os.close(handle)
+    try:
+        with io.open(xml_file_name, 'w', encoding='utf-8') as xml_file:
+            write_testlink_xml(xml_file, args.tests)
+        print('Synthetic TestLink export: {} test cases, {:.1f} MB'.format(
+            args.tests, os.path.getsize(xml_file_name) / 1e6))
+
+        line = '{:<6} {:8.3f}s ({:5.2f} us/test case), peak memory {:8.1f} KB'
+        results = {}
+        for name, func in (('SAX:', _parse_with_sax), ('expat:', _parse_with_expat)):
+            count, seconds = _timed(func, xml_file_name)
+            assert count == args.tests, '{} found {} test cases'.format(name, count)
+            peak = _peak_memory(func, xml_file_name)
+            results[name] = seconds
+            print(line.format(name, seconds, seconds * 1e6 / count, peak / 1e3))
+        print('speedup: {:7.1f}x'.format(results['SAX:'] / results['expat:']))
+
+        if args.test_group:
+            group, seconds = _timed(testlink_xml_to_test_group, xml_file_name, 1)
+            print('testlink_xml_to_test_group for {} test cases: {:.3f}s'.format(
+                len(group.tests), seconds))
+    finally:
+        if not args.keep_xml:
+            os.remove(xml_file_name)
+
+
+if __name__ == '__main__':
+    main()
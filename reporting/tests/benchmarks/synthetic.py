@@ -0,0 +1,89 @@
+'''
+Helpers for building synthetic coverage corpora for the qe_coverage benchmarks.
+
+The corpora are generated from a fixed seed so that repeated benchmark runs
+(and runs against different versions of the code) measure the same work.
+'''
+
+import random
+from xml.sax.saxutils import quoteattr
+
+
+POLARITIES = ['positive', 'negative']
+PRIORITIES = ['p0', 'p1', 'p2', '']
+SUITES = ['deploy', 'smoke', 'load', 'integration', 'security', '']
+STATUSES = ['nyi', 'not-tested', 'needs-work', 'quarantined', 'unstable']
+OTHER_TAGS = ['regression', 'wip', 'slow', 'needs-data', 'customer-reported']
+
+
+def synthetic_tests(count, seed=0, categories_per_test=3, status_rate=0.1):
+    '''
+    Yield ``count`` dictionaries of keyword arguments suitable for ``TestGroup.add``.
+
+    Args:
+        count (int): the number of synthetic tests to generate.
+        seed (int): the seed for the random number generator.
+        categories_per_test (int): how deep the category hierarchy of each test is.
+        status_rate (float): the fraction of tests that get a non-operational status tag.
+    '''
+    rng = random.Random(seed)
+    for index in range(count):
+        tags = [rng.choice(POLARITIES)]
+        tags.extend(filter(None, [rng.choice(PRIORITIES), rng.choice(SUITES)]))
+        tags.append('JIRA-{}'.format(rng.randint(1, 5000)))
+        tags.extend(rng.sample(OTHER_TAGS, rng.randint(0, 2)))
+        if rng.random() < status_rate:
+            tags.extend([rng.choice(STATUSES), 'JIRA-{}'.format(rng.randint(1, 5000))])
+        categories = ['Category {}'.format(rng.randint(1, 20)) for _ in range(categories_per_test)]
+        categories.append('Feature {}'.format(index // 25))
+        yield {
+            'name': 'Scenario {}'.format(index),
+            'categories': categories,
+            'tags': tags,
+            'parent_tags': ['api'] if index % 2 else [],
+            'file_path': 'features/feature_{}.feature'.format(index // 25),
+        }
+
+
+TESTLINK_TESTCASE = '''<testcase internalid="{index}" name={name}>
+<node_order><![CDATA[{index}]]></node_order>
+<summary><![CDATA[Synthetic test case {index}]]></summary>
+<execution_type><![CDATA[1]]></execution_type>
+<keywords>{keywords}</keywords>
+<custom_fields><custom_field><name><![CDATA[Sprint]]></name><value><![CDATA[]]></value>\
+</custom_field></custom_fields>
+</testcase>
+'''
+TESTLINK_KEYWORD = '<keyword name={}><notes><![CDATA[]]></notes></keyword>'
+
+
+def write_testlink_xml(xml_file, count, seed=0):
+    '''
+    Write a synthetic TestLink XML export of ``count`` test cases to ``xml_file``.
+
+    Each synthetic test's categories become nested test suites (under a single root suite),
+    and its tags become the test case's keywords. The export is written one test case at a
+    time, so very large exports can be generated without holding them in memory.
+
+    Args:
+        xml_file: a file object opened for writing text.
+        count (int): the number of test cases to write.
+        seed (int): the seed for the random number generator.
+    '''
+    xml_file.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuite name="Synthetic">\n')
+    open_suites = []
+    for index, test in enumerate(synthetic_tests(count, seed=seed)):
+        suites = test['categories']
+        common = 0
+        for open_suite, suite in zip(open_suites, suites):
+            if open_suite != suite:
+                break
+            common += 1
+        xml_file.write('</testsuite>\n' * (len(open_suites) - common))
+        for suite in suites[common:]:
+            xml_file.write('<testsuite name={}>\n'.format(quoteattr(suite)))
+        open_suites = suites
+        keywords = ''.join(TESTLINK_KEYWORD.format(quoteattr(tag)) for tag in test['tags'])
+        xml_file.write(TESTLINK_TESTCASE.format(index=index, name=quoteattr(test['name']),
+                                                keywords=keywords))
+    xml_file.write('</testsuite>\n' * (len(open_suites) + 1))
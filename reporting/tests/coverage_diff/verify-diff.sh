@@ -0,0 +1,49 @@
+#! /bin/bash
+
+# Compare the "good" gherkin JSON report against a JSON-lines copy of it
+# with one test removed, one added, and a status and a ticket changed,
+# then make sure coverage-diff finds exactly those differences,
+# whether the reports are joined in memory or in partitions on disk.
+
+set -e
+
+WORK_DIR=$(mktemp -d)
+trap 'rm -rf "$WORK_DIR"' EXIT
+
+(cd ../gherkin/good; coverage-gherkin api "Unit::Tests" --dry-run --preserve-files \
+    --output-dir "$WORK_DIR/report" > /dev/null)
+OLD=$(ls "$WORK_DIR"/report/*[0-9].json)
+NEW="$WORK_DIR/new.jsonl.gz"
+
+python - "$OLD" "$NEW" <<'PYTHON'
+import gzip, json, sys
+report = json.load(open(sys.argv[1]))
+happy, quarantined, unstable = report
+happy['Status'] = 'quarantined'
+happy['quarantined'] = ['JIRA-9999']
+quarantined['Tickets'] = ['JIRA-7777']
+added = dict(unstable, **{'Test Name': 'Added Test'})
+with gzip.open(sys.argv[2], 'wt') as new:
+    for item in (happy, quarantined, added):
+        new.write(json.dumps(item) + '\n')
+PYTHON
+
+EXPECTED="changed  Example of Good Gherkin > Quarantined Test: tickets quarantined: JIRA-1234 -> Tickets: JIRA-7777; quarantined: JIRA-1234
+changed  Example of Good Gherkin > Simple Happy Path: status operational -> quarantined, tickets no tickets -> quarantined: JIRA-9999
+added    Example of Good Gherkin > Added Test: unstable, unstable: JIRA-1234
+removed  Example of Good Gherkin > Unstable Test: unstable, unstable: JIRA-1234"
+
+for PARTITIONS in 1 4; do
+    ACTUAL=$(coverage-diff "$OLD" "$NEW" --partitions $PARTITIONS)
+    if [ "$(echo "$ACTUAL" | head -n -1 | sort)" != "$(echo "$EXPECTED" | sort)" ] ||
+       [ "$(echo "$ACTUAL" | tail -n 1)" != "1 added, 1 removed, 2 changed" ]; then
+        echo "Unexpected differences with $PARTITIONS partition(s):" >&2
+        echo "$ACTUAL" >&2
+        exit 1
+    fi
+done
+if [ "$(coverage-diff "$OLD" "$OLD")" != "0 added, 0 removed, 0 changed" ]; then
+    echo "A report differs from itself" >&2
+    exit 1
+fi
+echo "coverage-diff found the expected differences"
@@ -0,0 +1,39 @@
+#! /bin/bash
+
+# Save two runs of the "good" gherkin coverage data to a coverage store,
+# then make sure the stored data matches the JSON report and that the
+# coverage-store queries see both runs.
+
+set -e
+
+WORK_DIR=$(mktemp -d)
+trap 'rm -rf "$WORK_DIR"' EXIT
+STORE="$WORK_DIR/coverage.db"
+
+for TIMESTAMP in 1500000000 1500086400; do
+    (cd ../gherkin/good; coverage-gherkin api "Unit::Tests" --dry-run --preserve-files \
+        --output-dir "$WORK_DIR/report-$TIMESTAMP" --timestamp $TIMESTAMP \
+        --coverage-store "$STORE" > /dev/null)
+done
+
+python - "$WORK_DIR" <<'PYTHON'
+import glob, json, os, sys
+from qe_coverage.coverage_store import CoverageStore
+work_dir = sys.argv[1]
+report, = glob.glob(os.path.join(work_dir, 'report-1500000000', '*[0-9].json'))
+expected = json.load(open(report))
+store = CoverageStore(os.path.join(work_dir, 'coverage.db'))
+runs = list(store.runs('Unit::Tests'))
+assert [(x[2], x[3]) for x in runs] == [(1500000000, 3), (1500086400, 3)], runs
+stored = [json.loads(x) for x, in store.connection.execute(
+    'SELECT data FROM tests WHERE run_id = ? ORDER BY rowid', (runs[0][0],))]
+assert stored == expected, 'stored data does not match the JSON report'
+trend = list(store.trend('Unit::Tests'))
+assert [counts for _, counts in trend] == [{'operational': 1, 'quarantined': 1, 'unstable': 1}] * 2
+history = list(store.history('Quarantined Test', ['Example of Good Gherkin']))
+assert [data['quarantined'] for _, _, data in history] == [['JIRA-1234']] * 2, history
+print('{} runs of {} tests stored'.format(len(runs), len(stored)))
+PYTHON
+
+coverage-store "$STORE" trend "Unit::Tests"
+coverage-store "$STORE" history "Quarantined Test"
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+'''
+A local stand-in for the coverage data broker, for testing uploads without the real endpoint.
+
+Every POST to ``/coverage`` is decoded (including ``Content-Encoding: gzip``), saved as a JSON
+file in the output directory, and answered with ``201 CREATED`` and the URL of the saved data,
+just like the data broker. ``--fail-first N`` answers the first N POSTs with ``503`` instead,
+to exercise the uploader's retry logic.
+'''
+from __future__ import print_function
+import argparse
+import gzip
+from io import BytesIO
+import json
+import os
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib import parse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    import urlparse as parse
+
+
+class FakeDataBrokerHandler(BaseHTTPRequestHandler):
+    def _respond(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = parse.urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        server.post_count += 1
+        if server.post_count <= server.fail_first:
+            self._respond(503, {'error': 'failing on purpose ({})'.format(server.post_count)})
+            return
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.GzipFile(fileobj=BytesIO(body)).read()
+        upload_id = len(os.listdir(server.output_dir)) + 1
+        upload = {
+            'params': dict(parse.parse_qsl(url.query)),
+            'data': json.loads(body.decode('utf-8')),
+        }
+        with open(os.path.join(server.output_dir, '{:05d}.json'.format(upload_id)), 'w') as f:
+            json.dump(upload, f, indent=4, sort_keys=True)
+        data_url = 'http://{}:{}{}/{}'.format(server.server_name, server.server_port, url.path,
+                                              upload_id)
+        self._respond(201, {'url': data_url})
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output_dir', help='Directory to save the uploaded data in')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--fail-first', type=int, default=0,
+                        help='Respond to the first FAIL_FIRST POSTs with a 503')
+    parser.add_argument('--quiet', action='store_true', help='Do not log each request')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+    server = HTTPServer(('127.0.0.1', args.port), FakeDataBrokerHandler)
+    server.output_dir = args.output_dir
+    server.fail_first = args.fail_first
+    server.post_count = 0
+    server.quiet = args.quiet
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
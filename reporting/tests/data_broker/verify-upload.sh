@@ -0,0 +1,45 @@
+#! /bin/bash
+
+# Upload the "good" gherkin coverage data to a local stand-in data broker
+# in gzip-compressed batches, with the first few requests failing,
+# then make sure everything arrived once and that a re-run with the
+# same upload manifest does not upload anything again.
+
+set -e
+
+PORT=${PORT:-8765}
+WORK_DIR=$(mktemp -d)
+trap 'kill $BROKER_PID 2> /dev/null; rm -rf "$WORK_DIR"' EXIT
+
+python fake_data_broker.py --quiet --port $PORT --fail-first 2 "$WORK_DIR/uploads" &
+BROKER_PID=$!
+sleep 1
+
+UPLOAD_ARGS="--coverage-url http://127.0.0.1:$PORT/coverage --gzip --batch-size 2
+             --retries 3 --retry-backoff 0.1 --upload-manifest $WORK_DIR/manifest.json
+             --timestamp 1500000000"
+
+(cd ../gherkin/good; coverage-gherkin api "Unit::Tests" $UPLOAD_ARGS --preserve-files \
+    --output-dir "$WORK_DIR/report")
+
+python - "$WORK_DIR" <<'PYTHON'
+import glob, json, os, sys
+work_dir = sys.argv[1]
+report, = glob.glob(os.path.join(work_dir, 'report', '*[0-9].json'))
+expected = json.load(open(report))
+uploads = [json.load(open(p)) for p in sorted(glob.glob(os.path.join(work_dir, 'uploads', '*')))]
+uploaded = [item for upload in uploads for item in upload['data']]
+assert uploaded == expected, 'uploaded data does not match the JSON report'
+assert all(len(upload['data']) <= 2 for upload in uploads), 'a batch was too big'
+assert all(upload['params']['timestamp'] == '1500000000' for upload in uploads)
+print('{} tests uploaded in {} batches'.format(len(uploaded), len(uploads)))
+PYTHON
+
+BEFORE=$(ls "$WORK_DIR/uploads" | wc -l)
+(cd ../gherkin/good; coverage-gherkin api "Unit::Tests" $UPLOAD_ARGS > /dev/null)
+AFTER=$(ls "$WORK_DIR/uploads" | wc -l)
+if [ "$BEFORE" != "$AFTER" ]; then
+    echo "Resumed upload sent batches that were already uploaded" >&2
+    exit 1
+fi
+echo "Resumed upload skipped all $AFTER already uploaded batches"
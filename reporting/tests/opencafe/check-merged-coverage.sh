@@ -0,0 +1,47 @@
+#! /bin/bash
+
+# This script assumes you are running it from the directory where it lives.
+
+# Make sure that coverage-opencafe merges the coverage files of several workers
+# (faked by fake_open_cafe.sh) into the same report as the single file of one worker,
+# and that a test repeated within one worker's file is still reported as a duplicate.
+
+export PYTHONPATH=.:../../qe_coverage
+COVERAGE_ARGS="--dry-run api QETEST::OpenCAFE ./fake_open_cafe.sh"
+
+# Print a report's tests, one per line, sorted, since merged files may be read in another order.
+function sorted_report() {
+    RESULTS=$(coverage-opencafe --preserve-files ${COVERAGE_ARGS} "$@" 2>&1)
+    STATUS=$?
+    COVERAGE_DIR=$(echo "$RESULTS" | sed -n -e 's/^Generated files located at: //p')
+    if [ $STATUS -ne 0 ] || [ -z "$COVERAGE_DIR" ]; then
+        echo "$RESULTS" >&2
+        return 1
+    fi
+    python -c 'import json, sys; print("\n".join(sorted(json.dumps(x, sort_keys=True) for x in json.load(open(sys.argv[1])))))' \
+        ${COVERAGE_DIR}/opencafe_coverage_report*[0-9].json
+    rm -rf $COVERAGE_DIR
+}
+
+if ! EXPECTED=$(sorted_report) ; then
+    echo Error when generating the single-file coverage report, aborting
+    exit 2
+fi
+
+for MODE in duplicate-results sharded-results ; do
+    if ! diff <(echo "$EXPECTED") <(sorted_report $MODE) ; then
+        echo
+        echo "The $MODE coverage report is not the same as the single-file one"
+        exit 1
+    fi
+done
+
+RESULTS=$(coverage-opencafe ${COVERAGE_ARGS} repeated-results 2>&1)
+if [ $? -eq 0 ] || ! echo "$RESULTS" | grep -q "appeared more than once" ; then
+    echo "$RESULTS"
+    echo
+    echo A test repeated in one coverage file should have been reported as a duplicate
+    exit 1
+fi
+
+echo Merged coverage files give the same report as one file, and repeats in one file are reported.
@@ -7,7 +7,7 @@
 
 
 function usage() {
-    echo Usage: "$0 [error-results|no-results|duplicate-results]"
+    echo Usage: "$0 [error-results|no-results|duplicate-results|sharded-results|repeated-results]"
     echo
     echo "When invoked with:"
     echo "  no parameters:"
@@ -19,7 +19,14 @@ function usage() {
     echo "      exits with success (0), but does not copy"
     echo "  duplicate-results:"
     echo "      copies the expected results file into two separate files and"
-    echo "      exits with success (0)"
+    echo "      exits with success (0), like two workers that both ran every test"
+    echo "  sharded-results:"
+    echo "      splits the expected results across three files, as three parallel"
+    echo "      workers would, with the first test reported by every worker,"
+    echo "      and exits with success (0)"
+    echo "  repeated-results:"
+    echo "      copies the expected results file with its first test repeated in it,"
+    echo "      like a run that reported one test twice, and exits with success (0)"
     echo
     exit 1
 }
@@ -43,6 +50,20 @@ if [ "$1" = "no-results" ] ; then
    exit 0
 fi
 
+if [ "$1" = "sharded-results" ] ; then
+    for shard in 0 1 2 ; do
+        awk -v shard=$shard 'NR == 1 || NR % 3 == shard' expected-coverage-results.json \
+            > $COLLECT_TAGS_DATA_INTO/coverage-shard$shard.json
+    done
+    exit 0
+fi
+
+if [ "$1" = "repeated-results" ] ; then
+    awk 'NR == 1 {print} {print}' expected-coverage-results.json \
+        > $COLLECT_TAGS_DATA_INTO/coverageABC.json
+    exit 0
+fi
+
 cp expected-coverage-results.json $COLLECT_TAGS_DATA_INTO/coverageABC.json
 
 if [ "$1" = "duplicate-results" ] ; then
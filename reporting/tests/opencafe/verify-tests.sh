@@ -31,3 +31,8 @@ fi
 
 echo "A bad run, an error should be printed, which corresponds to broken tests, but the tests should pass:"
 cafe-parallel test bad_decorators "$@"
+STATUS=$?
+
+echo "Merging the coverage files of several workers, no ERRORs should happen:"
+./check-merged-coverage.sh || exit 1
+exit $STATUS
@@ -0,0 +1,6 @@
+#! /bin/bash
+
+# Stands in for coverage-gherkin: prints the arguments it was given on one line,
+# so the tests can check what coverage-list passed through to it.
+
+echo "$@"
@@ -0,0 +1,39 @@
+#! /bin/bash
+
+# Make sure coverage-list passes the arguments it doesn't know, such as
+# coverage-gherkin's own -j/--jobs, through to the coverage script,
+# whether the products are run one at a time or with --product-jobs.
+
+set -e
+
+WORK_DIR=$(mktemp -d)
+trap 'rm -rf "$WORK_DIR"' EXIT
+
+cat > "$WORK_DIR/products.csv" <<CSV
+product_hierarchy,product_dir
+Team::First,first
+Team::Second,second
+CSV
+
+function check_passed_through() {
+    # $1: what was run, $2: the output of the fake coverage script, $3: how many products it ran
+    if [ "$(echo "$2" | grep -c -- ' -j 4$')" != "$3" ]; then
+        echo "-j 4 did not reach the coverage script $1:" >&2
+        echo "$2" >&2
+        exit 1
+    fi
+}
+
+OUTPUT=$(coverage-list "$WORK_DIR/products.csv" ./fake_coverage_gherkin.sh api -j 4)
+check_passed_through "one product at a time" "$OUTPUT" 2
+
+coverage-list "$WORK_DIR/products.csv" ./fake_coverage_gherkin.sh api -j 4 \
+    --product-jobs 2 --log-dir "$WORK_DIR/logs" > /dev/null
+for LOG in "$WORK_DIR"/logs/*.log; do
+    check_passed_through "with --product-jobs ($LOG)" "$(cat "$LOG")" 1
+done
+if [ "$(ls "$WORK_DIR"/logs/*.log | wc -l)" != 2 ]; then
+    echo "Expected one log file per product in $WORK_DIR/logs" >&2
+    exit 1
+fi
+echo "coverage-list passed -j through to the coverage script"
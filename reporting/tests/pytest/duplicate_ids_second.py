@@ -0,0 +1,11 @@
+from __future__ import print_function
+
+import pytest
+
+
+class TestCaseWithADuplicatedId:
+    # duplicate_ids_first.py and duplicate_ids_second.py hold the same test class,
+    # so their tests have the same test ID, which qe_coverage should report as a duplicate.
+    @pytest.mark.tags('smoke', 'positive')
+    def test_in_two_modules(self):
+        assert True
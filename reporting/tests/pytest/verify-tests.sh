@@ -31,29 +31,61 @@ args_list="${args_list} --capture no"
 
 # Test for two ValueErrors, one being from multiple status tags
 # other being status tag not followed by ticket id
-BAD_RESULTS="$(pytest $args_list bad_decorators.py 2>&1)"
-NOT_IMPLEMENTED_RETURN=$(echo "${BAD_RESULTS}" | grep -c ": NotImplementedError")
-MULTIPLE_STATUS_RETURN=$(echo "${BAD_RESULTS}" | grep -c "prescriptive attribute Status")
-MULTIPLE_SUITE_RETURN=$(echo "${BAD_RESULTS}" | grep -c "prescriptive attribute Suite")
-NO_TICKET_RETURN=$(echo "${BAD_RESULTS}" | grep -c "Ticket ID not found for status")
+# Run both the normal way and collection-only, which should find the same problems;
+# collection-only reports the untagged test as an error instead of raising.
+for coverage_mode in --qe-coverage --qe-coverage-collect-only; do
+    mode_args_list="${args_list/--qe-coverage/${coverage_mode}}"
+    if [[ $coverage_mode == --qe-coverage ]]; then
+        NOT_IMPLEMENTED_PATTERN=": NotImplementedError"
+    else
+        NOT_IMPLEMENTED_PATTERN="not marked with have @pytest.mark.tags"
+    fi
+    BAD_RESULTS="$(pytest $mode_args_list bad_decorators.py 2>&1)"
+    NOT_IMPLEMENTED_RETURN=$(echo "${BAD_RESULTS}" | grep -c "${NOT_IMPLEMENTED_PATTERN}")
+    MULTIPLE_STATUS_RETURN=$(echo "${BAD_RESULTS}" | grep -c "prescriptive attribute Status")
+    MULTIPLE_SUITE_RETURN=$(echo "${BAD_RESULTS}" | grep -c "prescriptive attribute Suite")
+    NO_TICKET_RETURN=$(echo "${BAD_RESULTS}" | grep -c "Ticket ID not found for status")
 
 
 
 
-echo ""
-echo ""
-echo ""
+    echo ""
+    echo ""
+    echo ""
 
-echo "Testing bad run"
-echo "==========================================="
-if [[ NOT_IMPLEMENTED_RETURN -eq 1 && \
-      MULTIPLE_STATUS_RETURN -eq 1 && \
-      MULTIPLE_SUITE_RETURN  -eq 1 && \
-      NO_TICKET_RETURN       -eq 1 ]]; then
-    echo "Pytest negative test successful"
-else
-    echo "Pytest negative test failed"
-    echo "-------------------------------------------"
-    echo -e "${BAD_RESULTS}"
-fi
-echo "==========================================="
+    echo "Testing bad run (${coverage_mode})"
+    echo "==========================================="
+    if [[ NOT_IMPLEMENTED_RETURN -eq 1 && \
+          MULTIPLE_STATUS_RETURN -eq 1 && \
+          MULTIPLE_SUITE_RETURN  -eq 1 && \
+          NO_TICKET_RETURN       -eq 1 ]]; then
+        echo "Pytest negative test successful"
+    else
+        echo "Pytest negative test failed"
+        echo "-------------------------------------------"
+        echo -e "${BAD_RESULTS}"
+    fi
+    echo "==========================================="
+done
+
+
+# Two different tests (in different modules) with the same class, name and tags
+# have the same test ID, which should be reported as a duplicate in every mode,
+# including when merging the data of pytest-xdist workers, which all collect every test.
+args_list="--dry-run --product-hierarchy Team::Project --capture no"
+for coverage_mode in "--qe-coverage" "--qe-coverage-collect-only" "--qe-coverage-collect-only -n 2"; do
+    DUPLICATE_RESULTS="$(pytest $coverage_mode $args_list duplicate_ids_first.py duplicate_ids_second.py 2>&1)"
+    DUPLICATE_RETURN=$(echo "${DUPLICATE_RESULTS}" | grep -c "appeared more than once")
+
+    echo ""
+    echo "Testing duplicate test IDs (${coverage_mode})"
+    echo "==========================================="
+    if [[ DUPLICATE_RETURN -eq 1 ]]; then
+        echo "Pytest duplicate test ID test successful"
+    else
+        echo "Pytest duplicate test ID test failed"
+        echo "-------------------------------------------"
+        echo -e "${DUPLICATE_RESULTS}"
+    fi
+    echo "==========================================="
+done